@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import duckdb
+
+# Modules communs aux dossiers AI/ et Not_AI/ (dossier common/ à la racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+
+from benchTools import load_previous, report, save_results, timed
+import dataset
+import queries
+from mockOllama import MockOllamaServer
+
+# --- BENCHMARKS (REQUÊTES DU DASHBOARD IA) ---
+# Chaque exécution est sauvegardée en JSON dans bench_results/ ; elle est comparée
+# automatiquement à l'exécution précédente pour repérer les ralentissements (benchTools).
+
+SUITE = "AI"
+DATA_DIR = "bench_data"
+
+
+# --- REQUÊTES DU DASHBOARD (DuckDB) ---
+
+
+# Valeurs des colonnes de partition des jeux synthétiques
+SYNTHETIC_MODELS = "['gemma2', 'gemma3', 'llama3', 'mistral']"
+SYNTHETIC_SCENARIOS = (
+    "['Full_IA_Psychology', 'IA_vs_Code', 'Altruist_vs_Greedy', 'All_Adaptive', 'Gemma2_vs_Gemma3']"
+)
+
+
+def _synthetic_rows_sql(n_rows):
+    """
+    n_rows lignes au schéma des données IA (200 tours, 4 joueurs IA par partie) ;
+    modèle et scénario varient d'une partie à l'autre (4 modèles x 5 scénarios).
+    """
+    return f"""
+        SELECT
+            (i // 4) % 200 + 1 AS round,
+            i % 4 AS player_id,
+            ['IA_altruist_gemma2', 'IA_greedy_gemma2', 'IA_adaptive_gemma2', 'IA_adaptive_gemma2'][i % 4 + 1] AS strategy,
+            20 AS endowment,
+            hash(i) % 21 AS contribution,
+            20 - hash(i) % 21 AS kept_private,
+            (hash(i // 4) % 80) * 0.4 AS pot_share_received,
+            20 - hash(i) % 21 + (hash(i // 4) % 80) * 0.4 AS round_gain_total,
+            ((i // 4) % 200 + 1) * 25.0 AS cumulative_score,
+            hash(i // 4) % 81 AS group_total_pot,
+            1.6 AS group_synergy_factor,
+            'IA_S1_0_' || (i // 800 + 1) AS game_id,
+            {SYNTHETIC_SCENARIOS}[(i // 800) % 5 + 1] AS scenario,
+            {SYNTHETIC_MODELS}[(i // 4000) % 4 + 1] AS model_used,
+            DATE '2026-01-01' AS run_date
+        FROM range({n_rows}) t(i)
+    """
+
+
+def synthetic_dataset(n_rows, folder=DATA_DIR):
+    """
+    Fichier Parquet synthétique de n_rows lignes (un seul fichier, toutes partitions mélangées).
+    Généré une seule fois par DuckDB puis réutilisé.
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"synthetic_ia_{n_rows}.parquet")
+    if os.path.exists(path):
+        return path
+
+    duckdb.sql(f"COPY ({_synthetic_rows_sql(n_rows)}) TO '{path}' (FORMAT PARQUET)")
+    return path
+
+
+def synthetic_partitioned(n_rows, folder=DATA_DIR):
+    """
+    Les mêmes lignes en jeu partitionné au schéma compact (voir dataset.py) : racine à passer
+    à dataset.source_sql. 4 modèles x 5 scénarios = 20 partitions. Écrit au format large par
+    DuckDB puis converti par dataset.compact_dataset (l'outil de migration).
+    """
+    root = os.path.join(folder, f"synthetic_dataset_{n_rows}")
+    if os.path.exists(root):
+        return root
+
+    table = os.path.join(root, "results")
+    os.makedirs(root)
+    duckdb.sql(
+        f"""
+        COPY ({_synthetic_rows_sql(n_rows)}) TO '{table}'
+        (FORMAT PARQUET, PARTITION_BY ({', '.join(dataset.PARTITION_KEYS)}))
+        """
+    )
+    dataset.compact_dataset(root)
+    return root
+
+
+def _folder_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(dirpath, name))
+        for dirpath, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def bench_storage(sizes=(100_000, 1_000_000, 10_000_000), repeat=3):
+    """
+    Schéma large (un fichier, types devinés, constantes de partie sur chaque ligne) contre
+    schéma compact (types étroits, table games à part) : taille sur disque, lecture complète
+    des lignes et mémoire Arrow du résultat.
+    """
+    results = {}
+    for n_rows in sizes:
+        wide = synthetic_dataset(n_rows)
+        root = synthetic_partitioned(n_rows)
+        layouts = {
+            "wide": (queries.file_source(wide), _folder_bytes(wide)),
+            "compact": (
+                dataset.scan_sql(root, "results"),
+                _folder_bytes(os.path.join(root, "results"))
+                + _folder_bytes(os.path.join(root, "games")),
+            ),
+        }
+        for layout, (source, disk_bytes) in layouts.items():
+            sql = f"SELECT * FROM {source}"
+            best, median = timed(lambda: duckdb.sql(sql).to_arrow_table(), repeat)
+            results[f"storage.scan.{layout}.n{n_rows}"] = {
+                "seconds": best,
+                "median_seconds": median,
+                "disk_bytes": disk_bytes,
+                "arrow_bytes": duckdb.sql(sql).to_arrow_table().nbytes,
+            }
+    return results
+
+
+def bench_queries(sizes=(100_000, 1_000_000, 10_000_000), repeat=3):
+    """
+    Latence de chaque requête du dashboard sur des jeux synthétiques de tailles croissantes :
+    sur un seul fichier, puis sur le jeu partitionné filtré comme le dashboard (un modèle,
+    un scénario) où seuls les fichiers de la partition sont lus.
+    """
+    results = {}
+    for n_rows in sizes:
+        wide = queries.file_source(synthetic_dataset(n_rows))
+        root = synthetic_partitioned(n_rows)
+        pruned = {"model_used": "gemma2", "scenario": "Full_IA_Psychology"}
+        # (source complète, source des ROW_QUERIES, source des GAME_QUERIES)
+        sources = {
+            "": (wide, wide, wide),
+            ".pruned": (
+                dataset.source_sql(root, **pruned),
+                dataset.scan_sql(root, "results", **pruned),
+                dataset.scan_sql(root, "games", **pruned),
+            ),
+        }
+        # Une partie au milieu du fichier pour les requêtes "une seule partie", prise dans la
+        # partition filtrée (gemma2 / Full_IA_Psychology = parties n° 1, 21, 41...)
+        game_num = max(1, n_rows // 1600)
+        game_id = f"IA_S1_0_{game_num - (game_num - 1) % 20}"
+        for suffix, (source, rows_source, games_source) in sources.items():
+            for name, build_sql in queries.DASHBOARD_QUERIES.items():
+                if name.startswith("single_game"):
+                    sql = build_sql(source, game_id)
+                elif name in queries.ROW_QUERIES:
+                    sql = build_sql(rows_source)
+                elif name in queries.GAME_QUERIES:
+                    sql = build_sql(games_source)
+                else:
+                    sql = build_sql(source)
+                best, median = timed(lambda: duckdb.sql(sql).df(), repeat)
+                results[f"query.{name}{suffix}.n{n_rows}"] = {
+                    "seconds": best,
+                    "median_seconds": median,
+                }
+    return results
+
+
+# --- CONSTRUCTION DES PROMPTS ---
+
+
+def bench_prompts(table_sizes=(4, 64), n_rounds=200, repeat=3):
+    """
+    Construction des messages de tous les joueurs IA à chaque tour (sans appel au LLM) :
+    le coût qui reste quand le LLM est remplacé par le substitut ou le faux serveur.
+    """
+    import random
+
+    from mainGame import GameHistory, LLMStrategy
+
+    rng = random.Random(0)
+    results = {}
+    for n_players in table_sizes:
+        for prompt_mode in ("single", "prefix"):
+
+            def build_all():
+                players = [
+                    LLMStrategy("gemma2", persona, prompt_mode=prompt_mode)
+                    for persona in rng.choices(["altruist", "greedy", "adaptive"], k=n_players)
+                ]
+                history = GameHistory(n_players, n_rounds)
+                for _ in range(n_rounds):
+                    for pid, player in enumerate(players):
+                        player._build_messages(history, pid, 20)
+                    contributions = [rng.randint(0, 20) for _ in range(n_players)]
+                    history.record(contributions, sum(contributions))
+
+            best, median = timed(build_all, repeat)
+            results[f"prompts.{prompt_mode}.p{n_players}"] = {
+                "seconds": best,
+                "median_seconds": median,
+                "prompts_per_s": n_players * n_rounds / best,
+            }
+    return results
+
+
+# --- CHAÎNE LLM (FAUX SERVEUR OLLAMA) ---
+
+
+async def _play_llm_games(n_games, n_rounds, client, **llm_options):
+    from mainGame import LLMStrategy, play_public_goods_game_async
+
+    config = {"endowment": 20, "multiplier": 1.6, "n_rounds": n_rounds, "verbose": False}
+    tables = [
+        [LLMStrategy(model_name="gemma2", persona=persona, client=client, **llm_options)
+         for persona in ["altruist", "greedy", "adaptive", "adaptive"]]
+        for _ in range(n_games)
+    ]
+    # Le plafond de requêtes est celui du client (pas de sémaphore côté moteur)
+    await asyncio.gather(
+        *(play_public_goods_game_async(t, config, semaphore=contextlib.nullcontext()) for t in tables)
+    )
+    return sum(len(t) for t in tables) * n_rounds
+
+
+def bench_llm_pipeline(concurrency_levels=(1, 2, 4, 8), n_games=4, n_rounds=5, **mock_config):
+    """
+    Débit de décisions LLM (décisions/s) et temps de bout en bout d'un scénario
+    (scheduler.run_scenarios, écriture Parquet comprise) contre le faux serveur Ollama,
+    pour plusieurs niveaux de concurrence. Aucun GPU nécessaire.
+    """
+    from llmClient import LLMClient
+    import scheduler
+
+    mock_config = dict(
+        {"latency_ms": 50, "gen_tps": 200, "parallel": max(concurrency_levels), "seed": 0},
+        **mock_config,
+    )
+    results = {}
+    with MockOllamaServer(port=0, **mock_config) as server:
+        for level in concurrency_levels:
+            client = LLMClient(server.url, max_in_flight=level)
+            start = time.perf_counter()
+            n_decisions = asyncio.run(_play_llm_games(n_games, n_rounds, client))
+            seconds = time.perf_counter() - start
+            results[f"llm.decisions.c{level}"] = {
+                "seconds": seconds,
+                "decisions_per_s": n_decisions / seconds,
+            }
+
+            client = LLMClient(server.url, max_in_flight=level)
+            with tempfile.TemporaryDirectory() as folder, contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                asyncio.run(
+                    scheduler.run_scenarios(
+                        [1, 2],
+                        n_games // 2,
+                        config={"endowment": 20, "multiplier": 1.6, "n_rounds": n_rounds},
+                        model="gemma2",
+                        cache=None,
+                        client=client,
+                        root=folder,
+                    )
+                )
+                seconds = time.perf_counter() - start
+            results[f"llm.scenario.c{level}"] = {"seconds": seconds}
+    return results
+
+
+def bench_llm_endpoints(endpoint_counts=(1, 2, 4), n_games=2, n_rounds=5, **mock_config):
+    """
+    Débit de décisions avec 1, 2, 4... faux serveurs derrière un LLMBackendPool.
+    Chaque faux serveur traite une requête à la fois (comme un GPU avec OLLAMA_NUM_PARALLEL=1) :
+    le débit doit augmenter avec le nombre de serveurs.
+    """
+    from llmClient import LLMBackendPool
+
+    mock_config = dict(
+        {"latency_ms": 50, "gen_tps": 200, "parallel": 1, "load_time": 0, "seed": 0},
+        **mock_config,
+    )
+    results = {}
+    for count in endpoint_counts:
+        with contextlib.ExitStack() as stack:
+            servers = [
+                stack.enter_context(MockOllamaServer(port=0, **mock_config)) for _ in range(count)
+            ]
+            pool = LLMBackendPool(
+                [{"host": server.url, "max_in_flight": 2} for server in servers],
+                health_interval=None,
+            )
+            start = time.perf_counter()
+            n_decisions = asyncio.run(_play_llm_games(n_games, n_rounds, pool))
+            seconds = time.perf_counter() - start
+            results[f"llm.endpoints.e{count}"] = {
+                "seconds": seconds,
+                "decisions_per_s": n_decisions / seconds,
+            }
+    return results
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks du dashboard IA et de la chaîne LLM")
+    parser.add_argument(
+        "--only", choices=["queries", "prompts", "llm"], action="append",
+        help="Ne lancer que certaines parties (répétable)",
+    )
+    parser.add_argument(
+        "--sizes", type=float, nargs="+", default=[1e5, 1e6, 1e7],
+        help="Tailles des jeux synthétiques pour les requêtes (ex : 1e5 1e6 1e7 1e8)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+        help="Niveaux de concurrence testés contre le faux serveur Ollama",
+    )
+    parser.add_argument(
+        "--endpoints", type=int, nargs="+", default=[1, 2, 4],
+        help="Nombres de faux serveurs testés derrière le pool (LLMBackendPool)",
+    )
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latence du faux serveur")
+    args = parser.parse_args()
+    parts = args.only or ["queries", "prompts", "llm"]
+
+    results = {}
+    if "queries" in parts:
+        results.update(bench_queries([int(size) for size in args.sizes]))
+        results.update(bench_storage([int(size) for size in args.sizes]))
+    if "prompts" in parts:
+        results.update(bench_prompts())
+    if "llm" in parts:
+        results.update(bench_llm_pipeline(args.concurrency, latency_ms=args.latency_ms))
+        results.update(bench_llm_endpoints(args.endpoints, latency_ms=args.latency_ms))
+
+    path = save_results(results, SUITE)
+    report(results, load_previous(SUITE, exclude=path))
+    print(f"\n💾 Résultats : {path}")
@@ -0,0 +1,149 @@
+import json
+import os
+import pickle
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- POINTS DE REPRISE (CHECKPOINTS) ---
+# Une simulation IA de 200 tours dure des heures : on sauvegarde régulièrement l'état
+# pour pouvoir reprendre après un crash, un Ctrl+C ou un redémarrage.
+#
+# Dossier d'une exécution (RunCheckpoint) :
+#   game_0003.parquet           <- lignes d'une partie terminée (fichier complet, lisible)
+#   game_0003_timings.parquet   <- temps de cette partie (GameProfiler), si activé
+#   game_0004.state.pkl         <- état de la partie en cours (GameCheckpoint)
+#   dataset_run.json            <- nom des fichiers "part-..." écrits dans le jeu de données
+#
+# Écritures atomiques (fichier temporaire + os.replace) : un crash pendant une sauvegarde
+# laisse l'ancien point de reprise intact.
+
+
+def _atomic_write(path, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class GameCheckpoint:
+    """
+    État d'une partie en cours, sauvegardé tous les `every` tours par le moteur
+    (play_public_goods_game) : historique, colonnes déjà remplies, scores cumulés,
+    état du générateur `random`, ordre des joueurs, temps mesurés, et `metadata`
+    (game_id...).
+    """
+
+    def __init__(self, path, every=1, metadata=None):
+        self.path = path
+        self.every = every
+        # Informations de l'appelant sauvegardées avec l'état (ex : game_id)
+        self.metadata = metadata
+
+    def load(self):
+        """État sauvegardé (dict), ou None s'il n'y a rien à reprendre."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            return pickle.load(f)
+
+    def save(self, state):
+        def write(tmp):
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        _atomic_write(self.path, write)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def restore_player_order(players, names):
+    """
+    Remet les joueurs dans l'ordre sauvegardé (la table est mélangée au début de chaque partie).
+    Deux joueurs de même nom sont interchangeables (même modèle, même persona).
+    """
+    remaining = list(players)
+    ordered = []
+    for name in names:
+        for i, player in enumerate(remaining):
+            if player.get_name() == name:
+                ordered.append(remaining.pop(i))
+                break
+        else:
+            raise ValueError(f"Joueur '{name}' du point de reprise absent de la table")
+    if remaining:
+        raise ValueError("La table ne correspond pas au point de reprise")
+    return ordered
+
+
+class RunCheckpoint:
+    """Points de reprise d'une exécution complète (plusieurs parties d'un scénario)."""
+
+    def __init__(self, folder, every=1):
+        self.folder = folder
+        self.every = every
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, game_num, suffix):
+        return os.path.join(self.folder, f"game_{game_num:04d}{suffix}")
+
+    def game(self, game_num, metadata=None):
+        """GameCheckpoint de la partie game_num (à passer au moteur)."""
+        return GameCheckpoint(self._path(game_num, ".state.pkl"), self.every, metadata)
+
+    def dataset_run(self, run_id, run_date):
+        """
+        (run_id, run_date) des fichiers écrits par l'exécution dans le jeu de données (voir
+        dataset.DatasetWriter) : ceux de l'exécution interrompue en cas de reprise, sinon ceux
+        donnés, enregistrés pour une reprise future. Les parties déjà terminées sont réécrites
+        à la reprise : elles remplacent alors le fichier de l'exécution interrompue au lieu
+        de s'y ajouter en double.
+        """
+        path = os.path.join(self.folder, "dataset_run.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            return saved["run_id"], saved["run_date"]
+
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump({"run_id": run_id, "run_date": run_date}, f)
+
+        _atomic_write(path, write)
+        return run_id, run_date
+
+    def has_game(self, game_num):
+        return os.path.exists(self._path(game_num, ".parquet"))
+
+    def n_completed(self):
+        return sum(
+            1
+            for name in os.listdir(self.folder)
+            if name.endswith(".parquet") and not name.endswith("_timings.parquet")
+        )
+
+    def save_game(self, game_num, batch, timings=None):
+        """Partie terminée : lignes (et temps) dans des fichiers complets, état en cours supprimé."""
+        if timings is not None:
+            _atomic_write(
+                self._path(game_num, "_timings.parquet"),
+                lambda tmp: pq.write_table(timings, tmp),
+            )
+        _atomic_write(
+            self._path(game_num, ".parquet"),
+            lambda tmp: pq.write_table(pa.Table.from_batches([batch]), tmp),
+        )
+        self.game(game_num).clear()
+
+    def load_game(self, game_num):
+        """(RecordBatch des lignes, table des temps ou None) d'une partie déjà terminée."""
+        table = pq.read_table(self._path(game_num, ".parquet"))
+        timings_path = self._path(game_num, "_timings.parquet")
+        timings = pq.read_table(timings_path) if os.path.exists(timings_path) else None
+        return table.combine_chunks().to_batches()[0], timings
+
+    def clear(self):
+        """Exécution terminée et sauvegardée : le dossier de reprise ne sert plus."""
+        shutil.rmtree(self.folder, ignore_errors=True)
@@ -1,17 +1,24 @@
-import pandas as pd
-import time
+import datetime
 import os
 import random
+import pyarrow as pa
 
 # Import des classes depuis ton fichier principal
 from mainGame import (
     play_public_goods_game,
-    GAME_CONFIG,
     LLMStrategy,
     Altruist,
     FreeRider,
     ConditionalCooperator,
+    RECORD_COLUMNS,
+    GameProfiler,
+    OLLAMA_AVAILABLE,
 )
+from llmCache import LLMResponseCache
+from llmClient import LLMBackendPool, LLMClient
+from llmResilience import CallPolicy
+from checkpoint import RunCheckpoint, restore_player_order
+from dataset import DATASET_ROOT, DEFAULT_ROW_GROUP_SIZE, DatasetWriter, new_run_id
 
 # --- CONFIGURATION DE LA GÉNÉRATION ---
 
@@ -23,52 +30,220 @@ AI_GAME_CONFIG = {
     "endowment": 20,
     "multiplier": 1.6,
     "n_rounds": 200,  # 200 tours suffisent pour voir une dynamique
+    "max_concurrency": 4,  # Les 4 joueurs IA d'un tour interrogent Ollama en même temps
 }
 
-# Nombre de répétitions par scénario
+# Nombre de répétitions par scénario (pour 50+ parties : voir scheduler.py)
 N_GAMES_PER_SCENARIO = 1
 
+# Mesure du temps passé par phase / par stratégie (table "timings" du jeu de données)
+PROFILE_GAMES = True
+
+# Cache disque des réponses LLM : "read_through", "record", "replay" (sans GPU) ou None.
+# Désactivé par défaut pour générer des données : la clé est (modèle, prompt, options), donc en
+# "read_through" deux sièges / parties qui voient le même prompt rejoueraient la MÊME réponse
+# tirée une seule fois (des copies au lieu de tirages indépendants). "record" enregistre sans
+# relire ; "read_through" / "replay" seulement pour rejouer volontairement (débogage, sans GPU).
+LLM_CACHE_MODE = None
+LLM_CACHE_FILE = "llm_cache.sqlite"
+
+# "single" : prompt d'origine (un message) ; "prefix" : partie fixe en message système,
+# réutilisée par le cache du serveur d'un tour à l'autre (moins de tokens de prompt à évaluer)
+LLM_PROMPT_MODE = "single"
+
+# "free" : texte libre lu par Regex ; "structured" : JSON imposé par schéma (entier entre 0 et
+# la dotation), quelques tokens générés au plus, relance si la réponse est illisible
+LLM_DECISION_MODE = "free"
+
+# Plusieurs serveurs Ollama (voir llmClient.LLMBackendPool) : chaque requête va au serveur
+# le moins chargé qui a le modèle. None = un seul serveur (OLLAMA_HOST).
+# Ex : [{"host": "http://gpu1:11434", "models": ["gemma2"], "max_in_flight": 2},
+#       {"host": "http://gpu2:11434"}]  (modèles découverts via /api/tags)
+# Penser à monter max_concurrency jusqu'à la capacité totale des serveurs.
+LLM_ENDPOINTS = None
+
+# Client Ollama partagé (connexions réutilisées, modèles gardés en mémoire entre les requêtes)
+# et politique d'appel : créés au lancement par llm_client() / llm_call_policy(), pas à l'import
+LLM_KEEP_ALIVE = "30m"
+LLM_HTTP_TIMEOUT = 120
+
+# Appels LLM : 60 s max par tentative, 2 nouvelles tentatives, disjoncteur par modèle
+# (hedge_percentile=95 : doublon d'une requête plus lente que 95 % des précédentes)
+LLM_CALL_POLICY_OPTIONS = {"timeout": 60, "retries": 2, "hedge_percentile": None}
+
+# Mise jouée quand le LLM n'a pas pu décider ("zero" ou "last"), marquée dans "llm_fallback"
+LLM_ON_ERROR = "last"
+
+
+# Points de reprise : état sauvegardé tous les CHECKPOINT_EVERY tours dans CHECKPOINT_DIR.
+# Après un crash ou un Ctrl+C, relancer le script reprend au dernier tour sauvegardé
+# (RESUME = False pour repartir de zéro).
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_EVERY = 1
+RESUME = True
+
+def to_record_batch(columns, **metadata):
+    """
+    Colonnes d'une partie -> pyarrow.RecordBatch, avec les métadonnées de la partie
+    (game_id, scenario...) ajoutées comme colonnes constantes.
+    """
+    n_rows = len(columns["round"])
+    arrays = {key: columns[key] for key in RECORD_COLUMNS}
+    for key, value in metadata.items():
+        arrays[key] = pa.repeat(value, n_rows)
+    return pa.RecordBatch.from_pydict(arrays)
+
+
+def llm_cache(mode=LLM_CACHE_MODE, path=LLM_CACHE_FILE):
+    """
+    Cache disque des réponses LLM (None si mode est None). Ouvert au lancement d'une
+    simulation, pas à l'import du module : importer createData ne crée aucun fichier.
+    """
+    return LLMResponseCache(path, mode=mode) if mode else None
+
+
+def llm_client(endpoints=LLM_ENDPOINTS):
+    """
+    Client Ollama partagé par les joueurs IA : LLMBackendPool si plusieurs serveurs sont
+    configurés, sinon LLMClient (None sans la librairie ollama). Aucune connexion n'est
+    ouverte à l'import du module.
+    """
+    if not OLLAMA_AVAILABLE:
+        return None
+    if endpoints:
+        return LLMBackendPool(
+            [
+                dict({"keep_alive": LLM_KEEP_ALIVE, "timeout": LLM_HTTP_TIMEOUT}, **endpoint)
+                for endpoint in endpoints
+            ]
+        )
+    return LLMClient(
+        keep_alive=LLM_KEEP_ALIVE,
+        max_in_flight=AI_GAME_CONFIG["max_concurrency"],
+        timeout=LLM_HTTP_TIMEOUT,
+    )
+
+
+def llm_call_policy(options=LLM_CALL_POLICY_OPTIONS):
+    """Politique d'appel partagée (llmResilience.CallPolicy), créée au lancement."""
+    return CallPolicy(**options)
 
-def run_ai_simulation(players):
-    all_records = []
-    game_counter = 0
 
-    print(f"🚀 Démarrage de la simulation IA avec le modèle : {MODEL_NAME}")
+def models_used(players, default=MODEL_NAME):
+    """Valeur de la colonne "model_used" : modèles des joueurs IA (ex : "gemma2+gemma3")."""
+    models = sorted({p.model_name for p in players if hasattr(p, "model_name")})
+    return "+".join(models) or default
+
+
+def iter_ai_simulation(
+    players, timings_writer=None, checkpoint=None, scenario="Full_IA_Psychology", run_id=None
+):
+    """
+    Joue les parties du scénario et renvoie les données au fil de l'eau :
+    un pyarrow.RecordBatch par partie terminée.
+    :param timings_writer: dataset.DatasetWriter optionnel (table "timings") qui reçoit
+                           les temps par phase et par stratégie de chaque partie (GameProfiler)
+    :param checkpoint: checkpoint.RunCheckpoint optionnel : chaque partie terminée y est
+                       sauvegardée, la partie en cours aussi (tous les `every` tours).
+                       Relancer avec le même dossier reprend là où on s'était arrêté.
+    :param run_id: Identifiant de l'exécution (dataset.new_run_id), repris dans les game_id :
+                   deux exécutions n'ont jamais les mêmes parties (voir dataset.game_key)
+    """
+    run_id = run_id or new_run_id()
+    model_used = models_used(players)
+    print(f"🚀 Démarrage de la simulation IA avec le modèle : {model_used} ({scenario})")
     print(
         f"⚙️ Config : {AI_GAME_CONFIG['n_rounds']} tours | {N_GAMES_PER_SCENARIO} parties par scénario"
     )
 
     for i in range(N_GAMES_PER_SCENARIO):
-        game_counter += 1
+        game_counter = i + 1
         print(f"   > Partie {i+1}/{N_GAMES_PER_SCENARIO}...", end=" ", flush=True)
 
-        # Mélanger l'ordre des joueurs autour de la table
-        random.shuffle(players)
+        # Partie déjà terminée lors d'une exécution précédente
+        if checkpoint is not None and checkpoint.has_game(i):
+            batch, timings = checkpoint.load_game(i)
+            print("✅ Déjà terminée (point de reprise).")
+            if timings_writer is not None and timings is not None:
+                for timings_batch in timings.to_batches():
+                    timings_writer.write(timings_batch, model_used, scenario)
+            yield batch
+            continue
+
+        game_id = f"IA_S1_{run_id}_{game_counter}"
+        game_checkpoint = None
+        state = None
+        if checkpoint is not None:
+            game_checkpoint = checkpoint.game(i, metadata={"game_id": game_id})
+            state = game_checkpoint.load()
 
-        data = play_public_goods_game(players, AI_GAME_CONFIG)
+        if state is not None:
+            # Reprise : même game_id et même ordre des joueurs que la partie interrompue
+            game_id = state["metadata"]["game_id"]
+            game_checkpoint.metadata = state["metadata"]
+            players = restore_player_order(players, state["players"])
+        else:
+            # Mélanger l'ordre des joueurs autour de la table
+            random.shuffle(players)
 
-        # Ajout métadonnées
-        for row in data:
-            row["game_id"] = f"IA_S1_{int(time.time())}_{game_counter}"
-            row["scenario"] = "Full_IA_Psychology"
-            row["model_used"] = MODEL_NAME
-            all_records.append(row)
+        profiler = None
+        if timings_writer is not None:
+            profiler = GameProfiler(players, AI_GAME_CONFIG["n_rounds"])
+
+        data = play_public_goods_game(
+            players, AI_GAME_CONFIG, profiler=profiler, checkpoint=game_checkpoint
+        )
         print("✅ Terminée.")
 
-    return pd.DataFrame(all_records)
+        # Ajout métadonnées (colonnes constantes, sans toucher aux lignes)
+        batch = to_record_batch(
+            data,
+            game_id=game_id,
+            scenario=scenario,
+            model_used=model_used,
+        )
+        timings = profiler.to_table(game_id) if profiler is not None else None
+        if checkpoint is not None:
+            checkpoint.save_game(i, batch, timings)
+
+        if timings is not None:
+            for timings_batch in timings.to_batches():
+                timings_writer.write(timings_batch, model_used, scenario)
 
+        yield batch
 
-def save_ia_data(df, folder="data", filename="simulation_ia_results.parquet"):
-    if not os.path.exists(folder):
-        os.makedirs(folder)
 
-    filepath = os.path.join(folder, filename)
-    df.to_parquet(filepath, index=False)
-    print(f"\n🎉 Sauvegarde terminée : {filepath}")
-    print(f"📊 Total : {len(df)} lignes générées.")
+def run_ai_simulation(players):
+    """Comme iter_ai_simulation, mais retourne un DataFrame global."""
+    return pa.Table.from_batches(list(iter_ai_simulation(players))).to_pandas()
+
+
+def save_ia_data(
+    batches,
+    root=DATASET_ROOT,
+    run_date=None,
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    run_id=None,
+):
+    """
+    Sauvegarde en Parquet au fil de l'eau, par row groups de row_group_size lignes : la
+    mémoire ne dépend pas du nombre de parties. Les lignes vont dans la partition modèle /
+    scénario / date du jeu de données (voir dataset.py). Le fichier n'apparaît qu'à la
+    fermeture : une partie IA coûte cher, ce sont les points de reprise (iter_ai_simulation)
+    qui la protègent d'un crash.
+    """
+    with DatasetWriter(root, "results", run_date, row_group_size, run_id) as writer:
+        for batch in batches:
+            writer.write(batch)
+
+    for path in writer.paths:
+        print(f"\n🎉 Sauvegarde terminée : {path}")
+    print(f"📊 Total : {writer.n_rows} lignes générées.")
 
 
 if __name__ == "__main__":
+    cache, client, call_policy = llm_cache(), llm_client(), llm_call_policy()
+
     # 1. Générer
     try:
         # players = [
@@ -79,7 +254,7 @@ if __name__ == "__main__":
         #         model_name=MODEL_NAME, persona="adaptive"
         #     ),  # Un 2ème adaptatif pour faire la majorité
         # ]
-        # filename = "simulation_ia_results1.parquet"
+        # scenario = "Full_IA_Psychology"
 
         # players = [
         #     LLMStrategy(model_name=MODEL_NAME, persona="adaptive"),  # Notre cobaye
@@ -87,7 +262,7 @@ if __name__ == "__main__":
         #     FreeRider(),  # Le méchant (code)
         #     Altruist(),  # Le gentil (code)
         # ]
-        # filename = "simulation_ia_results2.parquet"
+        # scenario = "IA_vs_Code"
 
         # players = [
         #     LLMStrategy(model_name=MODEL_NAME, persona="altruist"),
@@ -95,23 +270,51 @@ if __name__ == "__main__":
         #     LLMStrategy(model_name=MODEL_NAME, persona="greedy"),
         #     LLMStrategy(model_name=MODEL_NAME, persona="greedy"),
         # ]
-        # filename = "simulation_ia_results3.parquet"
+        # scenario = "Altruist_vs_Greedy"
 
+        # Réglages communs à tous les sièges LLM (cache, client, politique d'appel...)
+        llm_options = dict(
+            cache=cache,
+            client=client,
+            prompt_mode=LLM_PROMPT_MODE,
+            decision_mode=LLM_DECISION_MODE,
+            call_policy=call_policy,
+            on_error=LLM_ON_ERROR,
+        )
+        personas = ["adaptive", "adaptive", "adaptive", "adaptive"]
         players = [
-            LLMStrategy(model_name="gemma2", persona="adaptive"),
-            LLMStrategy(model_name="gemma2", persona="adaptive"),
-            LLMStrategy(model_name="gemma2", persona="adaptive"),
-            LLMStrategy(model_name="gemma2", persona="adaptive"),
+            LLMStrategy(model_name="gemma2", persona=persona, **llm_options) for persona in personas
         ]
-        filename = "simulation_ia_results4.parquet"
+        scenario = "All_Adaptive"
 
-        df_ia = run_ai_simulation(players)
+        # 2. Sauvegarder au fil de l'eau (partie par partie)
+        # Chaque exécution ajoute ses fichiers dans DATASET_ROOT, rangés par modèle, scénario
+        # et date (dataset/results/model_used=.../scenario=.../run_date=...) : plus de tri à
+        # la main, et rien n'écrase les données précédentes.
+        checkpoint = RunCheckpoint(os.path.join(CHECKPOINT_DIR, scenario), CHECKPOINT_EVERY)
+        if not RESUME:
+            checkpoint.clear()
+            checkpoint = RunCheckpoint(checkpoint.folder, CHECKPOINT_EVERY)
 
-        # 2. Sauvegarder
-        # On sauvegarde dans un fichier DIFFÉRENT de la simulation pure code
-        # pour ne pas écraser tes précédentes données.
-        save_ia_data(df_ia, filename=filename)
+        # Même nom de fichiers que l'exécution interrompue en cas de reprise (pas de doublons)
+        run_id, run_date = checkpoint.dataset_run(
+            new_run_id(), datetime.date.today().isoformat()
+        )
+        with DatasetWriter(DATASET_ROOT, "timings", run_date, run_id=run_id) as timings_writer:
+            save_ia_data(
+                iter_ai_simulation(
+                    players, timings_writer if PROFILE_GAMES else None, checkpoint, scenario,
+                    run_id,
+                ),
+                root=DATASET_ROOT,
+                run_date=run_date,
+                run_id=run_id,
+            )
+        # Tout est dans le jeu de données : les points de reprise ne servent plus
+        checkpoint.clear()
 
     except KeyboardInterrupt:
         print("\n🛑 Interruption par l'utilisateur.")
-        # Si tu coupes le script parce que c'est trop long, ça plantera pas tout
+        # Si tu coupes le script parce que c'est trop long, ça plantera pas tout :
+        # les parties terminées et le dernier tour joué sont dans CHECKPOINT_DIR,
+        # il suffit de relancer le script pour reprendre
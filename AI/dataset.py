@@ -0,0 +1,472 @@
+import argparse
+import datetime
+import hashlib
+import os
+import re
+import time
+import uuid
+import sys
+from collections import Counter
+from urllib.parse import quote, unquote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Modules communs aux dossiers AI/ et Not_AI/ (dossier common/ à la racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+
+from parquetStream import ParquetStreamWriter
+
+# --- JEU DE DONNÉES PARTITIONNÉ (HIVE) ---
+# Avant : un fichier par scénario (data/simulation_ia_results{N}.parquet), déplacé ensuite
+# à la main dans data_gemma2/, data_gemma3/... Désormais chaque exécution écrit ses parties
+# dans un dossier par modèle, scénario et date de lancement :
+#
+#   dataset/results/model_used=gemma2/scenario=All_Adaptive/run_date=2026-10-17/part-...parquet
+#   dataset/games/...    (une ligne par partie, même découpage)
+#   dataset/timings/...  (temps du GameProfiler, même découpage)
+#
+# Les colonnes de partition ne sont pas répétées dans les fichiers : DuckDB les relit depuis le
+# chemin (hive_partitioning) et, avec un filtre sur le modèle ou le scénario, n'ouvre que les
+# dossiers concernés (élagage des partitions). Chaque exécution ajoute ses propres fichiers
+# "part-..." : rien n'est jamais réécrit, plusieurs exécutions peuvent tourner en même temps.
+
+DATASET_ROOT = "dataset"
+TABLES = ("results", "games", "timings")
+PARTITION_KEYS = ("model_used", "scenario", "run_date")
+# Types des colonnes de partition (sinon DuckDB devine : un modèle "3" deviendrait un entier)
+HIVE_TYPES = "{'model_used': VARCHAR, 'scenario': VARCHAR, 'run_date': DATE}"
+
+# --- SCHÉMA COMPACT ---
+# Les lignes (un joueur, un tour) ne gardent que ce qui varie, avec des types étroits ; tout ce
+# qui est constant sur une partie (game_id, dotation, facteur, nombre de joueurs) est rangé
+# une seule fois dans "games", retrouvé par jointure sur une clé entière (voir source_sql).
+# Le moteur produit toujours des colonnes larges (int64, float64) : la conversion est faite
+# à l'écriture (compact_results), une valeur qui ne tient pas dans son type lève une erreur.
+RESULTS_SCHEMA = pa.schema(
+    [
+        ("game_key", pa.int64()),
+        ("round", pa.uint16()),
+        ("player_id", pa.uint8()),
+        ("strategy", pa.dictionary(pa.int16(), pa.string())),
+        ("contribution", pa.uint8()),
+        ("kept_private", pa.uint8()),
+        ("pot_share_received", pa.float32()),
+        ("round_gain_total", pa.float32()),
+        # float64 : un score cumulé de quelques milliers perdrait ~1e-4 en float32
+        ("cumulative_score", pa.float64()),
+        ("group_total_pot", pa.uint16()),
+        ("llm_fallback", pa.bool_()),
+    ]
+)
+GAMES_SCHEMA = pa.schema(
+    [
+        ("game_key", pa.int64()),
+        ("game_id", pa.string()),
+        ("endowment", pa.uint8()),
+        # float64 : en float32, 1.6 se relirait 1.600000023841858 (filtres d'égalité faux)
+        ("group_synergy_factor", pa.float64()),
+        ("n_players", pa.uint8()),
+        ("n_rounds", pa.uint16()),
+    ]
+)
+
+# Nombre de lignes par row group Parquet (= taille max du tampon d'écriture)
+DEFAULT_ROW_GROUP_SIZE = 64_000
+
+# Anciens fichiers triés à la main -> (modèle, étiquette du scénario) ; leur colonne "scenario"
+# vaut toujours "Full_IA_Psychology" et leur "model_used" n'est pas toujours juste
+LEGACY_FILES = {
+    "data_gemma2/simulation_ia_results1.parquet": ("gemma2", "Full_IA_Psychology"),
+    "data_gemma2/simulation_ia_results2.parquet": ("gemma2", "IA_vs_Code"),
+    "data_gemma2/simulation_ia_results3.parquet": ("gemma2", "Altruist_vs_Greedy"),
+    "data_gemma2/simulation_ia_results4.parquet": ("gemma2", "All_Adaptive"),
+    "data_gemma3/simulation_ia_results1.parquet": ("gemma3", "Full_IA_Psychology"),
+    "data_gemma3/simulation_ia_results2.parquet": ("gemma3", "IA_vs_Code"),
+    "data_gemma3/simulation_ia_results3.parquet": ("gemma3", "Altruist_vs_Greedy"),
+    "data_gemma3/simulation_ia_results4.parquet": ("gemma3", "All_Adaptive"),
+    "data_gemma2_vs_3/simulation_ia_results4.parquet": ("gemma2+gemma3", "Gemma2_vs_Gemma3"),
+}
+
+
+# --- ÉCRITURE ---
+
+
+def game_key(game_id):
+    """
+    Clé entière (int64) d'une partie, tirée de son game_id : la même pour toutes les
+    exécutions et toutes les machines, sans registre central à tenir à jour.
+    """
+    digest = hashlib.blake2b(game_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def compact_results(table):
+    """
+    Lignes "larges" (to_record_batch : constantes de partie sur chaque ligne, types devinés)
+    -> (lignes au schéma RESULTS_SCHEMA, une ligne par partie au schéma GAMES_SCHEMA).
+    Les colonnes de partition (model_used, scenario) éventuelles sont ignorées.
+    """
+    encoded = table["game_id"].combine_chunks().dictionary_encode()
+    game_ids = encoded.dictionary.to_pylist()
+    keys = pa.array([game_key(game_id) for game_id in game_ids], pa.int64())
+
+    columns = {"game_key": keys.take(encoded.indices)}
+    for field in RESULTS_SCHEMA:
+        if field.name == "game_key":
+            continue
+        if field.name in table.column_names:
+            columns[field.name] = table[field.name].cast(field.type)
+        else:
+            # Fichier écrit avant l'ajout de la colonne (ex : llm_fallback)
+            columns[field.name] = pa.nulls(table.num_rows, field.type)
+    rows = pa.table(columns, schema=RESULTS_SCHEMA)
+
+    per_game = table.group_by("game_id").aggregate(
+        [
+            ("endowment", "max"),
+            ("group_synergy_factor", "max"),
+            ("player_id", "max"),
+            ("round", "max"),
+        ]
+    )
+    games = pa.table(
+        {
+            "game_key": [game_key(game_id) for game_id in per_game["game_id"].to_pylist()],
+            "game_id": per_game["game_id"],
+            "endowment": per_game["endowment_max"],
+            "group_synergy_factor": per_game["group_synergy_factor_max"],
+            # Joueurs numérotés 0..n-1 : le max reste juste sur une partie coupée en plusieurs lots
+            "n_players": pc.add(per_game["player_id_max"], 1),
+            "n_rounds": per_game["round_max"],
+        }
+    ).cast(GAMES_SCHEMA)
+    return rows, games
+
+
+def new_run_id():
+    """Nom commun aux fichiers d'une exécution, unique même pour deux lancements simultanés."""
+    return f"{time.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def partition_dir(root, table, model_used, scenario, run_date):
+    """Dossier d'une partition ; les valeurs sont encodées comme dans une URL ("/" -> "%2F")."""
+    values = (model_used, scenario, run_date)
+    return os.path.join(
+        root,
+        table,
+        *(f"{key}={quote(str(value), safe='+-_.')}" for key, value in zip(PARTITION_KEYS, values)),
+    )
+
+
+class DatasetWriter:
+    """
+    Écrit les parties d'une exécution dans une table du jeu partitionné : un ParquetStreamWriter
+    (donc un fichier "part-...") par partition rencontrée, ouvert à la première partie.
+    :param table: "results" (lignes du jeu, au schéma compact ; la table "games" est remplie
+                  en même temps) ou "timings" (temps du GameProfiler)
+    :param run_date: Date de la partition (par défaut : aujourd'hui, au lancement de l'exécution,
+                     pour qu'une exécution à cheval sur minuit reste dans une seule partition)
+    :param run_id: Nom des fichiers "part-<run_id>.parquet" (par défaut : nouveau, new_run_id)
+    """
+
+    def __init__(
+        self, root=DATASET_ROOT, table="results", run_date=None,
+        row_group_size=DEFAULT_ROW_GROUP_SIZE, run_id=None,
+    ):
+        if table not in TABLES:
+            raise ValueError(f"Table inconnue : {table} (attendu : {TABLES})")
+        self.root = root
+        self.table = table
+        self.run_date = run_date or datetime.date.today().isoformat()
+        self.row_group_size = row_group_size
+        # Nom des fichiers "part-..." de l'exécution. Une reprise sur point de reprise redonne
+        # celui de l'exécution interrompue (RunCheckpoint.dataset_run) : ses fichiers sont
+        # réécrits en entier au lieu de doubler les parties déjà terminées.
+        self.run_id = run_id or new_run_id()
+        self._writers = {}
+        self.games = None
+        # Lignes "games" par partition puis par game_key, écrites à la fermeture : une partie
+        # arrivée en plusieurs lots n'y figure qu'une fois, avec son nombre de manches complet
+        self._pending_games = {}
+        if table == "results":
+            self.games = DatasetWriter(root, "games", self.run_date, row_group_size, self.run_id)
+
+    @property
+    def paths(self):
+        return [writer.filename for writer in self._writers.values()]
+
+    @property
+    def n_rows(self):
+        return sum(writer.n_rows + writer._pending_rows for writer in self._writers.values())
+
+    def write(self, batch, model_used=None, scenario=None):
+        """
+        Ajoute un RecordBatch. Modèle et scénario sont lus dans les colonnes du même nom
+        (retirées des lignes écrites), ou donnés ici quand le batch ne les contient pas
+        (temps du GameProfiler).
+        """
+        table = pa.Table.from_batches([batch])
+        if model_used is not None and scenario is not None:
+            self._write_partition(table, model_used, scenario)
+            return
+        # Une partie = un seul couple (modèle, scénario) ; on découpe quand même au besoin
+        groups = table.group_by(["model_used", "scenario"]).aggregate([]).to_pylist()
+        for group in groups:
+            rows = table
+            if len(groups) > 1:
+                rows = table.filter(
+                    pc.and_(
+                        pc.equal(table["model_used"], group["model_used"]),
+                        pc.equal(table["scenario"], group["scenario"]),
+                    )
+                )
+            rows = rows.drop_columns(["model_used", "scenario"])
+            self._write_partition(rows, group["model_used"], group["scenario"])
+
+    def _write_partition(self, table, model_used, scenario):
+        if self.table == "results":
+            table, games = compact_results(table)
+            pending = self._pending_games.setdefault((model_used, scenario), {})
+            for game in games.to_pylist():
+                known = pending.setdefault(game["game_key"], game)
+                for column in ("endowment", "group_synergy_factor", "n_players", "n_rounds"):
+                    known[column] = max(known[column], game[column])
+        writer = self._writer(model_used, scenario)
+        for part in table.combine_chunks().to_batches():
+            writer.write(part)
+
+    def _writer(self, model_used, scenario):
+        key = (model_used, scenario)
+        if key not in self._writers:
+            folder = partition_dir(self.root, self.table, model_used, scenario, self.run_date)
+            os.makedirs(folder, exist_ok=True)
+            self._writers[key] = ParquetStreamWriter(
+                os.path.join(folder, f"part-{self.run_id}.parquet"), self.row_group_size
+            )
+        return self._writers[key]
+
+    def flush(self):
+        # "games" n'est écrite qu'à la fermeture (voir _pending_games)
+        for writer in self._writers.values():
+            writer.flush()
+
+    def close(self):
+        if self.games is not None:
+            for (model_used, scenario), pending in self._pending_games.items():
+                games = pa.Table.from_pylist(list(pending.values()), schema=GAMES_SCHEMA)
+                self.games._write_partition(games, model_used, scenario)
+            self._pending_games = {}
+            self.games.close()
+        for writer in self._writers.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# --- LECTURE (DUCKDB) ---
+
+
+def _sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def scan_sql(root=DATASET_ROOT, table="results", **filters):
+    """
+    Lecture brute d'une table du jeu partitionné (sans jointure).
+    Les filtres portent sur les colonnes de partition (une valeur ou une liste de valeurs,
+    None = pas de filtre) : DuckDB n'ouvre que les fichiers des partitions retenues.
+    """
+    unknown = set(filters) - set(PARTITION_KEYS)
+    if unknown:
+        raise ValueError(f"Filtres hors partitions : {sorted(unknown)} (attendu : {PARTITION_KEYS})")
+    pattern = os.path.join(root, table, "*", "*", "*", "*.parquet")
+    # Pas de union_by_name : il ferait ouvrir le pied de page de TOUS les fichiers, élagage ou
+    # non. Les colonnes sont fixées par RESULTS_SCHEMA / GAMES_SCHEMA (anciens fichiers : voir
+    # compact_dataset) ; les fichiers en cours d'écriture (".tmp") échappent au motif.
+    scan = (
+        f"read_parquet({_sql_literal(pattern)}, hive_partitioning = true, "
+        f"hive_types = {HIVE_TYPES})"
+    )
+    conditions = []
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(f"{key} IN ({', '.join(_sql_literal(v) for v in value)})")
+        else:
+            conditions.append(f"{key} = {_sql_literal(value)}")
+    if not conditions:
+        return scan
+    return f"(SELECT * FROM {scan} WHERE {' AND '.join(conditions)})"
+
+
+def source_sql(root=DATASET_ROOT, table="results", **filters):
+    """
+    Expression à mettre après FROM (voir queries.py) pour lire une table du jeu partitionné.
+    "results" est rejointe à "games" : les requêtes voient les colonnes habituelles (game_id,
+    endowment, group_synergy_factor...) sans qu'elles soient stockées sur chaque ligne.
+    Ex : source_sql(model_used="gemma3", scenario=["IA_vs_Code", "All_Adaptive"])
+    """
+    if table != "results":
+        return scan_sql(root, table, **filters)
+    return f"""(
+        SELECT * EXCLUDE (game_key)
+        FROM {scan_sql(root, "results", **filters)} AS results
+        JOIN {scan_sql(root, "games", **filters)} AS games
+        USING (game_key, {", ".join(PARTITION_KEYS)})
+    )"""
+
+
+def list_partitions(root=DATASET_ROOT, table="results"):
+    """
+    Partitions présentes (lecture des noms de dossiers seulement, aucun fichier ouvert) :
+    liste de dicts {model_used, scenario, run_date, files}, triée.
+    """
+    partitions = []
+    base = os.path.join(root, table)
+    if not os.path.isdir(base):
+        return partitions
+    for dirpath, _, filenames in os.walk(base):
+        files = [name for name in filenames if name.endswith(".parquet")]
+        parts = os.path.relpath(dirpath, base).split(os.sep)
+        if not files or len(parts) != len(PARTITION_KEYS):
+            continue
+        partition = {}
+        for key, part in zip(PARTITION_KEYS, parts):
+            name, _, value = part.partition("=")
+            if name != key:
+                break
+            partition[key] = unquote(value)
+        else:
+            partition["files"] = len(files)
+            partitions.append(partition)
+    return sorted(partitions, key=lambda p: tuple(p[key] for key in PARTITION_KEYS))
+
+
+# --- MIGRATION DES ANCIENS FICHIERS ---
+
+
+def _legacy_run_date(table):
+    """Date de la partie d'après son game_id ("IA_S1_<horodatage>_<n>"), sinon aujourd'hui."""
+    match = re.match(r"IA_S\d+_(\d+)_", table["game_id"][0].as_py()) if table.num_rows else None
+    if match is None:
+        return datetime.date.today().isoformat()
+    return datetime.date.fromtimestamp(int(match.group(1))).isoformat()
+
+
+def migrate_legacy(root=DATASET_ROOT, files=None, base_dir="."):
+    """
+    Copie les anciens fichiers (LEGACY_FILES par défaut) dans le jeu partitionné, avec le bon
+    modèle et le bon scénario. Les fichiers d'origine ne sont pas modifiés.
+    Relancer la migration ne duplique rien : une partition déjà remplie est sautée.
+    :return: Nombre de lignes copiées
+    """
+    files = LEGACY_FILES if files is None else files
+    n_rows = 0
+    for path, (model_used, scenario) in files.items():
+        full_path = os.path.join(base_dir, path)
+        if not os.path.exists(full_path):
+            print(f"   ⚠️ Absent, ignoré : {full_path}")
+            continue
+        table = pq.read_table(full_path)
+        run_date = _legacy_run_date(table)
+        folder = partition_dir(root, "results", model_used, scenario, run_date)
+        if os.path.isdir(folder) and os.listdir(folder):
+            print(f"   ⏭️ Déjà migré : {path}")
+            continue
+        table = table.drop_columns([c for c in ("model_used", "scenario") if c in table.column_names])
+        with DatasetWriter(root, "results", run_date) as writer:
+            for batch in table.to_batches():
+                writer.write(batch, model_used=model_used, scenario=scenario)
+        n_rows += table.num_rows
+        print(f"   ✅ {path} -> {folder}")
+
+        timings_path = full_path.replace(".parquet", "_timings.parquet")
+        if os.path.exists(timings_path):
+            with DatasetWriter(root, "timings", run_date) as writer:
+                for batch in pq.read_table(timings_path).to_batches():
+                    writer.write(batch, model_used=model_used, scenario=scenario)
+    return n_rows
+
+
+def _check_unique_games(games, games_dir, exclude=None):
+    """
+    Vérifie qu'aucune partie n'apparaît deux fois dans la partition "games" (la jointure
+    multiplierait ses lignes) : ni dans `games`, ni dans les fichiers déjà présents.
+    :param exclude: Fichier de games_dir ignoré (celui que `games` va remplacer)
+    """
+    counts = Counter(games["game_key"].to_pylist())
+    for name in os.listdir(games_dir):
+        if name.endswith(".parquet") and name != exclude:
+            existing = pq.ParquetFile(os.path.join(games_dir, name)).read(["game_key"])
+            counts.update(set(existing["game_key"].to_pylist()) & counts.keys())
+    duplicates = [key for key, count in counts.items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Parties en double dans {games_dir} (game_key) : {sorted(duplicates)[:5]}")
+
+
+def compact_dataset(root=DATASET_ROOT):
+    """
+    Passe au schéma compact les fichiers "results" écrits avant lui (game_id, dotation...
+    sur chaque ligne) : lignes réécrites sous le même nom, parties ajoutées à "games".
+    Les fichiers déjà compacts sont laissés tels quels (relancer ne change rien).
+    Écritures atomiques : "games" d'abord, puis remplacement du fichier de lignes.
+    :return: (fichiers convertis, octets avant, octets après)
+    """
+    n_files, size_before, size_after = 0, 0, 0
+    base = os.path.join(root, "results")
+    for dirpath, _, filenames in os.walk(base):
+        for name in sorted(filenames):
+            if not name.endswith(".parquet"):
+                continue
+            path = os.path.join(dirpath, name)
+            if "game_key" in pq.read_schema(path).names:
+                continue
+            # ParquetFile : lecture du seul fichier, sans interpréter les dossiers du chemin
+            rows, games = compact_results(pq.ParquetFile(path).read())
+            games_dir = os.path.join(root, "games", os.path.relpath(dirpath, base))
+            os.makedirs(games_dir, exist_ok=True)
+            games_path = os.path.join(games_dir, name)
+            _check_unique_games(games, games_dir, exclude=name)
+            pq.write_table(games, games_path + ".tmp")
+            os.replace(games_path + ".tmp", games_path)
+            size_before += os.path.getsize(path)
+            pq.write_table(rows, path + ".tmp", row_group_size=DEFAULT_ROW_GROUP_SIZE)
+            os.replace(path + ".tmp", path)
+            size_after += os.path.getsize(path) + os.path.getsize(games_path)
+            n_files += 1
+    return n_files, size_before, size_after
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jeu de données partitionné (modèle/scénario/date)")
+    parser.add_argument("--root", default=DATASET_ROOT)
+    parser.add_argument(
+        "--migrate", action="store_true",
+        help="Copie les anciens dossiers data_gemma2/, data_gemma3/... dans le jeu partitionné "
+        "et passe au schéma compact (table games) les fichiers écrits avant lui",
+    )
+    args = parser.parse_args()
+
+    if args.migrate:
+        print(f"📦 Migration des anciens fichiers vers {args.root}/")
+        print(f"📊 {migrate_legacy(args.root)} lignes copiées.")
+        n_files, size_before, size_after = compact_dataset(args.root)
+        if n_files:
+            print(
+                f"🗜️ {n_files} fichier(s) au schéma compact : {size_before / 1e6:.2f} Mo -> "
+                f"{size_after / 1e6:.2f} Mo"
+            )
+    for table in TABLES:
+        partitions = list_partitions(args.root, table)
+        print(f"\n🗂️ {table} : {len(partitions)} partition(s)")
+        for p in partitions:
+            print(f"   {p['model_used']:<16} {p['scenario']:<22} {p['run_date']}  ({p['files']} fichier(s))")
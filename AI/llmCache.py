@@ -0,0 +1,169 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# --- CACHE PERSISTANT DES RÉPONSES LLM ---
+# Les mêmes prompts reviennent souvent (le prompt ne regarde que les 3 derniers tours) :
+# on garde les réponses sur disque (SQLite), avec une clé = (modèle, hash du prompt, options).
+#
+# Modes :
+# - "read_through" : on lit le cache, on appelle le LLM seulement en cas d'absence (et on stocke)
+# - "record"       : on appelle toujours le LLM et on enregistre la réponse (rafraîchit le cache)
+# - "replay"       : on ne lit QUE le cache, jamais de GPU ; une absence lève CacheMiss
+#                    (pour régénérer un dataset ou déboguer le pipeline de façon reproductible)
+
+CACHE_MODES = ("read_through", "record", "replay")
+
+
+class CacheMiss(LookupError):
+    """Réponse absente du cache en mode "replay"."""
+
+
+def _to_dict(response):
+    """Réponse ollama (dict ou objet pydantic) -> dict sérialisable en JSON."""
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    return dict(response)
+
+
+class LLMResponseCache:
+    """
+    Cache disque des réponses de ollama.chat, avec taille maximale et éviction LRU
+    (les entrées les moins récemment lues sont supprimées en premier).
+    """
+
+    def __init__(self, path="llm_cache.sqlite", mode="read_through", max_entries=200_000):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Mode de cache inconnu : {mode} (attendu : {CACHE_MODES})")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # Le cache peut être partagé entre coroutines / threads : une connexion + un verrou
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access INTEGER NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)"
+        )
+        self._db.commit()
+        count, clock = self._db.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_access), 0) FROM responses"
+        ).fetchone()
+        self._count = count
+        self._clock = clock  # Compteur logique d'accès (ordre LRU)
+
+    @staticmethod
+    def make_key(model, messages, options=None, format=None):
+        """Clé = modèle + hash (messages, options de génération, schéma de sortie éventuel)."""
+        request = {"messages": messages, "options": options or {}}
+        if format is not None:
+            request["format"] = format
+        payload = json.dumps(request, sort_keys=True)
+        return f"{model}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (self._tick(), key)
+            )
+            self._db.commit()
+            return json.loads(row[0])
+
+    def put(self, key, model, response):
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, json.dumps(_to_dict(response)), time.time(), self._tick()),
+            )
+            if not exists:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées (garde 90 % de max_entries)."""
+        keep = int(self.max_entries * 0.9)
+        self._db.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM responses ORDER BY last_access ASC LIMIT ?
+            )
+            """,
+            (self._count - keep,),
+        )
+        self._count = keep
+
+    def _lookup(self, key, model):
+        """Réponse en cache selon le mode (None = il faut appeler le LLM)."""
+        if self.mode == "record":
+            return None
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            cached["cached"] = True  # Rien n'a été évalué par le serveur pour cette réponse
+            return cached
+        self.misses += 1
+        if self.mode == "replay":
+            raise CacheMiss(f"Réponse absente du cache pour {model} (mode replay)")
+        return None
+
+    def chat(self, model, messages, call, options=None, format=None):
+        """
+        Point d'entrée utilisé par LLMStrategy.
+        :param call: Fonction sans argument qui fait le vrai appel au LLM
+        :return: Réponse (dict) issue du cache ou du LLM
+        """
+        key = self.make_key(model, messages, options, format)
+        cached = self._lookup(key, model)
+        if cached is not None:
+            return cached
+
+        response = _to_dict(call())
+        self.put(key, model, response)
+        return response
+
+    async def chat_async(self, model, messages, call, options=None, format=None):
+        """Comme chat(), mais `call` est une coroutine (ollama.AsyncClient.chat)."""
+        key = self.make_key(model, messages, options, format)
+        cached = self._lookup(key, model)
+        if cached is not None:
+            return cached
+
+        response = _to_dict(await call())
+        self.put(key, model, response)
+        return response
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._db.close()
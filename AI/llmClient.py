@@ -0,0 +1,349 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+
+try:
+    import ollama
+except ImportError:
+    ollama = None
+
+# --- COUCHE CLIENT OLLAMA ---
+# - Un client persistant par hôte (connexions HTTP réutilisées) au lieu de ollama.chat
+#   (client global du module, sans politique de keep-alive).
+# - keep_alive : durée pendant laquelle Ollama garde le modèle en mémoire après une requête.
+# - Ordonnancement par "affinité de modèle" : les requêtes en attente sont groupées par
+#   modèle, on sert le modèle déjà chargé tant qu'il a des requêtes en attente, et on ne
+#   change de modèle qu'une fois les requêtes en cours terminées. Avec gemma2 et gemma3 à
+#   la même table et peu de mémoire, ça évite de recharger les modèles à chaque requête.
+# - Pool de serveurs (LLMBackendPool) : plusieurs serveurs Ollama, chacun avec ses modèles
+#   et son plafond de requêtes ; chaque requête va au serveur le moins chargé.
+
+DEFAULT_KEEP_ALIVE = "30m"
+
+
+class ModelAffinityScheduler:
+    """
+    Limite les requêtes en vol (max_in_flight) et choisit quelle requête en attente
+    passe ensuite : d'abord le modèle actif, au plus `max_streak` fois d'affilée quand
+    d'autres modèles attendent (pour ne pas les affamer).
+    """
+
+    def __init__(self, max_in_flight=8, max_streak=32):
+        self.max_in_flight = max_in_flight
+        self.max_streak = max_streak
+        self.active_model = None
+        self.in_flight = 0
+        self.streak = 0
+        self.switches = 0  # Nombre de changements de modèle (≈ rechargements évités ou subis)
+        self._waiting = OrderedDict()  # modèle -> deque de futures, dans l'ordre d'arrivée
+
+    def _can_start(self, model):
+        if self.in_flight >= self.max_in_flight:
+            return False
+        # Changement de modèle seulement quand plus rien ne tourne sur l'ancien
+        return model == self.active_model or self.in_flight == 0
+
+    def _grant(self, model):
+        if model == self.active_model:
+            self.streak += 1
+        else:
+            if self.active_model is not None:
+                self.switches += 1
+            self.active_model = model
+            self.streak = 1
+        self.in_flight += 1
+
+    def _next_model(self):
+        others = [m for m in self._waiting if m != self.active_model]
+        if self.active_model in self._waiting and (not others or self.streak < self.max_streak):
+            return self.active_model
+        # Modèle suivant : celui qui attend depuis le plus longtemps
+        return others[0]
+
+    def _dispatch(self):
+        while self._waiting:
+            model = self._next_model()
+            if not self._can_start(model):
+                return
+            queue = self._waiting[model]
+            future = queue.popleft()
+            if not queue:
+                del self._waiting[model]
+            if future.cancelled():
+                continue
+            self._grant(model)
+            future.set_result(None)
+
+    async def acquire(self, model):
+        if not self._waiting and self._can_start(model):
+            self._grant(model)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(model, deque()).append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # La place avait été accordée juste avant l'annulation
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def slot(self, model):
+        """Usage : `async with scheduler.slot(model): ...`"""
+        return _Slot(self, model)
+
+
+class _Slot:
+    def __init__(self, scheduler, model):
+        self.scheduler = scheduler
+        self.model = model
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.model)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler.release()
+
+
+class LLMClient:
+    """
+    Client Ollama partagé par tous les LLMStrategy d'une simulation.
+    :param host: URL du serveur Ollama (None = valeur par défaut / OLLAMA_HOST)
+    :param keep_alive: Durée de maintien du modèle en mémoire ("30m", -1 = toujours)
+    :param max_in_flight: Requêtes simultanées au maximum (chemin asynchrone)
+    :param timeout: Délai HTTP (s) ; None = pas de limite. Voir aussi llmResilience.CallPolicy
+    """
+
+    def __init__(
+        self, host=None, keep_alive=DEFAULT_KEEP_ALIVE, max_in_flight=8, max_streak=32,
+        timeout=None,
+    ):
+        if ollama is None:
+            raise ImportError("La librairie 'ollama' est nécessaire pour LLMClient")
+        self.host = host
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.scheduler = ModelAffinityScheduler(max_in_flight, max_streak)
+        self._client = ollama.Client(host=host, timeout=timeout)
+        self._async_client = None  # Lié à la boucle asyncio qui l'a créé
+        self._async_loop = None
+
+    def chat(self, model, messages, options=None, format=None):
+        return self._client.chat(
+            model=model,
+            messages=messages,
+            options=options,
+            format=format,
+            keep_alive=self.keep_alive,
+        )
+
+    async def chat_async(self, model, messages, options=None, format=None):
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = ollama.AsyncClient(host=self.host, timeout=self.timeout)
+            self._async_loop = loop
+        async with self.scheduler.slot(model):
+            return await self._async_client.chat(
+                model=model,
+                messages=messages,
+                options=options,
+                format=format,
+                keep_alive=self.keep_alive,
+            )
+
+    def warm_up(self, models):
+        """Charge les modèles à l'avance (requête vide), pour ne pas compter le chargement dans la partie."""
+        for model in models:
+            self._client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+
+    def list_models(self):
+        """Modèles installés sur le serveur (/api/tags)."""
+        return [
+            model.model if hasattr(model, "model") else model["name"]
+            for model in self._client.list()["models"]
+        ]
+
+    @property
+    def switches(self):
+        return self.scheduler.switches
+
+
+# --- POOL DE SERVEURS D'INFÉRENCE ---
+
+
+class NoBackendError(RuntimeError):
+    """Aucun serveur disponible ne sert ce modèle."""
+
+
+def _model_id(name):
+    # Ollama nomme "gemma2:latest" ce qu'on demande sous le nom "gemma2"
+    return name if ":" in name else f"{name}:latest"
+
+
+class Endpoint:
+    """
+    Un serveur Ollama du pool.
+    :param models: Modèles servis (None = découverts par le contrôle de santé, /api/tags)
+    :param max_in_flight: Requêtes simultanées au maximum sur ce serveur
+    """
+
+    def __init__(
+        self, host, models=None, max_in_flight=4, keep_alive=DEFAULT_KEEP_ALIVE, timeout=None
+    ):
+        self.host = host
+        self.max_in_flight = max_in_flight
+        self.fixed_models = models is not None
+        self.models = {_model_id(m) for m in models} if models is not None else None
+        # Chemin asynchrone : plafond et affinité de modèle gérés par le client de ce serveur
+        self.client = LLMClient(host, keep_alive, max_in_flight, timeout=timeout)
+        # Chemin synchrone : plafond par sémaphore
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.healthy = True
+        self.outstanding = 0  # Requêtes routées vers ce serveur et pas encore terminées
+        self.last_model = None  # Dernier modèle demandé (probablement encore chargé)
+        self.served = 0
+        self.failures = 0
+
+    def serves(self, model):
+        return self.models is None or _model_id(model) in self.models
+
+    def load(self):
+        """Charge relative : requêtes en cours / capacité."""
+        return self.outstanding / self.max_in_flight
+
+    def summary(self):
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "models": sorted(self.models) if self.models is not None else None,
+            "served": self.served,
+            "failures": self.failures,
+        }
+
+
+class LLMBackendPool:
+    """
+    Plusieurs serveurs Ollama derrière la même interface que LLMClient (chat, chat_async,
+    warm_up) : on le passe à LLMStrategy(client=...) à la place d'un client unique.
+    - Routage : parmi les serveurs en bonne santé qui ont le modèle, celui qui a le moins de
+      requêtes en cours (rapporté à sa capacité) ; à égalité, celui qui a déjà le modèle
+      chargé, puis chacun son tour.
+    - Santé : contrôle actif (/api/tags) à la création puis toutes les `health_interval`
+      secondes (thread de fond) ; un serveur injoignable pendant une requête est écarté
+      jusqu'au contrôle suivant. Un 404 retire le modèle de ce serveur.
+    :param endpoints: Liste d'Endpoint, ou de dicts d'arguments d'Endpoint
+                      (ex : [{"host": "http://gpu1:11434", "models": ["gemma2"]}, ...])
+    """
+
+    def __init__(self, endpoints, health_interval=30.0):
+        self.endpoints = [e if isinstance(e, Endpoint) else Endpoint(**e) for e in endpoints]
+        if not self.endpoints:
+            raise ValueError("Le pool a besoin d'au moins un serveur")
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._stop = threading.Event()
+        self.check_health()
+        self._health_thread = None
+        if health_interval:
+            self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+            self._health_thread.start()
+
+    # --- Santé ---
+
+    def check_health(self):
+        """Interroge chaque serveur (/api/tags) ; met à jour son état et ses modèles."""
+        for endpoint in self.endpoints:
+            try:
+                models = endpoint.client.list_models()
+            except Exception:
+                endpoint.healthy = False
+                continue
+            if not endpoint.fixed_models:
+                endpoint.models = {_model_id(m) for m in models}
+            endpoint.healthy = True
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def close(self):
+        self._stop.set()
+
+    # --- Routage ---
+
+    def _route(self, model):
+        with self._lock:
+            candidates = [
+                (i, e) for i, e in enumerate(self.endpoints) if e.healthy and e.serves(model)
+            ]
+            if not candidates:
+                raise NoBackendError(f"Aucun serveur disponible pour {model}")
+            n = len(self.endpoints)
+            _, endpoint = min(
+                candidates,
+                key=lambda c: (
+                    c[1].load(),
+                    c[1].last_model != model,
+                    (c[0] - self._turn) % n,
+                ),
+            )
+            self._turn += 1
+            endpoint.outstanding += 1
+            endpoint.last_model = model
+            return endpoint
+
+    def _release(self, endpoint, model, error=None, served=True):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.served += served
+                return
+            endpoint.failures += 1
+            if isinstance(error, ConnectionError):
+                endpoint.healthy = False  # Jusqu'au prochain contrôle de santé
+            elif getattr(error, "status_code", None) == 404 and endpoint.models is not None:
+                endpoint.models.discard(_model_id(model))
+
+    def chat(self, model, messages, options=None, format=None):
+        endpoint = self._route(model)
+        try:
+            with endpoint._slots:
+                response = endpoint.client.chat(model, messages, options, format)
+        except Exception as e:
+            self._release(endpoint, model, e)
+            raise
+        self._release(endpoint, model)
+        return response
+
+    async def chat_async(self, model, messages, options=None, format=None):
+        endpoint = self._route(model)
+        try:
+            response = await endpoint.client.chat_async(model, messages, options, format)
+        except asyncio.CancelledError:
+            # Doublon perdant (voir llmResilience) : la place est rendue, rien n'a été servi
+            self._release(endpoint, model, served=False)
+            raise
+        except Exception as e:
+            self._release(endpoint, model, e)
+            raise
+        self._release(endpoint, model)
+        return response
+
+    def warm_up(self, models):
+        for endpoint in self.endpoints:
+            served = [m for m in models if endpoint.healthy and endpoint.serves(m)]
+            if served:
+                endpoint.client.warm_up(served)
+
+    @property
+    def switches(self):
+        return sum(e.client.switches for e in self.endpoints)
+
+    def summary(self):
+        """État et nombre de requêtes servies par serveur."""
+        return [e.summary() for e in self.endpoints]
@@ -0,0 +1,288 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+# Délais dépassés : ceux de CallPolicy (TimeoutError) et ceux du client HTTP d'ollama
+# (httpx.ReadTimeout, ConnectTimeout... qui n'héritent pas de TimeoutError)
+try:
+    import httpx
+
+    TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, httpx.TimeoutException)
+except ImportError:
+    TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError)
+
+# --- MAÎTRISE DE LA LATENCE DE QUEUE DES APPELS LLM ---
+# Un seul appel lent ou en échec bloque tout le tour (le tour attend le dernier joueur) ;
+# avant, toute erreur devenait silencieusement une mise de 0. Ici, autour de chaque appel :
+# - délai maximal par tentative (timeout), puis nouvelles tentatives bornées avec attente
+#   exponentielle (backoff, avec une part aléatoire pour ne pas relancer tous ensemble) ;
+# - requête "couverte" (hedging) optionnelle : si la réponse n'est pas arrivée au bout du
+#   percentile `hedge_percentile` des latences récentes, on envoie un doublon et on garde
+#   la première réponse ;
+# - disjoncteur par modèle : après `failure_threshold` échecs d'affilée, on n'appelle plus
+#   le serveur pendant `reset_timeout` secondes, puis une requête test décide de la reprise.
+# Les décisions qui n'ont pas pu venir du LLM sont marquées (voir LLMStrategy, colonne
+# "llm_fallback").
+
+# Erreurs HTTP qui valent la peine d'une nouvelle tentative (surcharge, serveur en panne)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Disjoncteur ouvert : le modèle a trop échoué récemment, on ne l'appelle pas."""
+
+
+def is_timeout(exc):
+    """Délai dépassé (par CallPolicy ou par le client HTTP), plutôt qu'une autre erreur."""
+    return isinstance(exc, TIMEOUT_ERRORS)
+
+
+def is_retryable(exc):
+    """Timeout, erreur réseau ou erreur serveur : oui. Requête invalide, modèle absent : non."""
+    status = getattr(exc, "status_code", None)
+    if status is not None and status >= 0:
+        return status in RETRYABLE_STATUS
+    return not isinstance(exc, (CircuitOpenError, ValueError, TypeError, KeyError))
+
+
+class CircuitBreaker:
+    """
+    États : "closed" (normal), "open" (appels refusés), "half_open" (une requête test passe).
+    Partagé entre threads (chemin synchrone) : les changements d'état sont protégés.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0  # Échecs consécutifs
+        self.opened_at = 0.0
+        self.n_opened = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Lève CircuitOpenError si l'appel doit être refusé."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"  # Cet appel est la requête test
+                return
+            raise CircuitOpenError(f"disjoncteur {self.state}, appel refusé")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.n_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class CallPolicy:
+    """
+    Politique d'appel partagée par les LLMStrategy d'une simulation (comme le cache ou le client).
+    :param timeout: Secondes au maximum par tentative
+    :param retries: Nouvelles tentatives après un échec récupérable
+    :param backoff: Attente de base (s) avant la 1re nouvelle tentative, doublée ensuite
+    :param hedge_percentile: Ex : 95 -> doublon si pas de réponse au p95 des latences récentes
+                             (None = pas de doublon)
+    :param failure_threshold: Échecs d'affilée avant d'ouvrir le disjoncteur d'un modèle
+    :param reset_timeout: Secondes avant la requête test d'un disjoncteur ouvert
+    """
+
+    def __init__(
+        self,
+        timeout=60.0,
+        retries=2,
+        backoff=0.5,
+        backoff_max=8.0,
+        hedge_percentile=None,
+        hedge_min_samples=20,
+        latency_window=200,
+        failure_threshold=5,
+        reset_timeout=30.0,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_window = latency_window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}  # modèle -> CircuitBreaker
+        self.latencies = {}  # modèle -> deque des dernières latences (s)
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0,
+                      "failures": 0, "rejected": 0}
+        # Générateur à part : le `random` global sert aux tirages du jeu (reproductibles)
+        self._rng = random.Random()
+        self._pool = None  # Threads du chemin synchrone (délai et doublons)
+        self._lock = threading.Lock()
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.latencies[model] = deque(maxlen=self.latency_window)
+            return self.breakers[model]
+
+    def hedge_delay(self, model):
+        """Délai avant le doublon (s), ou None (désactivé, ou pas encore assez de mesures)."""
+        if self.hedge_percentile is None:
+            return None
+        samples = self.latencies.get(model)
+        if not samples or len(samples) < self.hedge_min_samples:
+            return None
+        delay = float(np.percentile(samples, self.hedge_percentile))
+        return delay if delay < self.timeout else None
+
+    def _sleep_time(self, attempt):
+        # Attente exponentielle "full jitter" : uniforme entre 0 et backoff * 2^attempt
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _on_failure(self, breaker, exc, attempt):
+        """Enregistre l'échec ; True s'il faut retenter."""
+        self._count("timeouts" if is_timeout(exc) else "failures")
+        breaker.record_failure()
+        return attempt < self.retries and is_retryable(exc)
+
+    def _on_success(self, model, breaker, start):
+        breaker.record_success()
+        self.latencies[model].append(time.perf_counter() - start)
+
+    # --- Chemin synchrone (threads) ---
+
+    def call(self, model, func):
+        """Appelle func() (sans argument) selon la politique ; lève la dernière erreur sinon."""
+        breaker = self.breaker(model)
+        for attempt in range(self.retries + 1):
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            self._count("calls")
+            start = time.perf_counter()
+            try:
+                result = self._attempt(model, func)
+            except Exception as e:
+                if not self._on_failure(breaker, e, attempt):
+                    raise
+                self._count("retries")
+                time.sleep(self._sleep_time(attempt))
+                continue
+            self._on_success(model, breaker, start)
+            return result
+
+    def _attempt(self, model, func):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(thread_name_prefix="llm-call")
+        # Un appel qui dépasse le délai continue en arrière-plan (le client HTTP finit par
+        # abandonner, voir LLMClient(timeout=...)) : on n'attend simplement plus sa réponse
+        first = self._pool.submit(func)
+        pending = {first}
+        deadline = time.monotonic() + self.timeout
+        delay = self.hedge_delay(model)
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                self._count("hedges")
+                pending.add(self._pool.submit(func))
+
+        error = None
+        while pending:
+            done, pending = wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                break
+            winners = [future for future in done if future.exception() is None]
+            if winners:
+                if winners[0] is not first:
+                    self._count("hedge_wins")
+                for other in pending:
+                    other.cancel()
+                return winners[0].result()
+            error = error or next(iter(done)).exception()
+        if pending or error is None:
+            raise TimeoutError(f"pas de réponse de {model} en {self.timeout:.0f}s")
+        raise error
+
+    # --- Chemin asynchrone ---
+
+    async def call_async(self, model, func):
+        """Comme call(), mais func() renvoie une coroutine ; les doublons perdants sont annulés."""
+        breaker = self.breaker(model)
+        for attempt in range(self.retries + 1):
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            self._count("calls")
+            start = time.perf_counter()
+            try:
+                result = await self._attempt_async(model, func)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self._on_failure(breaker, e, attempt):
+                    raise
+                self._count("retries")
+                await asyncio.sleep(self._sleep_time(attempt))
+                continue
+            self._on_success(model, breaker, start)
+            return result
+
+    async def _attempt_async(self, model, func):
+        loop = asyncio.get_running_loop()
+        first = asyncio.ensure_future(func())
+        pending = {first}
+        deadline = loop.time() + self.timeout
+        try:
+            delay = self.hedge_delay(model)
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self._count("hedges")
+                    pending.add(asyncio.ensure_future(func()))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    if winners[0] is not first:
+                        self._count("hedge_wins")
+                    return winners[0].result()
+                error = error or next(iter(done)).exception()
+            if pending or error is None:
+                raise TimeoutError(f"pas de réponse de {model} en {self.timeout:.0f}s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,7 +1,13 @@
+import asyncio
+import json
 import random
 import re
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
 # On tente d'importer ollama, si ça échoue on prévient l'utilisateur
 try:
@@ -14,6 +20,9 @@ except ImportError:
         "⚠️ Attention : la librairie 'ollama' n'est pas installée. Les stratégies IA ne fonctionneront pas."
     )
 
+from llmCache import CacheMiss
+from llmResilience import CircuitOpenError, is_timeout
+
 # --- CONFIGURATION DU JEU ---
 
 PERSONA_PROMPTS = {
@@ -47,20 +56,147 @@ PERSONA_PROMPTS = {
     """,
 }
 
+# Construction des messages envoyés au LLM (voir LLMStrategy._build_messages)
+PROMPT_MODES = ("single", "prefix")
+
+# Lecture de la décision du LLM :
+# - "free"       : texte libre, premier nombre trouvé (Regex), sinon mise aléatoire
+# - "structured" : sortie JSON contrainte par un schéma (entier entre 0 et la dotation),
+#                  nombre de tokens générés plafonné, et relance en cas de réponse illisible
+DECISION_MODES = ("free", "structured")
+
+# Consigne "FORMAT DE RÉPONSE ATTENDU" des prompts selon decision_mode : (consigne, exemple)
+RESPONSE_FORMATS = {
+    "free": ("UNIQUEMENT par un nombre entier (rien d'autre, pas de texte)", "12"),
+    "structured": (
+        'UNIQUEMENT en JSON, sans texte autour : {{"contribution": <entier entre 0 et {endowment}>}}',
+        '{{"contribution": 12}}',
+    ),
+}
+
+# Tokens générés au maximum en mode "structured" ({"contribution": 20} ≈ 8 tokens)
+STRUCTURED_MAX_TOKENS = 16
+
+# Mise jouée quand le LLM n'a pas pu décider (erreur, délai dépassé, disjoncteur ouvert) :
+# - "zero" : on ne mise rien (comportement historique, ressemble à une trahison)
+# - "last" : on rejoue sa mise du tour précédent (la moitié de la dotation au 1er tour)
+ON_ERROR_MODES = ("zero", "last")
+
+# Chemins de décision où la mise ne vient PAS du LLM : marqués dans la colonne "llm_fallback"
+FALLBACK_PATHS = {"fallback_random", "error", "timeout", "circuit_open", "no_llm"}
+
+# Parties fixes des prompts, rendues une fois par (persona, dotation, multiplicateur, decision_mode)
+# (voir LLMStrategy._prompt_parts) : à chaque tour, seul l'historique est à insérer
+_PROMPT_PARTS = {}
+_SYSTEM_PROMPTS = {}
+_HISTORY_SLOT = "\x00HISTORIQUE\x00"
+
+# Tours de l'historique montrés au LLM (les plus récents)
+PROMPT_HISTORY_ROUNDS = 3
+
 GAME_CONFIG = {
     "endowment": 20,
     "multiplier": 1.6,
     "n_rounds": 20,  # On réduit un peu les tours car l'IA est plus lente que le code pur
+    # "max_concurrency": 4,  # Requêtes LLM envoyées en même temps à chaque tour (None = une par une)
+    # "verbose": False,  # Masque l'affichage tour par tour (parties jouées en parallèle)
 }
 
+# --- HISTORIQUE DE JEU ---
+
+
+class GameHistory:
+    """
+    Historique compact de la partie, passé aux stratégies à la place d'une liste de dicts.
+    Mises stockées dans un tableau d'entiers préalloué (tour x joueur) + total du pot par tour.
+    Avec `window`, seuls les `window` derniers tours sont gardés (buffer circulaire) :
+    la mémoire ne dépend plus de n_rounds.
+    À chaque tour, le résumé commun à tous les joueurs (mise moyenne des AUTRES pour
+    chaque joueur, tirée du pot total) est calculé une seule fois, en vectoriel.
+
+    Les accès se font "en arrière" : back=1 = dernier tour joué, back=2 = l'avant-dernier...
+    """
+
+    def __init__(self, n_players, n_rounds, window=None):
+        self.n_players = n_players
+        self.capacity = max(1, n_rounds if window is None else min(window, n_rounds))
+        self.contributions = np.zeros((self.capacity, n_players), dtype=np.int64)
+        self.totals = np.zeros(self.capacity, dtype=np.int64)
+        self.others_means = np.zeros((self.capacity, n_players), dtype=np.float64)
+        self.n_recorded = 0  # Nombre de tours joués depuis le début
+
+    def record(self, contributions, total_pot):
+        """Enregistre un tour (contributions : séquence indexée par player_id)."""
+        slot = self.n_recorded % self.capacity
+        self.contributions[slot] = contributions
+        self.totals[slot] = total_pot
+        if self.n_players > 1:
+            # (total - la mienne) / (n - 1) pour tous les joueurs d'un coup
+            np.subtract(total_pot, self.contributions[slot], out=self.others_means[slot])
+            self.others_means[slot] /= self.n_players - 1
+        self.n_recorded += 1
+
+    def _slot(self, back):
+        if not 1 <= back <= min(self.n_recorded, self.capacity):
+            raise IndexError(f"Tour hors de l'historique disponible (back={back})")
+        return (self.n_recorded - back) % self.capacity
+
+    def __len__(self):
+        return self.n_recorded
+
+    def round_number(self, back=1):
+        self._slot(back)
+        return self.n_recorded - back + 1
+
+    def total(self, back=1):
+        """Pot total (avant multiplication) d'un tour passé, en O(1)."""
+        return int(self.totals[self._slot(back)])
+
+    def contribution(self, my_id, back=1):
+        return int(self.contributions[self._slot(back), my_id])
+
+    def mean_others(self, my_id, back=1):
+        """Mise moyenne des AUTRES joueurs sur un tour passé : (total - la mienne) / (n - 1)."""
+        if self.n_players < 2:
+            return 0
+        return float(self.others_means[self._slot(back), my_id])
+
+    def __getitem__(self, index):
+        """
+        Compatibilité avec l'ancien format (liste de dicts) :
+        history[-1] -> {"round": ..., "contributions": {pid: mise}, "total_pot": ...}
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        back = len(self) - index
+        slot = self._slot(back)
+        return {
+            "round": index + 1,
+            "contributions": dict(enumerate(self.contributions[slot].tolist())),
+            "total_pot": int(self.totals[slot]),
+        }
+
+    def __iter__(self):
+        start = max(0, len(self) - self.capacity)
+        for i in range(start, len(self)):
+            yield self[i]
+
+
 # --- DÉFINITION DES STRATÉGIES ---
 
 
 class Strategy(ABC):
     @abstractmethod
     def decide_contribution(self, history_global, my_id, endowment):
+        """history_global : GameHistory (voir plus haut), my_id : int, endowment : int"""
         pass
 
+    async def decide_contribution_async(self, history_global, my_id, endowment):
+        """Version asynchrone ; par défaut la décision synchrone (immédiate pour le code pur)."""
+        return self.decide_contribution(history_global, my_id, endowment)
+
     def get_name(self):
         return self.__class__.__name__
 
@@ -88,58 +224,106 @@ class ConditionalCooperator(Strategy):
     def decide_contribution(self, history_global, my_id, endowment):
         if not history_global:
             return endowment // 2
-        last_round = history_global[-1]["contributions"]
-        others = [amt for pid, amt in last_round.items() if pid != my_id]
-        if not others:
+        if history_global.n_players < 2:
             return 0
-        return int(sum(others) / len(others))
+        return int(history_global.mean_others(my_id))
 
 
 # --- NOUVELLE STRATÉGIE : AGENT LLM ---
 
 
 class LLMStrategy(Strategy):
-    def __init__(self, model_name="llama3", persona="adaptive", stream=False):
+    # Mesures renvoyées par Ollama avec chaque réponse -> attribut de suivi de la dernière
+    # décision (durées en ns, additionnées sur les relances)
+    USAGE_FIELDS = {
+        "total_duration": "last_total_ns",
+        "load_duration": "last_load_ns",
+        "prompt_eval_count": "last_prompt_eval_count",
+        "prompt_eval_duration": "last_prompt_eval_ns",
+        "eval_count": "last_eval_count",
+        "eval_duration": "last_eval_ns",
+    }
+    # Tous les attributs de suivi lus par GameProfiler (None = pas de mesure)
+    USAGE_ATTRS = tuple(USAGE_FIELDS.values()) + ("last_responses", "last_response_chars")
+
+    def __init__(
+        self,
+        model_name="llama3",
+        persona="adaptive",
+        stream=False,
+        cache=None,
+        options=None,
+        client=None,
+        prompt_mode="single",
+        decision_mode="free",
+        max_reasks=1,
+        call_policy=None,
+        on_error="zero",
+    ):
         self.model_name = model_name
         self.persona = persona  # doit être 'altruist', 'greedy', ou 'adaptive'
         self.stream = stream
+        # Cache optionnel des réponses (llmCache.LLMResponseCache), partagé entre joueurs
+        self.cache = cache
+        # Options de génération ollama (temperature, num_predict...), font partie de la clé de cache
+        self.options = options
+        # Client partagé optionnel (llmClient.LLMClient) : connexions réutilisées, keep-alive,
+        # regroupement des requêtes par modèle. Sans client : ollama.chat du module.
+        self.client = client
+        # "single" : un seul gros message utilisateur (prompt historique)
+        # "prefix" : partie fixe en message système + courte partie variable (voir _build_messages)
+        if prompt_mode not in PROMPT_MODES:
+            raise ValueError(f"prompt_mode inconnu : {prompt_mode} (attendu : {PROMPT_MODES})")
+        self.prompt_mode = prompt_mode
+        if decision_mode not in DECISION_MODES:
+            raise ValueError(
+                f"decision_mode inconnu : {decision_mode} (attendu : {DECISION_MODES})"
+            )
+        self.decision_mode = decision_mode
+        # Relances après une réponse illisible (mode "structured" uniquement)
+        self.max_reasks = max_reasks
+        # Politique d'appel partagée optionnelle (llmResilience.CallPolicy) : délai par
+        # tentative, nouvelles tentatives, doublons, disjoncteur par modèle
+        self.call_policy = call_policy
+        if on_error not in ON_ERROR_MODES:
+            raise ValueError(f"on_error inconnu : {on_error} (attendu : {ON_ERROR_MODES})")
+        self.on_error = on_error
+        # Suivi de la dernière décision (lu par GameProfiler) : mesures du serveur
+        # (None = réponse du cache), nombre et taille des réponses lues, chemin suivi
+        self._reset_usage()
+        self._async_client = None  # ollama.AsyncClient, lié à la boucle asyncio qui l'a créé
+        self._async_loop = None
+        # [historique, my_id, dotation, tours vus, lignes] (voir _history_lines)
+        self._history_window = None
 
     def get_name(self):
         return f"IA_{self.persona}_{self.model_name}"
 
     def _build_prompt(self, history_global, my_id, endowment):
+        """Prompt "single" : parties fixes précalculées + historique récent."""
+        head, tail = self._prompt_parts(endowment)
+        return head + self._build_history_text(history_global, my_id, endowment) + tail
+
+    def _prompt_parts(self, endowment):
+        key = (self.persona, endowment, GAME_CONFIG["multiplier"], self.decision_mode)
+        parts = _PROMPT_PARTS.get(key)
+        if parts is None:
+            # On rend le prompt complet avec un marqueur à la place de l'historique,
+            # puis on coupe : le texte obtenu est exactement celui de _render_prompt
+            parts = _PROMPT_PARTS[key] = tuple(
+                self._render_prompt(endowment, _HISTORY_SLOT).split(_HISTORY_SLOT)
+            )
+        return parts
+
+    def _render_prompt(self, endowment, history_text):
         # 1. Récupération de l'instruction de personnalité
         # Si le persona n'existe pas, on prend 'adaptive' par défaut
         persona_instruction = PERSONA_PROMPTS.get(
             self.persona, PERSONA_PROMPTS["adaptive"]
         )
+        instruction, example = self._response_format(endowment)
 
-        # 2. Construction de l'historique (Context)
-        history_text = ""
-        if not history_global:
-            history_text = "C'est le tout premier tour. Tu ne connais pas encore les autres joueurs."
-        else:
-            recent_history = history_global[
-                -3:
-            ]  # On regarde seulement les 3 derniers tours
-            history_text = "### Historique récent du jeu :\n"
-            for h in recent_history:
-                # Analyse précise pour l'IA
-                others_contrib = [
-                    v for k, v in h["contributions"].items() if k != my_id
-                ]
-                avg_others = (
-                    sum(others_contrib) / len(others_contrib) if others_contrib else 0
-                )
-                my_last = h["contributions"][my_id]
-
-                history_text += (
-                    f"- Tour {h['round']} : J'ai mis {my_last}/{endowment}. "
-                    f"Les autres ont mis en moyenne {avg_others:.1f}/{endowment}. "
-                    f"Pot total généré : {h['total_pot']}.\n"
-                )
-
-        # 3. Prompt Final
+        # 2. Prompt Final (l'historique est construit par _build_history_text)
         prompt = f"""
         CONTEXTE :
         Tu participes à une simulation du "Jeu du Bien Public" contre d'autres joueurs.
@@ -161,105 +345,660 @@ class LLMStrategy(Strategy):
         Analyse la situation selon ton rôle, puis donne ta réponse.
         
         FORMAT DE RÉPONSE ATTENDU :
-        Réponds UNIQUEMENT par un nombre entier (rien d'autre, pas de texte).
-        Exemple : 12
+        Réponds {instruction}.
+        Exemple : {example}
         """
         return prompt
 
+    def _build_system_prompt(self, endowment):
+        """Partie fixe du prompt (règles + persona) : identique à chaque tour pour ce joueur."""
+        key = (self.persona, endowment, GAME_CONFIG["multiplier"], self.decision_mode)
+        prompt = _SYSTEM_PROMPTS.get(key)
+        if prompt is None:
+            prompt = _SYSTEM_PROMPTS[key] = self._render_system_prompt(endowment)
+        return prompt
+
+    def _render_system_prompt(self, endowment):
+        persona_instruction = PERSONA_PROMPTS.get(
+            self.persona, PERSONA_PROMPTS["adaptive"]
+        )
+        instruction, example = self._response_format(endowment)
+        return f"""
+        CONTEXTE :
+        Tu participes à une simulation du "Jeu du Bien Public" contre d'autres joueurs.
+        
+        RÈGLES MATHÉMATIQUES :
+        - Dotation par tour : {endowment} jetons.
+        - Ta mise : entre 0 et {endowment}.
+        - Le pot commun est multiplié par {GAME_CONFIG['multiplier']} (synergie) puis partagé équitablement entre tous.
+        - Ton gain = (Ce que tu gardes) + (Ta part du pot).
+        
+        TON RÔLE :
+        {persona_instruction}
+        
+        FORMAT DE RÉPONSE ATTENDU :
+        À chaque tour, réponds {instruction}.
+        Exemple : {example}
+        """
+
+    def _response_format(self, endowment):
+        """(consigne, exemple) de la section "FORMAT DE RÉPONSE ATTENDU", selon decision_mode."""
+        instruction, example = RESPONSE_FORMATS[self.decision_mode]
+        return instruction.format(endowment=endowment), example.format()
+
+    def _build_history_text(self, history_global, my_id, endowment):
+        if not history_global:
+            return "C'est le tout premier tour. Tu ne connais pas encore les autres joueurs."
+
+        # On regarde seulement les 3 derniers tours (du plus ancien au plus récent)
+        return "### Historique récent du jeu :\n" + "".join(
+            self._history_lines(history_global, my_id, endowment)
+        )
+
+    def _history_line(self, history_global, my_id, endowment, back):
+        # Analyse précise pour l'IA
+        avg_others = history_global.mean_others(my_id, back)
+        my_last = history_global.contribution(my_id, back)
+        return (
+            f"- Tour {history_global.round_number(back)} : J'ai mis {my_last}/{endowment}. "
+            f"Les autres ont mis en moyenne {avg_others:.1f}/{endowment}. "
+            f"Pot total généré : {history_global.total(back)}.\n"
+        )
+
+    def _history_lines(self, history_global, my_id, endowment):
+        """
+        Fenêtre glissante des lignes d'historique de ce joueur : d'un tour au suivant on
+        ajoute la ligne du dernier tour et la plus ancienne sort. Si la partie, la place
+        ou la dotation changent (nouvelle partie, reprise...), on reconstruit la fenêtre.
+        """
+        n_rounds = len(history_global)
+        window = self._history_window
+        if (
+            window is None
+            or window[0] is not history_global
+            or window[1] != my_id
+            or window[2] != endowment
+            or not 0 <= n_rounds - window[3] <= 1
+        ):
+            # Pas plus de tours que l'historique n'en garde (config["history_window"])
+            max_recent = min(PROMPT_HISTORY_ROUNDS, history_global.capacity)
+            lines = deque(
+                (
+                    self._history_line(history_global, my_id, endowment, back)
+                    for back in range(min(max_recent, n_rounds), 0, -1)
+                ),
+                maxlen=max_recent,
+            )
+            window = self._history_window = [history_global, my_id, endowment, n_rounds, lines]
+        elif n_rounds == window[3] + 1:
+            window[4].append(self._history_line(history_global, my_id, endowment, 1))
+            window[3] = n_rounds
+        return window[4]
+
+    def _build_messages(self, history_global, my_id, endowment):
+        """
+        Messages envoyés au LLM selon prompt_mode.
+        En mode "prefix", le message système ne change jamais pour un joueur donné :
+        le serveur peut réutiliser son cache KV (préfixe déjà évalué) d'un tour à l'autre,
+        seul le court message utilisateur (historique récent) est à évaluer.
+        """
+        if self.prompt_mode == "single":
+            messages = [
+                {"role": "user", "content": self._build_prompt(history_global, my_id, endowment)}
+            ]
+        else:
+            history_text = self._build_history_text(history_global, my_id, endowment)
+            messages = [
+                {"role": "system", "content": self._build_system_prompt(endowment)},
+                {
+                    "role": "user",
+                    "content": f"SITUATION ACTUELLE :\n{history_text}\nCombien mises-tu pour ce tour-ci ?",
+                },
+            ]
+        return messages
+
+    def _reset_usage(self):
+        for attr in self.USAGE_ATTRS:
+            setattr(self, attr, None)
+        self.last_decision_path = None
+
+    def _record_usage(self, response):
+        """Additionne les mesures de chaque réponse lue (relances comprises)."""
+        self.last_responses = (self.last_responses or 0) + 1
+        self.last_response_chars = (self.last_response_chars or 0) + len(
+            response["message"]["content"]
+        )
+        if response.get("cached"):
+            return  # Rien n'a été calculé par le serveur
+        for key, attr in self.USAGE_FIELDS.items():
+            value = response.get(key)
+            if value is not None:
+                setattr(self, attr, (getattr(self, attr) or 0) + value)
+
     # ... (le reste de la classe : decide_contribution, init, etc. reste identique)
 
-    def decide_contribution(self, history_global, my_id, endowment):
-        if not OLLAMA_AVAILABLE:
-            return 0  # Fallback si pas de librairie
+    @staticmethod
+    def decision_schema(endowment):
+        """Schéma JSON imposé au LLM en mode "structured" (format= de ollama.chat)."""
+        return {
+            "type": "object",
+            "properties": {
+                "contribution": {"type": "integer", "minimum": 0, "maximum": endowment}
+            },
+            "required": ["contribution"],
+        }
 
-        prompt = self._build_prompt(history_global, my_id, endowment)
+    def _request(self, endowment):
+        """(options, format) de la requête selon decision_mode."""
+        if self.decision_mode == "free":
+            return self.options, None
+        options = dict(self.options or {}, num_predict=STRUCTURED_MAX_TOKENS)
+        return options, self.decision_schema(endowment)
 
-        try:
-            # Appel à l'API Ollama
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {"role": "user", "content": prompt},
-                ],
+    def _chat(self, messages, endowment):
+        """Appel à l'API Ollama, en passant par le cache s'il y en a un."""
+        options, schema = self._request(endowment)
+
+        def request():
+            if self.client is not None:
+                return self.client.chat(self.model_name, messages, options, schema)
+            return ollama.chat(
+                model=self.model_name, messages=messages, options=options, format=schema
             )
 
-            content = response["message"]["content"]
+        def call():
+            # La politique d'appel ne s'applique qu'aux vrais appels (pas aux réponses du cache)
+            if self.call_policy is None:
+                return request()
+            return self.call_policy.call(self.model_name, request)
+
+        if self.cache is None:
+            return call()
+        return self.cache.chat(self.model_name, messages, call, options, schema)
+
+    async def _chat_async(self, messages, endowment):
+        """Comme _chat(), avec ollama.AsyncClient (un client par boucle asyncio)."""
+        options, schema = self._request(endowment)
+
+        async def request():
+            if self.client is not None:
+                return await self.client.chat_async(self.model_name, messages, options, schema)
+            loop = asyncio.get_running_loop()
+            if self._async_loop is not loop:
+                self._async_client = ollama.AsyncClient()
+                self._async_loop = loop
+            return await self._async_client.chat(
+                model=self.model_name, messages=messages, options=options, format=schema
+            )
 
-            # Nettoyage de la réponse (Extraction du premier nombre trouvé)
-            # Les LLM ajoutent souvent du texte autour (ex: "Je mise 10."), on utilise une Regex
-            match = re.search(r"\d+", content)
-            if match:
-                val = int(match.group())
-                # Sécurité : on borne entre 0 et endowment
-                return max(0, min(val, endowment))
-            else:
-                # Si l'IA raconte n'importe quoi sans chiffre, on joue la sécurité (0 ou aléatoire)
-                return random.randint(0, endowment)
+        async def call():
+            if self.call_policy is None:
+                return await request()
+            return await self.call_policy.call_async(self.model_name, request)
 
+        if self.cache is None:
+            return await call()
+        return await self.cache.chat_async(self.model_name, messages, call, options, schema)
+
+    def _can_call(self):
+        # En mode "replay", le cache suffit : pas besoin de la librairie ollama
+        replay_only = self.cache is not None and self.cache.mode == "replay"
+        return OLLAMA_AVAILABLE or replay_only
+
+    def _read_response(self, response, endowment):
+        """Mise lue dans la réponse du LLM, ou None si la réponse est illisible."""
+        self._record_usage(response)
+        content = response["message"]["content"]
+
+        if self.decision_mode == "structured":
+            try:
+                value = json.loads(content)["contribution"]
+            except (ValueError, KeyError, TypeError):
+                return None
+            if isinstance(value, bool) or not isinstance(value, int):
+                return None
+            return value if 0 <= value <= endowment else None
+
+        # Nettoyage de la réponse (Extraction du premier nombre trouvé)
+        # Les LLM ajoutent souvent du texte autour (ex: "Je mise 10."), on utilise une Regex
+        match = re.search(r"\d+", content)
+        if match:
+            # Sécurité : on borne entre 0 et endowment
+            return max(0, min(int(match.group()), endowment))
+        return None
+
+    def _reask_messages(self, messages, response, endowment):
+        """Relance courte : on montre au LLM sa réponse et on redemande le format attendu."""
+        return messages + [
+            {"role": "assistant", "content": response["message"]["content"]},
+            {
+                "role": "user",
+                "content": f'Réponse invalide. Réponds uniquement : {{"contribution": <entier entre 0 et {endowment}>}}',
+            },
+        ]
+
+    def _fallback(self, response, endowment):
+        """Dernier recours quand la réponse reste illisible : (mise, chemin)."""
+        match = re.search(r"\d+", response["message"]["content"])
+        if match:
+            return max(0, min(int(match.group()), endowment)), "fallback_regex"
+        # Si l'IA raconte n'importe quoi sans chiffre, on joue la sécurité (0 ou aléatoire)
+        return random.randint(0, endowment), "fallback_random"
+
+    def _reasks(self):
+        return self.max_reasks if self.decision_mode == "structured" else 0
+
+    def _on_failure(self, error, history_global, my_id, endowment):
+        """Mise de repli quand l'appel a échoué ; le chemin suivi dit pourquoi."""
+        if isinstance(error, CircuitOpenError):
+            self.last_decision_path = "circuit_open"  # Déjà signalé : pas de message à chaque tour
+        else:
+            print(f"Erreur Ollama ({self.model_name}): {error}")
+            self.last_decision_path = "timeout" if is_timeout(error) else "error"
+        return self._error_contribution(history_global, my_id, endowment)
+
+    def _no_llm(self, history_global, my_id, endowment):
+        """Mise de repli sans librairie ollama (ni cache à rejouer)."""
+        self.last_decision_path = "no_llm"
+        return self._error_contribution(history_global, my_id, endowment)
+
+    def _error_contribution(self, history_global, my_id, endowment):
+        """Mise jouée quand le LLM n'a pas pu décider, selon on_error."""
+        if self.on_error == "last" and history_global:
+            return history_global.contribution(my_id)
+        if self.on_error == "last":
+            return endowment // 2
+        return 0  # En cas de crash technique, on ne mise rien
+
+    def _decision_steps(self, history_global, my_id, endowment):
+        """
+        Déroulé d'une décision, commun à decide_contribution et decide_contribution_async :
+        le générateur produit les messages à envoyer et reçoit (send) la réponse du LLM,
+        puis lit, relance au besoin et se replie. La mise est sa valeur de retour.
+        """
+        messages = self._build_messages(history_global, my_id, endowment)
+        response = yield messages
+        value = self._read_response(response, endowment)
+        path = "schema" if self.decision_mode == "structured" else "regex"
+
+        for _ in range(self._reasks()):
+            if value is not None:
+                break
+            messages = self._reask_messages(messages, response, endowment)
+            response = yield messages
+            value = self._read_response(response, endowment)
+            path = "reask"
+
+        if value is None:
+            value, path = self._fallback(response, endowment)
+        self.last_decision_path = path
+        return value
+
+    def decide_contribution(self, history_global, my_id, endowment):
+        self._reset_usage()
+        if not self._can_call():
+            return self._no_llm(history_global, my_id, endowment)
+
+        steps = self._decision_steps(history_global, my_id, endowment)
+        try:
+            messages = next(steps)
+            while True:
+                # Appel à l'API Ollama
+                messages = steps.send(self._chat(messages, endowment))
+        except StopIteration as done:
+            return done.value
+        except CacheMiss:
+            raise  # En mode "replay", une réponse absente est une vraie erreur
         except Exception as e:
-            print(f"Erreur Ollama ({self.model_name}): {e}")
-            return 0  # En cas de crash technique, on ne mise rien
+            return self._on_failure(e, history_global, my_id, endowment)
+
+    async def decide_contribution_async(self, history_global, my_id, endowment):
+        self._reset_usage()
+        if not self._can_call():
+            return self._no_llm(history_global, my_id, endowment)
+
+        steps = self._decision_steps(history_global, my_id, endowment)
+        try:
+            messages = next(steps)
+            while True:
+                messages = steps.send(await self._chat_async(messages, endowment))
+        except StopIteration as done:
+            return done.value
+        except CacheMiss:
+            raise
+        except Exception as e:
+            return self._on_failure(e, history_global, my_id, endowment)
 
 
 # --- MOTEUR DE SIMULATION (Identique à l'étape précédente) ---
 
+# Colonnes d'une ligne "Tidy" : chaque ligne représente l'action d'UN joueur à UN tour
+RECORD_COLUMNS = [
+    "round",
+    "player_id",
+    "strategy",
+    "endowment",
+    "contribution",
+    "kept_private",
+    "pot_share_received",
+    "round_gain_total",
+    "cumulative_score",
+    "group_total_pot",
+    "group_synergy_factor",
+    "llm_fallback",
+]
+
 
-def play_public_goods_game(players_strategies, config):
-    history_global = []
-    dataset = []
+def allocate_columns(players_strategies, config):
+    """Colonnes typées préallouées de la partie (n_rounds x n_players lignes, ordre : tour, joueur)."""
     n_players = len(players_strategies)
-    cumulative_scores = {i: 0 for i in range(n_players)}
+    n_rounds = config["n_rounds"]
+    n_rows = n_rounds * n_players
+    names = np.array([s.get_name() for s in players_strategies], dtype=object)
+    return {
+        "round": np.repeat(np.arange(1, n_rounds + 1), n_players),
+        "player_id": np.tile(np.arange(n_players), n_rounds),
+        "strategy": np.tile(names, n_rounds),
+        "endowment": np.full(n_rows, config["endowment"], dtype=np.int64),
+        "contribution": np.zeros(n_rows, dtype=np.int64),
+        "kept_private": np.zeros(n_rows, dtype=np.int64),
+        "pot_share_received": np.zeros(n_rows, dtype=np.float64),
+        "round_gain_total": np.zeros(n_rows, dtype=np.float64),
+        "cumulative_score": np.zeros(n_rows, dtype=np.float64),
+        "group_total_pot": np.zeros(n_rows, dtype=np.int64),
+        "group_synergy_factor": np.full(n_rows, config["multiplier"], dtype=np.float64),
+        # True si la mise d'un joueur IA ne vient pas du LLM (erreur, délai, réponse illisible)
+        "llm_fallback": np.zeros(n_rows, dtype=bool),
+    }
+
+
+def _mark_fallback(columns, row, strategy):
+    """Marque la ligne si la dernière décision de la stratégie est une mise de repli."""
+    if getattr(strategy, "last_decision_path", None) in FALLBACK_PATHS:
+        columns["llm_fallback"][row] = True
+
+
+class GameProfiler:
+    """
+    Instrumentation optionnelle du moteur : temps passé dans chaque phase, à chaque tour.
+    - "decision" : une mesure par joueur (donc par stratégie / modèle IA), avec les mesures
+                   du serveur (DECISION_METRICS) et le chemin de lecture de la réponse
+    - "payoff"   : calcul du pot, des gains par joueur (mise, part gardée, gain du tour, score
+                   cumulé) et mise à jour de l'historique
+    - "rows"     : écriture des autres colonnes du tour (part du pot, score cumulé, pot)
+    Les mesures (perf_counter_ns) vont dans des tableaux préalloués : quelques appels
+    d'horloge par tour, négligeable devant un appel LLM, on peut le laisser activé.
+    """
+
+    # Mesures par décision : colonne du sidecar -> (attribut de la stratégie, diviseur)
+    # Les durées Ollama sont en ns, converties en ms dans la table
+    DECISION_METRICS = {
+        "prompt_eval_count": ("last_prompt_eval_count", None),
+        "eval_count": ("last_eval_count", None),
+        "total_ms": ("last_total_ns", 1e6),
+        "load_ms": ("last_load_ns", 1e6),
+        "prompt_eval_ms": ("last_prompt_eval_ns", 1e6),
+        "eval_ms": ("last_eval_ns", 1e6),
+        "responses": ("last_responses", None),
+        "response_chars": ("last_response_chars", None),
+    }
+
+    def __init__(self, players_strategies, n_rounds):
+        self.strategies = [s.get_name() for s in players_strategies]
+        self.models = [getattr(s, "model_name", None) for s in players_strategies]
+        n_players = len(players_strategies)
+        self.decision_ns = np.zeros((n_rounds, n_players), dtype=np.int64)
+        self.payoff_ns = np.zeros(n_rounds, dtype=np.int64)
+        self.rows_ns = np.zeros(n_rounds, dtype=np.int64)
+        # Une matrice (tour x joueur) par mesure, -1 = pas de mesure (code pur, cache...)
+        self.metrics = {
+            column: np.full((n_rounds, n_players), -1, dtype=np.int64)
+            for column in self.DECISION_METRICS
+        }
+        # Chemin de lecture de la réponse ("schema", "reask", "fallback_regex"...)
+        self.decision_path = np.full((n_rounds, n_players), None, dtype=object)
+        self.n_rounds_done = 0
+
+    def record_decision(self, round_num, pid, strategy, duration_ns):
+        self.decision_ns[round_num - 1, pid] = duration_ns
+        for column, (attr, _) in self.DECISION_METRICS.items():
+            value = getattr(strategy, attr, None)
+            if value is not None:
+                self.metrics[column][round_num - 1, pid] = value
+        self.decision_path[round_num - 1, pid] = getattr(strategy, "last_decision_path", None)
+
+    def to_table(self, game_id):
+        """
+        Table "sidecar" au format long, clé (game_id, round) :
+        une ligne par phase et par tour (+ une par joueur pour "decision").
+        """
+        n_rounds = self.n_rounds_done
+        n_players = len(self.strategies)
+        rounds = np.arange(1, n_rounds + 1)
+
+        decisions = {
+            "round": np.repeat(rounds, n_players),
+            "phase": pa.repeat("decision", n_rounds * n_players),
+            "player_id": np.tile(np.arange(n_players), n_rounds),
+            "strategy": np.tile(np.array(self.strategies, dtype=object), n_rounds),
+            "model": pa.array(np.tile(np.array(self.models, dtype=object), n_rounds), pa.string()),
+            "duration_ms": self.decision_ns[:n_rounds].ravel() / 1e6,
+        }
+        for column, (_, divisor) in self.DECISION_METRICS.items():
+            values = self.metrics[column][:n_rounds].ravel()
+            decisions[column] = pa.array(
+                values if divisor is None else values / divisor, mask=values < 0
+            )
+        decisions["decision_path"] = pa.array(
+            self.decision_path[:n_rounds].ravel(), type=pa.string()
+        )
+        decisions = pa.table(decisions)
+
+        tables = [decisions]
+        for phase, durations in [("payoff", self.payoff_ns), ("rows", self.rows_ns)]:
+            # Pas de joueur ni de mesure LLM pour ces phases : colonnes vides
+            columns = {
+                field.name: pa.nulls(n_rounds, field.type) for field in decisions.schema
+            }
+            columns.update(
+                round=rounds,
+                phase=pa.repeat(phase, n_rounds),
+                duration_ms=durations[:n_rounds] / 1e6,
+            )
+            tables.append(pa.table(columns, schema=decisions.schema))
+        table = pa.concat_tables(tables).sort_by([("round", "ascending")])
+        return table.add_column(0, "game_id", pa.repeat(game_id, table.num_rows))
+
+
+def _settle_round(
+    round_num, current_contributions, history_global, columns, cumulative_scores, config, profiler
+):
+    """Pot, gains, historique et écriture des lignes d'un tour (mises déjà décidées)."""
+    n_players = len(current_contributions)
+
+    # Calculs
+    start = time.perf_counter_ns()
+    total_pot = sum(current_contributions)
+    multiplied_pot = total_pot * config["multiplier"]
+    share_per_player = multiplied_pot / n_players
+
+    history_global.record(current_contributions, total_pot)
+
+    # Gains par joueur, calculés directement dans les colonnes de ce tour (phase "payoff")
+    rows = slice((round_num - 1) * n_players, round_num * n_players)
+    contributions = columns["contribution"][rows]
+    kept = columns["kept_private"][rows]
+    round_gain = columns["round_gain_total"][rows]
+
+    contributions[:] = current_contributions
+    np.subtract(config["endowment"], contributions, out=kept)
+    np.add(kept, share_per_player, out=round_gain)
+    cumulative_scores += round_gain
+
+    # Écriture des autres colonnes de ce tour (phase "rows")
+    payoff_end = time.perf_counter_ns()
+    columns["pot_share_received"][rows] = round_gain - kept
+    columns["cumulative_score"][rows] = cumulative_scores
+    columns["group_total_pot"][rows] = total_pot
+
+    if profiler is not None:
+        profiler.payoff_ns[round_num - 1] = payoff_end - start
+        profiler.rows_ns[round_num - 1] = time.perf_counter_ns() - payoff_end
+        profiler.n_rounds_done = round_num
+
+
+def _start_game(players_strategies, config, profiler, checkpoint):
+    """
+    État initial de la partie : (historique, colonnes, scores cumulés, premier tour à jouer).
+    Si le checkpoint contient une partie en cours, on repart de son dernier tour sauvegardé
+    (générateur `random` compris, pour retrouver exactement les mêmes tirages).
+    """
+    state = checkpoint.load() if checkpoint is not None else None
+    if state is None:
+        n_players = len(players_strategies)
+        history_global = GameHistory(
+            n_players, config["n_rounds"], window=config.get("history_window")
+        )
+        columns = allocate_columns(players_strategies, config)
+        return history_global, columns, np.zeros(n_players, dtype=np.float64), 1
+
+    if state["players"] != [s.get_name() for s in players_strategies]:
+        raise ValueError("Ordre des joueurs différent du point de reprise")
+    random.setstate(state["random_state"])
+    if profiler is not None and state["profiler"] is not None:
+        profiler.__dict__.update(state["profiler"].__dict__)
+    print(f"🔁 Reprise de la partie après le tour {state['round']}")
+    return state["history"], state["columns"], state["cumulative_scores"], state["round"] + 1
+
+
+def _save_game(checkpoint, round_num, players_strategies, history_global, columns,
+               cumulative_scores, profiler):
+    if checkpoint is None or round_num % checkpoint.every:
+        return
+    checkpoint.save(
+        {
+            "round": round_num,
+            "players": [s.get_name() for s in players_strategies],
+            "history": history_global,
+            "columns": columns,
+            "cumulative_scores": cumulative_scores,
+            "random_state": random.getstate(),
+            "profiler": profiler,
+            "metadata": getattr(checkpoint, "metadata", None),
+        }
+    )
+
+
+def play_public_goods_game(players_strategies, config, profiler=None, checkpoint=None):
+    """
+    Retourne un dictionnaire de colonnes NumPy (voir RECORD_COLUMNS).
+    :param profiler: GameProfiler optionnel, rempli avec les temps de chaque phase
+    :param checkpoint: checkpoint.GameCheckpoint optionnel : état sauvegardé tous les
+                       `checkpoint.every` tours, et reprise si une sauvegarde existe
+    Avec config["max_concurrency"], les décisions d'un tour sont prises en parallèle
+    (voir play_public_goods_game_async).
+    """
+    if config.get("max_concurrency"):
+        return asyncio.run(
+            play_public_goods_game_async(
+                players_strategies, config, profiler, checkpoint=checkpoint
+            )
+        )
+
+    n_players = len(players_strategies)
+    history_global, columns, cumulative_scores, first_round = _start_game(
+        players_strategies, config, profiler, checkpoint
+    )
 
     # Affichage pour suivre la vitesse (l'IA peut être lente)
-    print(f"🎮 Démarrage partie : {n_players} joueurs (dont IA)...")
+    verbose = config.get("verbose", True)
+    if verbose:
+        print(f"🎮 Démarrage partie : {n_players} joueurs (dont IA)...")
 
-    for round_num in range(1, config["n_rounds"] + 1):
-        print(f"   > Tour {round_num}/{config['n_rounds']}...", end=" ", flush=True)
-        current_contributions = {}
+    for round_num in range(first_round, config["n_rounds"] + 1):
+        if verbose:
+            print(f"   > Tour {round_num}/{config['n_rounds']}...", end=" ", flush=True)
+        current_contributions = [0] * n_players
 
         # Phase de Décision
         for pid, strategy in enumerate(players_strategies):
+            start = time.perf_counter_ns()
             contribution = strategy.decide_contribution(
                 history_global, pid, config["endowment"]
             )
             contribution = max(0, min(contribution, config["endowment"]))
             current_contributions[pid] = contribution
+            _mark_fallback(columns, (round_num - 1) * n_players + pid, strategy)
+            if profiler is not None:
+                profiler.record_decision(
+                    round_num, pid, strategy, time.perf_counter_ns() - start
+                )
 
-        # Calculs
-        total_pot = sum(current_contributions.values())
-        multiplied_pot = total_pot * config["multiplier"]
-        share_per_player = multiplied_pot / n_players
-
-        history_global.append(
-            {
-                "round": round_num,
-                "contributions": current_contributions,
-                "total_pot": total_pot,
-            }
+        _settle_round(
+            round_num, current_contributions, history_global, columns, cumulative_scores,
+            config, profiler,
+        )
+        _save_game(
+            checkpoint, round_num, players_strategies, history_global, columns,
+            cumulative_scores, profiler,
         )
 
-        for pid, strategy in enumerate(players_strategies):
-            kept = config["endowment"] - current_contributions[pid]
-            round_gain = kept + share_per_player
-            cumulative_scores[pid] += round_gain
+    return columns
 
-            dataset.append(
-                {
-                    "round": round_num,
-                    "player_id": pid,
-                    "strategy": strategy.get_name(),
-                    "endowment": config["endowment"],
-                    "contribution": current_contributions[pid],
-                    "kept_private": kept,
-                    "pot_share_received": round_gain - kept,
-                    "round_gain_total": round_gain,
-                    "cumulative_score": cumulative_scores[pid],
-                    "group_total_pot": total_pot,
-                    "group_synergy_factor": config["multiplier"],
-                }
+
+async def play_public_goods_game_async(
+    players_strategies, config, profiler=None, semaphore=None, checkpoint=None
+):
+    """
+    Même partie que play_public_goods_game, mais la phase de décision de chaque tour
+    envoie les requêtes de tous les joueurs en même temps : les décisions ne dépendent
+    que des tours précédents, l'ordre d'appel ne change donc rien au résultat.
+    Les mises sont rangées dans l'ordre des joueurs (asyncio.gather garde l'ordre).
+    :param semaphore: asyncio.Semaphore limitant les requêtes en vol ; par défaut un
+                      sémaphore de config["max_concurrency"] places (partageable entre parties)
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(config.get("max_concurrency") or len(players_strategies))
+
+    n_players = len(players_strategies)
+    history_global, columns, cumulative_scores, first_round = _start_game(
+        players_strategies, config, profiler, checkpoint
+    )
+
+    verbose = config.get("verbose", True)
+    if verbose:
+        print(f"🎮 Démarrage partie : {n_players} joueurs (dont IA)...")
+
+    async def decide(round_num, pid, strategy):
+        start = time.perf_counter_ns()
+        async with semaphore:
+            contribution = await strategy.decide_contribution_async(
+                history_global, pid, config["endowment"]
             )
+        _mark_fallback(columns, (round_num - 1) * n_players + pid, strategy)
+        if profiler is not None:
+            profiler.record_decision(round_num, pid, strategy, time.perf_counter_ns() - start)
+        return max(0, min(contribution, config["endowment"]))
+
+    for round_num in range(first_round, config["n_rounds"] + 1):
+        if verbose:
+            print(f"   > Tour {round_num}/{config['n_rounds']}...", end=" ", flush=True)
+
+        # Phase de Décision (concurrente)
+        current_contributions = await asyncio.gather(
+            *(decide(round_num, pid, s) for pid, s in enumerate(players_strategies))
+        )
+
+        _settle_round(
+            round_num, current_contributions, history_global, columns, cumulative_scores,
+            config, profiler,
+        )
+        _save_game(
+            checkpoint, round_num, players_strategies, history_global, columns,
+            cumulative_scores, profiler,
+        )
 
-    return dataset
+    return columns
 
 
 # --- TEST RAPIDE (Si exécuté directement) ---
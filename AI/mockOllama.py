@@ -0,0 +1,279 @@
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- FAUX SERVEUR OLLAMA (TESTS ET BENCHMARKS SANS GPU) ---
+# Parle la même API HTTP qu'Ollama (/api/chat, /api/generate, /api/tags, /api/version) :
+# LLMStrategy, LLMClient, le cache, l'ordonnanceur... fonctionnent sans modification,
+# il suffit de pointer le client sur ce serveur (OLLAMA_HOST=http://127.0.0.1:11435).
+#
+# Le temps de réponse est simulé :
+#   latence de base (loi log-normale) + tokens de prompt / prompt_tps + tokens générés / gen_tps
+#   + temps de chargement quand on change de modèle (un seul modèle en mémoire)
+# avec au plus `parallel` requêtes traitées en même temps (comme OLLAMA_NUM_PARALLEL).
+# Les réponses imitent les personas (altruiste, opportuniste, adaptatif) à partir du prompt.
+
+MOCK_CONFIG = {
+    "latency_ms": 50.0,  # Latence de base médiane
+    "latency_sigma": 0.3,  # Dispersion (log-normale) de la latence de base
+    "prompt_tps": 2000.0,  # Vitesse d'évaluation du prompt (tokens/s)
+    "gen_tps": 50.0,  # Vitesse de génération (tokens/s)
+    "verbose_tokens": 20,  # Tokens générés en texte libre (le LLM "bavarde" autour du nombre)
+    "parallel": 4,  # Requêtes traitées en même temps
+    "load_time": 1.0,  # Secondes pour charger un modèle (changement de modèle)
+    "error_rate": 0.0,  # Probabilité d'une erreur HTTP 500
+    "garbage_rate": 0.0,  # Probabilité d'une réponse sans nombre (teste les replis)
+    "seed": None,
+    "models": None,  # Modèles "installés" (None = tous) ; sinon 404 comme Ollama
+}
+
+# Repérage du persona dans le prompt (textes de PERSONA_PROMPTS)
+PERSONA_MARKERS = {
+    "altruist": "Coopérateur Bienveillant",
+    "greedy": "Calculateur Opportuniste",
+    "adaptive": "Joueur Pragmatique",
+}
+
+
+def _count_tokens(text):
+    # Approximation suffisante pour simuler les temps : ~4 caractères par token
+    return max(1, len(text) // 4)
+
+
+def scripted_contribution(prompt, endowment, rng):
+    """Mise "plausible" selon le persona du prompt et la moyenne des autres au dernier tour."""
+    persona = next(
+        (name for name, marker in PERSONA_MARKERS.items() if marker in prompt), "adaptive"
+    )
+    others = re.findall(r"Les autres ont mis en moyenne ([\d.]+)", prompt)
+    avg_others = float(others[-1]) if others else endowment / 2
+
+    if persona == "altruist":
+        value = rng.randint(15, endowment) if avg_others >= 5 else rng.randint(10, 15)
+    elif persona == "greedy":
+        value = round(avg_others * 0.6) + rng.randint(-1, 1)
+    else:
+        value = round(avg_others) + rng.randint(-2, 2)
+    return max(0, min(int(value), endowment))
+
+
+class MockOllamaServer:
+    """
+    Serveur HTTP local (un thread par requête).
+    Usage :
+        server = MockOllamaServer(port=0, latency_ms=100).start()
+        client = LLMClient(host=server.url)
+        ...
+        server.stop()
+    """
+
+    def __init__(self, host="127.0.0.1", port=11435, **config):
+        unknown = set(config) - set(MOCK_CONFIG)
+        if unknown:
+            raise ValueError(f"Options inconnues : {sorted(unknown)}")
+        self.config = dict(MOCK_CONFIG, **config)
+        self.rng = random.Random(self.config["seed"])
+        self._rng_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.config["parallel"])
+        self._model_lock = threading.Lock()
+        self.loaded_model = None
+        self.stats = {"requests": 0, "errors": 0, "model_loads": 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Connexions persistantes (keep-alive)
+
+            def setup(self):
+                super().setup()
+                # Réponses courtes : sans TCP_NODELAY, l'algorithme de Nagle ajoute ~40 ms
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, format, *args):
+                pass  # Pas de log par requête
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    names = server.config["models"] or [server.loaded_model or "gemma2"]
+                    self._send_json(
+                        200, {"models": [{"name": name, "model": name} for name in names]}
+                    )
+                elif self.path == "/api/version":
+                    self._send_json(200, {"version": "mock"})
+                else:
+                    body = b"Ollama is running"
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/chat":
+                    status, payload = server.handle_chat(request)
+                elif self.path == "/api/generate":
+                    status, payload = server.handle_generate(request)
+                else:
+                    status, payload = 404, {"error": f"route inconnue : {self.path}"}
+                self._send_json(status, payload)
+
+        return Handler
+
+    # --- Simulation ---
+
+    def _random(self):
+        with self._rng_lock:
+            return random.Random(self.rng.random())
+
+    def _load(self, model):
+        """Charge le modèle s'il n'est pas déjà en mémoire ; renvoie le temps de chargement (s)."""
+        with self._model_lock:
+            if model == self.loaded_model:
+                return 0.0
+            time.sleep(self.config["load_time"])
+            self.loaded_model = model
+            with self._stats_lock:
+                self.stats["model_loads"] += 1
+            return self.config["load_time"]
+
+    def _answer(self, request, rng):
+        """(texte de la réponse, tokens générés, tokens du prompt)"""
+        messages = request.get("messages") or [{"content": request.get("prompt", "")}]
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        match = re.search(r"entre 0 et (\d+)", prompt)
+        endowment = int(match.group(1)) if match else 20
+        value = scripted_contribution(prompt, endowment, rng)
+        num_predict = (request.get("options") or {}).get("num_predict")
+
+        if isinstance(request.get("format"), dict):
+            text, n_tokens = json.dumps({"contribution": value}), 8
+        elif rng.random() < self.config["garbage_rate"]:
+            text, n_tokens = "Je préfère observer encore un peu.", self.config["verbose_tokens"]
+        else:
+            text = f"{value}" if rng.random() < 0.5 else f"Je mise {value}."
+            n_tokens = self.config["verbose_tokens"]
+        if num_predict is not None and num_predict > 0:
+            n_tokens = min(n_tokens, num_predict)
+        return text, n_tokens, _count_tokens(prompt)
+
+    def handle_chat(self, request):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+        rng = self._random()
+        if rng.random() < self.config["error_rate"]:
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            return 500, {"error": "mock: erreur simulée"}
+
+        model = request.get("model", "")
+        if self.config["models"] is not None and model not in self.config["models"]:
+            return 404, {"error": f"model '{model}' not found"}
+        with self._slots:
+            start = time.perf_counter()
+            load_s = self._load(model)
+            text, eval_count, prompt_count = self._answer(request, rng)
+            base_s = rng.lognormvariate(0, self.config["latency_sigma"]) * (
+                self.config["latency_ms"] / 1000
+            )
+            prompt_s = prompt_count / self.config["prompt_tps"]
+            eval_s = eval_count / self.config["gen_tps"]
+            time.sleep(base_s + prompt_s + eval_s)
+            total_s = time.perf_counter() - start
+
+        return 200, {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": text},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(total_s * 1e9),
+            "load_duration": int(load_s * 1e9),
+            "prompt_eval_count": prompt_count,
+            "prompt_eval_duration": int(prompt_s * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": int(eval_s * 1e9),
+        }
+
+    def handle_generate(self, request):
+        # Utilisé par LLMClient.warm_up : charge le modèle, ne génère rien pour un prompt vide
+        load_s = self._load(request.get("model", ""))
+        return 200, {
+            "model": request.get("model", ""),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": "",
+            "done": True,
+            "load_duration": int(load_s * 1e9),
+        }
+
+    # --- Cycle de vie ---
+
+    def start(self):
+        """Lance le serveur dans un thread de fond (pour les benchmarks / tests)."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            # shutdown() attend la fin de serve_forever : seulement si start() l'a lancé
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur Ollama pour tests et benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", nargs="+", default=None, help="Modèles servis (défaut : tous)")
+    for key, default in MOCK_CONFIG.items():
+        if key == "models":
+            continue
+        parser.add_argument(
+            f"--{key.replace('_', '-')}", type=float if key != "seed" else int, default=default
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    args["parallel"] = int(args["parallel"])
+    args["verbose_tokens"] = int(args["verbose_tokens"])
+
+    server = MockOllamaServer(host, port, **args)
+    print(f"🤖 Faux Ollama sur {server.url} (OLLAMA_HOST={server.url})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt.")
+        server.stop()
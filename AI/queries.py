@@ -0,0 +1,175 @@
+# --- REQUÊTES DUCKDB DU DASHBOARD ---
+# Centralisées ici pour être utilisées à la fois par streamlit.py et par benchmark.py
+# (les benchmarks mesurent exactement les requêtes du dashboard).
+# `source` est l'expression placée après FROM : un fichier (file_source) ou une table du jeu
+# partitionné filtrée par modèle / scénario (dataset.source_sql, seuls les bons fichiers sont lus).
+
+
+def file_source(path):
+    """Un fichier Parquet (ou un motif glob) comme source des requêtes."""
+    return "'" + path.replace("'", "''") + "'"
+
+
+def kpis_sql(source):
+    return f"""
+    SELECT 
+        COUNT(DISTINCT game_id) as nb_parties,
+        AVG(contribution) as mise_moyenne,
+        AVG(round_gain_total) as gain_moyen,
+        MAX(model_used) as modele_ia
+    FROM {source}
+    """
+
+
+def timeline_aggregated_sql(source):
+    """Moyenne globale par stratégie (Vue d'ensemble)"""
+    return f"""
+    SELECT 
+        round,
+        strategy,
+        AVG(contribution) as contribution_moyenne
+    FROM {source}
+    GROUP BY round, strategy
+    ORDER BY round
+    """
+
+
+def list_of_games_sql(source):
+    """Liste des IDs de parties disponibles"""
+    return f"SELECT DISTINCT game_id FROM {source}"
+
+
+def single_game_data_sql(source, game_id):
+    """Données d'une seule partie pour voir les joueurs individuels"""
+    return f"""
+    SELECT 
+        round,
+        player_id,
+        strategy,
+        contribution,
+        cumulative_score
+    FROM {source}
+    WHERE game_id = '{game_id}'
+    ORDER BY round, player_id
+    """
+
+
+def ranking_sql(source):
+    return f"""
+    SELECT 
+        strategy,
+        AVG(contribution) as contribution_globale,
+        AVG(cumulative_score) as score_final
+    FROM {source}
+    WHERE round = (SELECT MAX(round) FROM {source})
+    GROUP BY strategy
+    ORDER BY score_final DESC
+    """
+
+
+def single_game_ranking_sql(source, game_id):
+    """Classement final pour UNE partie spécifique avec ID joueurs"""
+    # On récupère le score cumulé au dernier tour pour chaque joueur
+    return f"""
+    SELECT 
+        player_id,
+        strategy,
+        MAX(cumulative_score) as score_final,
+        AVG(contribution) as contribution_moyenne_partie
+    FROM {source}
+    WHERE game_id = '{game_id}'
+    GROUP BY player_id, strategy
+    ORDER BY score_final DESC
+    """
+
+
+
+# --- TÉLÉMÉTRIE LLM (table "timings" du jeu partitionné ou sidecar "_timings.parquet") ---
+# Une ligne par décision IA réellement calculée par le serveur (hors code pur, substitut et
+# réponses du cache : "responses" les compte, mais elles n'ont pas de mesure serveur).
+# duration_ms = temps vu par le moteur (attente comprise), total_ms = temps du serveur.
+
+LLM_DECISIONS = "phase = 'decision' AND model IS NOT NULL AND total_ms IS NOT NULL"
+
+
+def latency_percentiles_sql(source):
+    """Percentiles de latence par modèle (bout en bout et côté serveur)."""
+    return f"""
+    SELECT
+        model,
+        COUNT(*) as decisions,
+        quantile_cont(duration_ms, 0.5) as p50_ms,
+        quantile_cont(duration_ms, 0.9) as p90_ms,
+        quantile_cont(duration_ms, 0.99) as p99_ms,
+        quantile_cont(total_ms, 0.5) as serveur_p50_ms,
+        quantile_cont(total_ms, 0.99) as serveur_p99_ms
+    FROM {source}
+    WHERE {LLM_DECISIONS}
+    GROUP BY model
+    ORDER BY model
+    """
+
+
+def tokens_per_second_sql(source):
+    """Débit du serveur par modèle : tokens de prompt évalués et tokens générés par seconde."""
+    return f"""
+    SELECT
+        model,
+        SUM(prompt_eval_count) / (SUM(prompt_eval_ms) / 1000) as prompt_tokens_s,
+        SUM(eval_count) / (SUM(eval_ms) / 1000) as generation_tokens_s,
+        AVG(prompt_eval_count) as prompt_tokens_moyen,
+        AVG(eval_count) as tokens_generes_moyen,
+        AVG(response_chars) as taille_reponse_moyenne
+    FROM {source}
+    WHERE {LLM_DECISIONS}
+    GROUP BY model
+    ORDER BY model
+    """
+
+
+def time_split_sql(source):
+    """Temps serveur cumulé par modèle : chargement, évaluation du prompt, génération, reste."""
+    return f"""
+    SELECT
+        model,
+        SUM(load_ms) / 1000 as chargement_s,
+        SUM(prompt_eval_ms) / 1000 as evaluation_prompt_s,
+        SUM(eval_ms) / 1000 as generation_s,
+        SUM(total_ms - load_ms - prompt_eval_ms - eval_ms) / 1000 as autre_s
+    FROM {source}
+    WHERE {LLM_DECISIONS}
+    GROUP BY model
+    ORDER BY model
+    """
+
+
+def decision_paths_sql(source):
+    """Issue de la lecture des réponses (regex, schema, reask, fallback..., error) par modèle."""
+    return f"""
+    SELECT
+        model,
+        decision_path,
+        COUNT(*) as decisions
+    FROM {source}
+    WHERE phase = 'decision' AND model IS NOT NULL
+    GROUP BY model, decision_path
+    ORDER BY model, decisions DESC
+    """
+
+
+# Sur le jeu partitionné, certaines requêtes se passent de la jointure "results" x "games"
+# (dataset.scan_sql au lieu de dataset.source_sql) :
+# - colonnes des lignes seulement (ni game_id, ni constantes de partie) -> table "results"
+ROW_QUERIES = {"timeline_aggregated", "ranking"}
+# - colonnes des parties seulement -> table "games" (une ligne par partie)
+GAME_QUERIES = {"list_of_games"}
+
+# Nom -> requête, pour les benchmarks (les requêtes "single_game" prennent aussi un game_id)
+DASHBOARD_QUERIES = {
+    "kpis": kpis_sql,
+    "timeline_aggregated": timeline_aggregated_sql,
+    "list_of_games": list_of_games_sql,
+    "single_game_data": single_game_data_sql,
+    "ranking": ranking_sql,
+    "single_game_ranking": single_game_ranking_sql,
+}
@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import os
+import random
+import time
+
+from mainGame import (
+    play_public_goods_game_async,
+    LLMStrategy,
+    Altruist,
+    FreeRider,
+    ConditionalCooperator,
+    GameProfiler,
+    PROMPT_MODES,
+    DECISION_MODES,
+)
+from llmClient import DEFAULT_KEEP_ALIVE, LLMBackendPool, LLMClient
+from llmResilience import CallPolicy
+from checkpoint import RunCheckpoint, restore_player_order
+from surrogate import SURROGATE_SUFFIX, SurrogatePolicy, SurrogateStrategy, surrogate_players
+from createData import (
+    AI_GAME_CONFIG,
+    MODEL_NAME,
+    models_used,
+    to_record_batch,
+)
+from dataset import DATASET_ROOT, DatasetWriter, new_run_id
+
+# --- ORDONNANCEUR MULTI-PARTIES ---
+# Une partie IA passe l'essentiel de son temps à attendre Ollama. Au lieu de jouer les
+# parties une par une, on en lance beaucoup à la fois (plusieurs scénarios mélangés)
+# dans une seule boucle asyncio, avec un plafond GLOBAL de requêtes LLM en vol :
+# le serveur d'inférence reste occupé sans être noyé.
+#
+# Équité : asyncio.Semaphore réveille les requêtes en attente dans l'ordre d'arrivée,
+# donc chaque partie avance tour après tour au même rythme que les autres.
+
+
+def _scenario_1(model, **llm_options):
+    """Le Choc des Psychologies (Full IA)"""
+    return [
+        LLMStrategy(model_name=model, persona="greedy", **llm_options),
+        LLMStrategy(model_name=model, persona="altruist", **llm_options),
+        LLMStrategy(model_name=model, persona="adaptive", **llm_options),
+        LLMStrategy(model_name=model, persona="adaptive", **llm_options),
+    ]
+
+
+def _scenario_2(model, **llm_options):
+    """L'IA face aux Robots (IA vs Code)"""
+    return [
+        LLMStrategy(model_name=model, persona="adaptive", **llm_options),
+        ConditionalCooperator(),
+        FreeRider(),
+        Altruist(),
+    ]
+
+
+def _scenario_3(model, **llm_options):
+    """Le Cauchemar (1 Altruiste vs 3 Greedy)"""
+    return [LLMStrategy(model_name=model, persona="altruist", **llm_options)] + [
+        LLMStrategy(model_name=model, persona="greedy", **llm_options) for _ in range(3)
+    ]
+
+
+def _scenario_4(model, **llm_options):
+    """Tous Adaptatifs"""
+    return [LLMStrategy(model_name=model, persona="adaptive", **llm_options) for _ in range(4)]
+
+
+def _scenario_5(model, **llm_options):
+    """Gemma 2 vs Gemma 3 : Tous Adaptatifs (deux modèles à la même table, `model` ignoré)"""
+    return [
+        LLMStrategy(model_name=name, persona="adaptive", **llm_options)
+        for name in ["gemma2", "gemma2", "gemma3", "gemma3"]
+    ]
+
+
+# Scénario -> (fabrique de joueurs, étiquette de la colonne "scenario")
+# Une fabrique crée des joueurs neufs à chaque partie (l'ordre autour de la table est mélangé) ;
+# llm_options (cache, client...) est transmis à chaque LLMStrategy
+SCENARIOS = {
+    1: (_scenario_1, "Full_IA_Psychology"),
+    2: (_scenario_2, "IA_vs_Code"),
+    3: (_scenario_3, "Altruist_vs_Greedy"),
+    4: (_scenario_4, "All_Adaptive"),
+    5: (_scenario_5, "Gemma2_vs_Gemma3"),
+}
+
+
+def interleave_jobs(scenario_ids, n_games):
+    """Ordre de lancement : partie 1 de chaque scénario, puis partie 2, etc."""
+    return [(scenario_id, i) for i in range(n_games) for scenario_id in scenario_ids]
+
+
+async def run_scenarios(
+    scenario_ids,
+    n_games,
+    config=AI_GAME_CONFIG,
+    model=MODEL_NAME,
+    cache=None,
+    client=None,
+    max_in_flight=8,
+    max_active_games=None,
+    root=DATASET_ROOT,
+    profile=True,
+    prompt_mode="single",
+    decision_mode="free",
+    checkpoint_dir=None,
+    surrogate=None,
+    surrogate_fallback=True,
+    call_policy=None,
+    on_error="zero",
+):
+    """
+    Joue n_games parties de chaque scénario en parallèle.
+    Chaque partie est envoyée dès qu'elle se termine à la partition modèle / scénario / date
+    du jeu de données `root` (voir dataset.py), par row groups complets ; les fichiers
+    n'apparaissent qu'à la fin. Sur un crash, les parties terminées sont dans checkpoint_dir.
+    :param cache: llmCache.LLMResponseCache optionnel (voir createData.llm_cache), partagé
+                  par tous les joueurs IA. Pas de cache en "read_through" pour générer des
+                  données : les parties rejoueraient les mêmes réponses (tirages corrélés)
+    :param client: llmClient.LLMClient (ou LLMBackendPool) optionnel ; c'est alors lui qui
+                   plafonne les requêtes (son propre max_in_flight) et les regroupe par modèle
+    :param max_in_flight: Requêtes LLM en vol au maximum, toutes parties confondues
+    :param max_active_games: Parties commencées en même temps (par défaut max_in_flight) :
+                             les parties se terminent au fil de l'eau au lieu de toutes à la fin
+    :param prompt_mode: "single" ou "prefix" (voir LLMStrategy._build_messages)
+    :param decision_mode: "free" ou "structured" (sortie JSON contrainte, voir LLMStrategy)
+    :param checkpoint_dir: Dossier de points de reprise (un sous-dossier par scénario) :
+                           relancer avec le même dossier saute les parties terminées et
+                           reprend les parties en cours à leur dernier tour sauvegardé
+    :param surrogate: surrogate.SurrogatePolicy optionnelle : les joueurs IA tirent leur mise
+                      dans la politique apprise au lieu d'appeler le LLM (scénario écrit
+                      avec le suffixe SURROGATE_SUFFIX)
+    :param surrogate_fallback: Avec surrogate, les situations peu connues sont quand même
+                               décidées par le LLM (False : aucun appel au LLM)
+    :param call_policy: llmResilience.CallPolicy optionnelle (délais, nouvelles tentatives,
+                        doublons, disjoncteur), partagée par toutes les parties
+    :param on_error: Mise quand le LLM n'a pas pu décider ("zero" ou "last"), voir LLMStrategy
+    :return: Nombre de parties terminées par scénario
+    """
+    config = dict(config, verbose=False)
+    if client is None:
+        requests = asyncio.Semaphore(max_in_flight)
+    else:
+        # Toutes les requêtes doivent atteindre la file du client pour qu'il puisse les
+        # regrouper par modèle : pas de plafond supplémentaire côté moteur
+        requests = contextlib.nullcontext()
+    game_slots = asyncio.Semaphore(max_active_games or max_in_flight)
+    jobs = interleave_jobs(scenario_ids, n_games)
+    done = {scenario_id: 0 for scenario_id in scenario_ids}
+    prompt_tokens = {"evaluated": 0, "decisions": 0}
+    surrogate_calls = {"decisions": 0, "fallbacks": 0}
+
+    checkpoints = {}
+    if checkpoint_dir is not None:
+        checkpoints = {
+            scenario_id: RunCheckpoint(os.path.join(checkpoint_dir, f"scenario_{scenario_id}"))
+            for scenario_id in scenario_ids
+        }
+
+    # Un seul nom de fichiers pour l'exécution (toutes tables) ; repris du point de reprise
+    run_id, run_date = new_run_id(), datetime.date.today().isoformat()
+    for checkpoint in checkpoints.values():
+        run_id, run_date = checkpoint.dataset_run(run_id, run_date)
+    writer = DatasetWriter(root, "results", run_date, run_id=run_id)
+    timings_writer = DatasetWriter(root, "timings", run_date, run_id=run_id) if profile else None
+
+    def write_game(batch, timings):
+        # Synchrone, dans la boucle : pas d'accès concurrent aux fichiers. Pas de flush par
+        # partie : le fichier .tmp reste illisible jusqu'à la fermeture, un flush ne protège
+        # de rien et donnerait des row groups d'une partie (voir ParquetStreamWriter)
+        if timings is not None:
+            model_used, scenario = batch["model_used"][0].as_py(), batch["scenario"][0].as_py()
+            for timings_batch in timings.to_batches():
+                timings_writer.write(timings_batch, model_used, scenario)
+        writer.write(batch)
+
+    async def play(scenario_id, game_num):
+        factory, scenario_label = SCENARIOS[scenario_id]
+        if surrogate is not None:
+            # Mises tirées du substitut (même en mode fallback) : pas de vraies parties LLM
+            scenario_label += SURROGATE_SUFFIX
+        checkpoint = checkpoints.get(scenario_id)
+        if checkpoint is not None and checkpoint.has_game(game_num):
+            batch, timings = checkpoint.load_game(game_num)
+            write_game(batch, timings if profile else None)
+            done[scenario_id] += 1
+            return
+
+        # run_id dans le game_id : deux exécutions lancées la même seconde n'ont pas les mêmes
+        # parties (dataset.game_key est tiré du game_id, la jointure avec "games" se fait dessus)
+        game_id = f"IA_S{scenario_id}_{run_id}_{game_num + 1}"
+        async with game_slots:
+            players = factory(
+                model,
+                cache=cache,
+                client=client,
+                prompt_mode=prompt_mode,
+                decision_mode=decision_mode,
+                call_policy=call_policy,
+                on_error=on_error,
+            )
+            if surrogate is not None:
+                players = surrogate_players(players, surrogate, fallback=surrogate_fallback)
+            game_checkpoint = state = None
+            if checkpoint is not None:
+                game_checkpoint = checkpoint.game(game_num, metadata={"game_id": game_id})
+                state = game_checkpoint.load()
+            if state is not None:
+                # Reprise : même game_id et même ordre des joueurs que la partie interrompue
+                game_id = state["metadata"]["game_id"]
+                game_checkpoint.metadata = state["metadata"]
+                players = restore_player_order(players, state["players"])
+            else:
+                random.shuffle(players)
+            profiler = GameProfiler(players, config["n_rounds"]) if profile else None
+            data = await play_public_goods_game_async(
+                players, config, profiler, requests, checkpoint=game_checkpoint
+            )
+
+        timings = None
+        if profiler is not None:
+            evaluated = profiler.metrics["prompt_eval_count"]
+            evaluated = evaluated[evaluated >= 0]
+            prompt_tokens["evaluated"] += int(evaluated.sum())
+            prompt_tokens["decisions"] += evaluated.size
+            timings = profiler.to_table(game_id)
+        for player in players:
+            if isinstance(player, SurrogateStrategy):
+                surrogate_calls["decisions"] += player.n_decisions
+                surrogate_calls["fallbacks"] += player.n_fallbacks
+        batch = to_record_batch(
+            data,
+            game_id=game_id,
+            scenario=scenario_label,
+            model_used=models_used(players, default=model),
+        )
+        if checkpoint is not None:
+            checkpoint.save_game(game_num, batch, timings)
+        write_game(batch, timings)
+
+        done[scenario_id] += 1
+        print(
+            f"   ✅ Scénario {scenario_id} - partie {game_num + 1} terminée "
+            f"({sum(done.values())}/{len(jobs)})"
+        )
+
+    try:
+        await asyncio.gather(*(play(scenario_id, i) for scenario_id, i in jobs))
+    finally:
+        writer.close()
+        if timings_writer is not None:
+            timings_writer.close()
+    # Tout est dans le jeu de données : les points de reprise ne servent plus
+    for checkpoint in checkpoints.values():
+        checkpoint.clear()
+
+    if prompt_tokens["decisions"]:
+        print(
+            f"🧮 Tokens de prompt évalués ({prompt_mode}) : {prompt_tokens['evaluated']} "
+            f"({prompt_tokens['evaluated'] / prompt_tokens['decisions']:.0f} par appel LLM)"
+        )
+    if call_policy is not None and call_policy.stats["calls"]:
+        stats = call_policy.stats
+        print(
+            f"🛡️ Appels LLM : {stats['calls']} tentatives, {stats['retries']} nouvelles, "
+            f"{stats['timeouts']} délais dépassés, {stats['hedges']} doublons "
+            f"({stats['hedge_wins']} gagnants), {stats['rejected']} refusés (disjoncteur)"
+        )
+    if surrogate_calls["decisions"]:
+        print(
+            f"🧠 Décisions du substitut renvoyées au LLM : {surrogate_calls['fallbacks']}"
+            f"/{surrogate_calls['decisions']}"
+        )
+    return done
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lance plusieurs scénarios IA en parallèle")
+    parser.add_argument(
+        "--scenarios", type=int, nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS)
+    )
+    parser.add_argument("--games", type=int, default=50, help="Parties par scénario")
+    parser.add_argument(
+        "--in-flight", type=int, default=8, help="Requêtes LLM simultanées (toutes parties)"
+    )
+    parser.add_argument("--active-games", type=int, default=None, help="Parties simultanées")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--dataset", default=DATASET_ROOT, help="Racine du jeu partitionné")
+    parser.add_argument(
+        "--host", nargs="+", default=None,
+        help="Serveur(s) Ollama (défaut : OLLAMA_HOST) ; plusieurs = pool, routage au moins chargé",
+    )
+    parser.add_argument(
+        "--endpoint-in-flight", type=int, default=4,
+        help="Requêtes simultanées max par serveur (avec plusieurs --host)",
+    )
+    parser.add_argument(
+        "--keep-alive", default=DEFAULT_KEEP_ALIVE, help="Maintien des modèles en mémoire"
+    )
+    parser.add_argument(
+        "--prompt-mode", default="single", choices=PROMPT_MODES,
+        help="prefix : règles et persona en message système, réutilisables par le cache du serveur",
+    )
+    parser.add_argument(
+        "--decision-mode", default="free", choices=DECISION_MODES,
+        help="structured : réponse JSON imposée par schéma, tokens générés plafonnés",
+    )
+    parser.add_argument(
+        "--checkpoint-dir", default="checkpoints/scheduler",
+        help="Points de reprise : relancer la même commande reprend l'exécution interrompue",
+    )
+    parser.add_argument(
+        "--surrogate", default=None, choices=["fallback", "only"],
+        help="Politique apprise sur les parties enregistrées au lieu du LLM "
+        "(fallback : LLM si la situation est peu connue, only : jamais de LLM)",
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="Secondes max par appel LLM")
+    parser.add_argument("--retries", type=int, default=2, help="Nouvelles tentatives par appel")
+    parser.add_argument(
+        "--hedge-percentile", type=float, default=None,
+        help="Doublon d'une requête plus lente que ce percentile des latences récentes (ex : 95)",
+    )
+    parser.add_argument(
+        "--on-error", default="last", choices=["zero", "last"],
+        help="Mise quand le LLM n'a pas pu décider (marquée dans la colonne llm_fallback)",
+    )
+    args = parser.parse_args()
+    call_policy = CallPolicy(args.timeout, args.retries, hedge_percentile=args.hedge_percentile)
+    client = None
+    if args.surrogate != "only" and args.host and len(args.host) > 1:
+        client = LLMBackendPool(
+            [
+                {
+                    "host": host,
+                    "max_in_flight": args.endpoint_in_flight,
+                    "keep_alive": args.keep_alive,
+                    "timeout": 2 * args.timeout,
+                }
+                for host in args.host
+            ]
+        )
+    elif args.surrogate != "only":
+        client = LLMClient(
+            args.host[0] if args.host else None, keep_alive=args.keep_alive,
+            max_in_flight=args.in_flight, timeout=2 * args.timeout,
+        )
+    surrogate = SurrogatePolicy.from_parquet(args.dataset) if args.surrogate else None
+
+    print(
+        f"🚀 {args.games} parties x {len(args.scenarios)} scénarios avec {args.model} "
+        f"({args.in_flight} requêtes en vol max)"
+    )
+    start = time.perf_counter()
+    try:
+        asyncio.run(
+            run_scenarios(
+                args.scenarios,
+                args.games,
+                model=args.model,
+                client=client,
+                prompt_mode=args.prompt_mode,
+                decision_mode=args.decision_mode,
+                checkpoint_dir=args.checkpoint_dir,
+                surrogate=surrogate,
+                surrogate_fallback=args.surrogate == "fallback",
+                call_policy=call_policy,
+                on_error=args.on_error,
+                max_in_flight=args.in_flight,
+                max_active_games=args.active_games,
+                root=args.dataset,
+            )
+        )
+        print(f"\n🎉 Terminé en {time.perf_counter() - start:.0f}s")
+        if client is not None:
+            print(f"🔁 Changements de modèle : {client.switches}")
+        if isinstance(client, LLMBackendPool):
+            for endpoint in client.summary():
+                print(
+                    f"   🖥️ {endpoint['host']} : {endpoint['served']} requêtes, "
+                    f"{endpoint['failures']} échecs{'' if endpoint['healthy'] else ' (hors service)'}"
+                )
+    except KeyboardInterrupt:
+        print(
+            "\n🛑 Interruption : relancez la même commande pour reprendre "
+            f"(points de reprise dans {args.checkpoint_dir})."
+        )
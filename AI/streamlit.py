@@ -3,6 +3,8 @@ import duckdb
 import plotly.express as px
 import os
 import pandas as pd
+import dataset
+import queries
 
 # --- CONFIGURATION DE LA PAGE ---
 st.set_page_config(page_title="IA & Théorie des Jeux", page_icon="🤖", layout="wide")
@@ -15,80 +17,108 @@ Visualisation des expériences comportementales : **Greedy** (Avare), **Altruist
 )
 
 # --- CONFIGURATION DES FICHIERS ---
+# Jeu de données partitionné (modèle / scénario / date, voir dataset.py) écrit par
+# createData.py et scheduler.py ; les filtres de la barre latérale portent sur les partitions,
+# DuckDB ne lit donc que les fichiers du modèle et du scénario choisis.
+DATASET_ROOT = dataset.DATASET_ROOT
+
+# Anciens fichiers triés à la main, affichés tant que le jeu partitionné est vide
+# (`python dataset.py --migrate` les y recopie)
 SCENARIOS = {
-    "Gemma 2 Scénario 1 : Le Choc des Psychologies (Full IA)": "data_gemma2/simulation_IA_results1.parquet",
-    "Gemma 2 Scénario 2 : L'IA face aux Robots (IA vs Code)": "data_gemma2/simulation_IA_results2.parquet",
-    "Gemma 2 Scénario 3 : Le Cauchemar (1 Altruiste vs 3 Greedy)": "data_gemma2/simulation_IA_results3.parquet",
-    "Gemma 2 Scénario 4 : Tous Adaptatifs": "data_gemma2/simulation_IA_results4.parquet",
-    "Gemma 3 Scénario 1": "data_gemma3/simulation_IA_results1.parquet",
-    "Gemma 3 Scénario 2": "data_gemma3/simulation_IA_results2.parquet",
-    "Gemma 3 Scénario 3": "data_gemma3/simulation_IA_results3.parquet",
-    "Gemma 3 Scénario 4": "data_gemma3/simulation_IA_results4.parquet",
-    "Gemma 2 vs Gemma 3 : Tous Adaptatifs": "data_gemma2_vs_3/simulation_IA_results4.parquet",
+    "Gemma 2 Scénario 1 : Le Choc des Psychologies (Full IA)": "data_gemma2/simulation_ia_results1.parquet",
+    "Gemma 2 Scénario 2 : L'IA face aux Robots (IA vs Code)": "data_gemma2/simulation_ia_results2.parquet",
+    "Gemma 2 Scénario 3 : Le Cauchemar (1 Altruiste vs 3 Greedy)": "data_gemma2/simulation_ia_results3.parquet",
+    "Gemma 2 Scénario 4 : Tous Adaptatifs": "data_gemma2/simulation_ia_results4.parquet",
+    "Gemma 3 Scénario 1": "data_gemma3/simulation_ia_results1.parquet",
+    "Gemma 3 Scénario 2": "data_gemma3/simulation_ia_results2.parquet",
+    "Gemma 3 Scénario 3": "data_gemma3/simulation_ia_results3.parquet",
+    "Gemma 3 Scénario 4": "data_gemma3/simulation_ia_results4.parquet",
+    "Gemma 2 vs Gemma 3 : Tous Adaptatifs": "data_gemma2_vs_3/simulation_ia_results4.parquet",
 }
 
 # --- BARRE LATÉRALE ---
 st.sidebar.header("📁 Choix de l'Expérience")
-selected_scenario_name = st.sidebar.radio(
-    "Sélectionnez le scénario :", list(SCENARIOS.keys())
-)
-current_file = SCENARIOS[selected_scenario_name]
+partitions = dataset.list_partitions(DATASET_ROOT)
+
+if partitions:
+    selected_model = st.sidebar.selectbox(
+        "Modèle :", sorted({p["model_used"] for p in partitions})
+    )
+    selected_scenario = st.sidebar.radio(
+        "Scénario :",
+        sorted({p["scenario"] for p in partitions if p["model_used"] == selected_model}),
+    )
+    run_dates = sorted(
+        {
+            p["run_date"]
+            for p in partitions
+            if p["model_used"] == selected_model and p["scenario"] == selected_scenario
+        },
+        reverse=True,
+    )
+    selected_dates = st.sidebar.multiselect("Dates d'exécution :", run_dates, default=run_dates)
+    if not selected_dates:
+        st.warning("Sélectionnez au moins une date d'exécution.")
+        st.stop()
+
+    filters = {
+        "model_used": selected_model,
+        "scenario": selected_scenario,
+        # Toutes les dates cochées : pas de filtre (inutile de l'écrire dans la requête)
+        "run_date": None if selected_dates == run_dates else selected_dates,
+    }
+    current_source = dataset.source_sql(DATASET_ROOT, "results", **filters)
+    # Sans la jointure : lignes seules (queries.ROW_QUERIES) ou parties seules (GAME_QUERIES)
+    rows_source = dataset.scan_sql(DATASET_ROOT, "results", **filters)
+    games_source = dataset.scan_sql(DATASET_ROOT, "games", **filters)
+    timings_source = None
+    if any(
+        p["model_used"] == selected_model and p["scenario"] == selected_scenario
+        for p in dataset.list_partitions(DATASET_ROOT, "timings")
+    ):
+        timings_source = dataset.source_sql(DATASET_ROOT, "timings", **filters)
+    source_label = f"{selected_model} / {selected_scenario}"
+else:
+    st.sidebar.caption(
+        f"Jeu partitionné vide ({DATASET_ROOT}/) : anciens fichiers. "
+        "`python dataset.py --migrate` les y recopie."
+    )
+    selected_scenario_name = st.sidebar.radio(
+        "Sélectionnez le scénario :", list(SCENARIOS.keys())
+    )
+    current_file = SCENARIOS[selected_scenario_name]
 
-if not os.path.exists(current_file):
-    st.error(f"⚠️ Fichier introuvable : {current_file}")
-    st.stop()
+    if not os.path.exists(current_file):
+        st.error(f"⚠️ Fichier introuvable : {current_file}")
+        st.stop()
+
+    current_source = rows_source = games_source = queries.file_source(current_file)
+    timings_file = current_file.replace(".parquet", "_timings.parquet")
+    timings_source = queries.file_source(timings_file) if os.path.exists(timings_file) else None
+    source_label = timings_file
 
 # --- FONCTIONS DUCKDB ---
 
 
 @st.cache_data
-def get_kpis(filename):
-    query = f"""
-    SELECT 
-        COUNT(DISTINCT game_id) as nb_parties,
-        AVG(contribution) as mise_moyenne,
-        AVG(round_gain_total) as gain_moyen,
-        MAX(model_used) as modele_ia
-    FROM '{filename}'
-    """
-    return duckdb.sql(query).df()
+def get_kpis(source):
+    return duckdb.sql(queries.kpis_sql(source)).df()
 
 
 @st.cache_data
-def get_timeline_aggregated(filename):
+def get_timeline_aggregated(source):
     """Moyenne globale par stratégie (Vue d'ensemble)"""
-    query = f"""
-    SELECT 
-        round,
-        strategy,
-        AVG(contribution) as contribution_moyenne
-    FROM '{filename}'
-    GROUP BY round, strategy
-    ORDER BY round
-    """
-    return duckdb.sql(query).df()
+    return duckdb.sql(queries.timeline_aggregated_sql(source)).df()
 
 
-def get_list_of_games(filename):
+def get_list_of_games(source):
     """Récupère la liste des IDs de parties disponibles"""
-    query = f"SELECT DISTINCT game_id FROM '{filename}'"
-    return duckdb.sql(query).df()["game_id"].tolist()
+    return duckdb.sql(queries.list_of_games_sql(source)).df()["game_id"].tolist()
 
 
-def get_single_game_data(filename, game_id):
+def get_single_game_data(source, game_id):
     """Récupère les données d'une seule partie pour voir les joueurs individuels"""
-    query = f"""
-    SELECT 
-        round,
-        player_id,
-        strategy,
-        contribution,
-        cumulative_score
-    FROM '{filename}'
-    WHERE game_id = '{game_id}'
-    ORDER BY round, player_id
-    """
-    df = duckdb.sql(query).df()
+    df = duckdb.sql(queries.single_game_data_sql(source, game_id)).df()
     # On crée une étiquette unique pour distinguer les joueurs ayant la même stratégie
     # Ex: "J0 (Greedy)", "J1 (Greedy)"
     df["player_label"] = "J" + df["player_id"].astype(str) + " (" + df["strategy"] + ")"
@@ -96,44 +126,38 @@ def get_single_game_data(filename, game_id):
 
 
 @st.cache_data
-def get_ranking_data(filename):
-    query = f"""
-    SELECT 
-        strategy,
-        AVG(contribution) as contribution_globale,
-        AVG(cumulative_score) as score_final
-    FROM '{filename}'
-    WHERE round = (SELECT MAX(round) FROM '{filename}')
-    GROUP BY strategy
-    ORDER BY score_final DESC
-    """
-    return duckdb.sql(query).df()
+def get_ranking_data(source):
+    return duckdb.sql(queries.ranking_sql(source)).df()
 
 
-def get_single_game_ranking(filename, game_id):
+def get_single_game_ranking(source, game_id):
     """Récupère le classement final pour UNE partie spécifique avec ID joueurs"""
-    # On récupère le score cumulé au dernier tour pour chaque joueur
-    query = f"""
-    SELECT 
-        player_id,
-        strategy,
-        MAX(cumulative_score) as score_final,
-        AVG(contribution) as contribution_moyenne_partie
-    FROM '{filename}'
-    WHERE game_id = '{game_id}'
-    GROUP BY player_id, strategy
-    ORDER BY score_final DESC
-    """
-    df = duckdb.sql(query).df()
+    df = duckdb.sql(queries.single_game_ranking_sql(source, game_id)).df()
     # Création de l'étiquette unique
     df["player_label"] = "J" + df["player_id"].astype(str) + " (" + df["strategy"] + ")"
     return df
 
 
+@st.cache_data
+def get_llm_telemetry(timings_source):
+    """(percentiles, débit, répartition du temps, issues) ou None si les temps sont absents / anciens."""
+    if timings_source is None:
+        return None
+    try:
+        return (
+            duckdb.sql(queries.latency_percentiles_sql(timings_source)).df(),
+            duckdb.sql(queries.tokens_per_second_sql(timings_source)).df(),
+            duckdb.sql(queries.time_split_sql(timings_source)).df(),
+            duckdb.sql(queries.decision_paths_sql(timings_source)).df(),
+        )
+    except duckdb.BinderException:
+        return None  # Sidecar écrit avant l'ajout des colonnes de télémétrie
+
+
 # --- INTERFACE ---
 
 # CHARGEMENT KPIS
-kpis = get_kpis(current_file)
+kpis = get_kpis(current_source)
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Modèle", kpis["modele_ia"][0])
 col2.metric("Mise Moyenne", f"{kpis['mise_moyenne'][0]:.1f}")
@@ -143,12 +167,12 @@ col4.metric("Nb Parties", f"{kpis['nb_parties'][0]}")
 st.divider()
 
 # ONGLETS
-tab1, tab2 = st.tabs(["📉 Dynamique (Temps)", "🏆 Classement"])
+tab1, tab2, tab3 = st.tabs(["📉 Dynamique (Temps)", "🏆 Classement", "⏱️ Latence & Coût"])
 
 with tab1:
     # --- PARTIE 1 : VUE GLOBALE (MOYENNE) ---
     st.subheader("1. Tendance Globale (Moyenne des stratégies)")
-    df_agg = get_timeline_aggregated(current_file)
+    df_agg = get_timeline_aggregated(rows_source)
     fig_agg = px.line(
         df_agg,
         x="round",
@@ -169,11 +193,11 @@ with tab1:
     )
 
     # Sélecteur de partie
-    game_ids = get_list_of_games(current_file)
+    game_ids = get_list_of_games(games_source)
     selected_game_id = st.selectbox("Choisir une partie à analyser :", game_ids)
 
     if selected_game_id:
-        df_single = get_single_game_data(current_file, selected_game_id)
+        df_single = get_single_game_data(current_source, selected_game_id)
 
         # Graphique
         fig_single = px.line(
@@ -219,14 +243,14 @@ with tab2:
 
     if view_mode == "Vue Détaillée (Une partie)":
         # On réutilise la liste des games
-        game_ids = get_list_of_games(current_file)
+        game_ids = get_list_of_games(games_source)
         # On essaie de garder la même sélection que dans l'onglet 1 si possible, sinon le premier
         selected_game_rank = st.selectbox(
             "Choisir la partie à classer :", game_ids, key="rank_select"
         )
 
         if selected_game_rank:
-            df_rank_single = get_single_game_ranking(current_file, selected_game_rank)
+            df_rank_single = get_single_game_ranking(current_source, selected_game_rank)
 
             col_r1, col_r2 = st.columns(2)
 
@@ -259,7 +283,7 @@ with tab2:
         st.info(
             "Cette vue affiche la moyenne de TOUTES les parties simulées. Les joueurs de même type sont regroupés."
         )
-        df_rank_global = get_ranking_data(current_file)
+        df_rank_global = get_ranking_data(rows_source)
 
         col_g1, col_g2 = st.columns(2)
         with col_g1:
@@ -282,3 +306,76 @@ with tab2:
                 text_auto=".1f",
             )
             st.plotly_chart(fig_contrib, use_container_width=True)
+
+with tab3:
+    st.subheader("⏱️ Latence et coût des appels LLM")
+    telemetry = get_llm_telemetry(timings_source)
+
+    if telemetry is None:
+        st.info(
+            f"Pas de télémétrie pour ce scénario ({source_label}). Elle est écrite avec les "
+            "données par createData.py / scheduler.py quand le profilage est activé."
+        )
+    else:
+        df_latency, df_tps, df_split, df_paths = telemetry
+
+        st.markdown("**Percentiles de latence par décision (ms)**")
+        st.dataframe(df_latency.round(1), hide_index=True)
+        df_latency_long = df_latency.melt(
+            id_vars="model",
+            value_vars=["p50_ms", "p90_ms", "p99_ms"],
+            var_name="percentile",
+            value_name="ms",
+        )
+        fig_latency = px.bar(
+            df_latency_long,
+            x="percentile",
+            y="ms",
+            color="model",
+            barmode="group",
+            text_auto=".0f",
+            title="Latence de bout en bout (attente comprise)",
+        )
+        st.plotly_chart(fig_latency, use_container_width=True)
+
+        col_t1, col_t2 = st.columns(2)
+        with col_t1:
+            df_tps_long = df_tps.melt(
+                id_vars="model",
+                value_vars=["prompt_tokens_s", "generation_tokens_s"],
+                var_name="phase",
+                value_name="tokens_s",
+            )
+            fig_tps = px.bar(
+                df_tps_long,
+                x="phase",
+                y="tokens_s",
+                color="model",
+                barmode="group",
+                text_auto=".0f",
+                title="Tokens par seconde",
+            )
+            st.plotly_chart(fig_tps, use_container_width=True)
+        with col_t2:
+            df_split_long = df_split.melt(id_vars="model", var_name="etape", value_name="secondes")
+            fig_split = px.bar(
+                df_split_long,
+                x="model",
+                y="secondes",
+                color="etape",
+                title="Part du temps serveur : évaluation du prompt vs génération",
+            )
+            fig_split.update_layout(barnorm="percent", yaxis_title="% du temps serveur")
+            st.plotly_chart(fig_split, use_container_width=True)
+
+        st.caption("Tokens moyens par décision et taille des réponses :")
+        st.dataframe(df_tps.round(1), hide_index=True)
+
+        fig_paths = px.bar(
+            df_paths,
+            x="model",
+            y="decisions",
+            color="decision_path",
+            title="Lecture des réponses (regex, schema, relance, repli, erreur...)",
+        )
+        st.plotly_chart(fig_paths, use_container_width=True)
@@ -0,0 +1,381 @@
+import argparse
+import random
+import re
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from dataset import DATASET_ROOT, source_sql
+from mainGame import (
+    GAME_CONFIG,
+    LLMStrategy,
+    Strategy,
+    play_public_goods_game,
+)
+
+# --- POLITIQUE "SUBSTITUT" APPRISE SUR LES PARTIES IA ENREGISTRÉES ---
+# Pour explorer (balayages, milliers de parties), on remplace l'appel au LLM par une table
+# apprise sur les parties déjà jouées : (persona, modèle, situation) -> distribution des mises.
+# La "situation" reprend ce que le LLM voit dans son prompt (_build_history_text) :
+# sa mise et la moyenne des autres sur les 3 derniers tours.
+#
+# Les situations précises sont rares : on "recule" vers des clés de plus en plus grossières
+# (3 derniers tours -> 2 -> 1 -> moyenne des autres par tranche -> tout l'historique),
+# et on prend la plus fine qui a assez d'exemples. La confiance dépend du niveau utilisé
+# et du nombre d'exemples ; sous le seuil, on peut rendre la main au vrai LLM.
+
+# Suffixe du scénario des parties jouées avec le substitut ("All_Adaptive_surrogate") : elles ont
+# leur propre partition, ne se mêlent pas aux vraies parties LLM et ne sont jamais réapprises
+SURROGATE_SUFFIX = "_surrogate"
+
+# Niveaux de la table, du plus précis au plus grossier, et confiance maximale de chacun
+LEVELS = ("last3", "last2", "last1", "coarse", "any")
+LEVEL_WEIGHTS = {"last3": 1.0, "last2": 0.8, "last1": 0.6, "coarse": 0.4, "any": 0.1}
+
+# Exemples minimum pour utiliser un niveau
+MIN_COUNT = 5
+# Seuil de confiance sous lequel SurrogateStrategy appelle le vrai LLM (s'il y en a un)
+MIN_CONFIDENCE = 0.4
+
+# Nom de stratégie d'un joueur IA : "IA_<persona>_<modèle>" (voir LLMStrategy.get_name)
+LLM_NAME = re.compile(r"^IA_(altruist|greedy|adaptive)_(.+)$")
+
+
+def _bucket(avg_others):
+    """Moyenne des autres arrondie à l'entier (le prompt l'affiche à 0.1 près)."""
+    return int(np.floor(avg_others + 0.5))
+
+
+def situation_keys(features):
+    """
+    Clés de la table pour une situation, de la plus précise à la plus grossière.
+    :param features: Tuple (ma mise, moyenne des autres arrondie) du dernier tour,
+                     puis de l'avant-dernier... (au plus 3 tours, vide au premier tour)
+    """
+    if not features:
+        # Premier tour : aucune information, une seule situation possible
+        return [(level, "first") for level in LEVELS]
+    flat = tuple(value for pair in features for value in pair)
+    return [
+        ("last3", flat),
+        ("last2", flat[:4]),
+        ("last1", flat[:2]),
+        ("coarse", features[0][1] // 4),
+        ("any",),
+    ]
+
+
+def history_features(history_global, my_id):
+    """Même fenêtre que le prompt du LLM : (ma mise, moyenne des autres) des 3 derniers tours."""
+    n_recent = min(3, len(history_global), history_global.capacity)
+    return tuple(
+        (history_global.contribution(my_id, back), _bucket(history_global.mean_others(my_id, back)))
+        for back in range(1, n_recent + 1)
+    )
+
+
+def load_training_rows(root=DATASET_ROOT, **filters):
+    """
+    Décisions des joueurs IA du jeu partitionné (lancer depuis le dossier AI/), avec les
+    features du prompt. game_id et dotation viennent de la table games (dataset.source_sql).
+    Les parties jouées avec le substitut (scénario suffixé SURROGATE_SUFFIX) sont écartées.
+    Le persona et le modèle sont lus dans le nom de la stratégie ("IA_greedy_gemma3") :
+    la colonne model_used ne suffit pas (un seul modèle par partie, parfois mal renseigné).
+    :param filters: Filtres de partition (model_used, scenario, run_date), voir dataset.scan_sql
+    """
+    df = duckdb.sql(
+        f"""
+        SELECT model_used || '/' || scenario || '/' || run_date AS source,
+               game_id, round, player_id, strategy::VARCHAR AS strategy, endowment,
+               contribution, group_total_pot
+        FROM {source_sql(root, **filters)}
+        WHERE NOT ends_with(scenario, '{SURROGATE_SUFFIX}')
+        """
+    ).df()
+    if df.empty:
+        raise FileNotFoundError(f"Aucune partie d'apprentissage dans {root}/ ({filters or 'tout'})")
+
+    # Moyenne des autres, comme GameHistory.mean_others
+    n_players = df.groupby(["source", "game_id", "round"])["player_id"].transform("size")
+    df["avg_others"] = np.floor(
+        (df["group_total_pot"] - df["contribution"]) / (n_players - 1) + 0.5
+    ).astype(int)
+
+    # Tours précédents du même joueur (lag 1, 2, 3)
+    df = df.sort_values(["source", "game_id", "player_id", "round"], ignore_index=True)
+    by_player = df.groupby(["source", "game_id", "player_id"])
+    for back in (1, 2, 3):
+        df[f"my_{back}"] = by_player["contribution"].shift(back)
+        df[f"avg_{back}"] = by_player["avg_others"].shift(back)
+
+    parsed = df["strategy"].str.extract(LLM_NAME)
+    df["persona"], df["model"] = parsed[0], parsed[1]
+    return df[df["persona"].notna()].reset_index(drop=True)
+
+
+class SurrogatePolicy:
+    """
+    Table (persona, modèle) -> situation -> comptage des mises observées (0..dotation).
+    Usage :
+        policy = SurrogatePolicy.from_parquet()
+        player = SurrogateStrategy(policy, "gemma2", "greedy")
+    """
+
+    def __init__(self, endowment=GAME_CONFIG["endowment"], min_count=MIN_COUNT):
+        self.endowment = endowment
+        self.min_count = min_count
+        self.tables = {}  # (persona, modèle) -> {clé: comptages (np.int64, endowment + 1)}
+        self.n_decisions = {}  # (persona, modèle) -> décisions d'apprentissage
+        self._cum_weights = {}  # Cache des poids cumulés pour random.choices
+
+    @classmethod
+    def from_parquet(cls, root=DATASET_ROOT, min_count=MIN_COUNT, **filters):
+        rows = load_training_rows(root, **filters)
+        endowments = rows["endowment"].unique()
+        if len(endowments) != 1:
+            raise ValueError(f"Dotations différentes dans les données : {sorted(endowments)}")
+        policy = cls(int(endowments[0]), min_count)
+        policy.fit(rows)
+        return policy
+
+    def fit(self, rows):
+        """Ajoute les décisions de load_training_rows() à la table."""
+        lags = rows[["my_1", "avg_1", "my_2", "avg_2", "my_3", "avg_3"]].to_numpy()
+        for persona, model, contribution, lag in zip(
+            rows["persona"], rows["model"], rows["contribution"], lags
+        ):
+            features = tuple(
+                (int(lag[2 * i]), int(lag[2 * i + 1]))
+                for i in range(3)
+                if not np.isnan(lag[2 * i])
+            )
+            table = self.tables.setdefault((persona, model), {})
+            for key in situation_keys(features):
+                counts = table.get(key)
+                if counts is None:
+                    counts = table[key] = np.zeros(self.endowment + 1, dtype=np.int64)
+                counts[min(int(contribution), self.endowment)] += 1
+            self.n_decisions[(persona, model)] = self.n_decisions.get((persona, model), 0) + 1
+        self._cum_weights.clear()
+        return self
+
+    def knows(self, persona, model):
+        return (persona, model) in self.tables
+
+    def lookup(self, persona, model, features):
+        """(clé retenue, comptages, confiance entre 0 et 1) pour une situation."""
+        table = self.tables[(persona, model)]
+        for key in situation_keys(features):
+            counts = table.get(key)
+            if counts is None:
+                continue
+            n = int(counts.sum())
+            if n >= self.min_count or key[0] == "any":
+                confidence = LEVEL_WEIGHTS[key[0]] * n / (n + self.min_count)
+                return key, counts, confidence
+        raise KeyError(f"Table vide pour ({persona}, {model})")
+
+    def distribution(self, persona, model, history_global, my_id, endowment):
+        """
+        (probabilités des mises 0..endowment, confiance) dans la situation courante.
+        Une dotation différente de celle des données est hors distribution (confiance 0) :
+        les features et les mises sont alors remises à l'échelle.
+        """
+        features = history_features(history_global, my_id)
+        scale = self.endowment / endowment
+        if scale != 1:
+            features = tuple((round(m * scale), round(a * scale)) for m, a in features)
+        _, counts, confidence = self.lookup(persona, model, features)
+        probs = counts / counts.sum()
+        if scale != 1:
+            values = np.minimum(np.round(np.arange(self.endowment + 1) / scale), endowment)
+            probs = np.bincount(values.astype(int), weights=probs, minlength=endowment + 1)
+            confidence = 0.0
+        return probs, confidence
+
+    def sample(self, persona, model, history_global, my_id, endowment):
+        """(mise tirée avec le module `random`, confiance)."""
+        if endowment != self.endowment:
+            probs, confidence = self.distribution(persona, model, history_global, my_id, endowment)
+            return random.choices(range(endowment + 1), weights=probs)[0], confidence
+
+        key, counts, confidence = self.lookup(
+            persona, model, history_features(history_global, my_id)
+        )
+        cum_weights = self._cum_weights.get((persona, model, key))
+        if cum_weights is None:
+            cum_weights = self._cum_weights[(persona, model, key)] = np.cumsum(counts).tolist()
+        # `random` (et pas un générateur à part) : mêmes tirages avec random.seed, et
+        # l'état est sauvegardé par les points de reprise du moteur
+        return random.choices(range(endowment + 1), cum_weights=cum_weights)[0], confidence
+
+    def coverage(self):
+        """Décisions et situations distinctes (3 derniers tours) par (persona, modèle)."""
+        return pd.DataFrame(
+            [
+                {
+                    "persona": persona,
+                    "model": model,
+                    "decisions": self.n_decisions[(persona, model)],
+                    "situations": sum(1 for key in table if key[0] == "last3"),
+                }
+                for (persona, model), table in sorted(self.tables.items())
+            ]
+        )
+
+
+class SurrogateStrategy(Strategy):
+    """
+    Joueur IA "simulé" : tire sa mise dans la distribution apprise (SurrogatePolicy),
+    sans appel au LLM. Avec `fallback` (un LLMStrategy), les situations peu connues
+    (confiance < min_confidence) sont décidées par le vrai LLM.
+    """
+
+    def __init__(
+        self, policy, model_name="gemma2", persona="adaptive", fallback=None,
+        min_confidence=MIN_CONFIDENCE,
+    ):
+        if not policy.knows(persona, model_name) and fallback is None:
+            raise ValueError(f"Pas de données pour ({persona}, {model_name}) et pas de LLM de repli")
+        self.policy = policy
+        self.model_name = model_name
+        self.persona = persona
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        # Suivi de la dernière décision (lu par GameProfiler) et compteurs
+        self.last_confidence = None
+        for attr in LLMStrategy.USAGE_ATTRS:
+            setattr(self, attr, None)
+        self.last_decision_path = None
+        self.n_decisions = 0
+        self.n_fallbacks = 0
+
+    def get_name(self):
+        return f"IA_{self.persona}_{self.model_name}_surrogate"
+
+    def _sample(self, history_global, my_id, endowment):
+        """(mise, confiance) ; mise None si la décision doit revenir au LLM."""
+        self.n_decisions += 1
+        for attr in LLMStrategy.USAGE_ATTRS:
+            setattr(self, attr, None)
+        if not self.policy.knows(self.persona, self.model_name):
+            value, confidence = None, 0.0
+        else:
+            value, confidence = self.policy.sample(
+                self.persona, self.model_name, history_global, my_id, endowment
+            )
+        self.last_confidence = confidence
+        if self.fallback is not None and (value is None or confidence < self.min_confidence):
+            self.n_fallbacks += 1
+            return None
+        self.last_decision_path = "surrogate"
+        return value
+
+    def _after_fallback(self):
+        # Mêmes mesures que le LLM appelé (durées, tokens, chemin de lecture de la réponse)
+        for attr in LLMStrategy.USAGE_ATTRS + ("last_decision_path",):
+            setattr(self, attr, getattr(self.fallback, attr))
+
+    def decide_contribution(self, history_global, my_id, endowment):
+        value = self._sample(history_global, my_id, endowment)
+        if value is None:
+            value = self.fallback.decide_contribution(history_global, my_id, endowment)
+            self._after_fallback()
+        return value
+
+    async def decide_contribution_async(self, history_global, my_id, endowment):
+        value = self._sample(history_global, my_id, endowment)
+        if value is None:
+            value = await self.fallback.decide_contribution_async(history_global, my_id, endowment)
+            self._after_fallback()
+        return value
+
+
+def surrogate_players(players, policy, fallback=True, min_confidence=MIN_CONFIDENCE):
+    """
+    Remplace les LLMStrategy d'une table par des SurrogateStrategy (les autres joueurs
+    sont gardés). Avec fallback=True, chaque LLMStrategy devient le LLM de repli.
+    """
+    return [
+        SurrogateStrategy(
+            policy, p.model_name, p.persona, p if fallback else None, min_confidence
+        )
+        if isinstance(p, LLMStrategy)
+        else p
+        for p in players
+    ]
+
+
+def evaluate(root=DATASET_ROOT, holdout=0.2):
+    """
+    Validation sur la fin de chaque partie (les `holdout` derniers tours, jamais vus à
+    l'apprentissage) : erreur absolue moyenne de l'espérance prédite, et part des
+    décisions au-dessus du seuil de confiance, par (persona, modèle).
+    """
+    rows = load_training_rows(root)
+    last_round = rows.groupby(["source", "game_id"])["round"].transform("max")
+    is_test = rows["round"] > last_round * (1 - holdout)
+    policy = SurrogatePolicy(int(rows["endowment"].iloc[0])).fit(rows[~is_test])
+
+    values = np.arange(policy.endowment + 1)
+    results = []
+    for row in rows[is_test].itertuples():
+        if not policy.knows(row.persona, row.model):
+            continue
+        features = tuple(
+            (int(getattr(row, f"my_{b}")), int(getattr(row, f"avg_{b}")))
+            for b in (1, 2, 3)
+            if not np.isnan(getattr(row, f"my_{b}"))
+        )
+        _, counts, confidence = policy.lookup(row.persona, row.model, features)
+        expected = float(values @ counts / counts.sum())
+        results.append(
+            {
+                "persona": row.persona,
+                "model": row.model,
+                "abs_error": abs(expected - row.contribution),
+                "confident": confidence >= MIN_CONFIDENCE,
+            }
+        )
+    return (
+        pd.DataFrame(results)
+        .groupby(["persona", "model"])
+        .agg(decisions=("abs_error", "size"), mae=("abs_error", "mean"),
+             confident_share=("confident", "mean"))
+        .reset_index()
+    )
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Politique substitut apprise sur les parties IA")
+    parser.add_argument("--games", type=int, default=1000, help="Parties simulées (démo)")
+    parser.add_argument("--model", default="gemma2")
+    parser.add_argument("--root", default=DATASET_ROOT, help="Jeu de données d'apprentissage")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    policy = SurrogatePolicy.from_parquet(args.root)
+    print(f"📚 Table apprise en {time.perf_counter() - start:.2f}s :")
+    print(policy.coverage().to_string(index=False))
+
+    print("\n🧪 Validation (20 % derniers tours de chaque partie mis de côté) :")
+    print(evaluate(args.root).to_string(index=False))
+
+    # Démo : scénario 1 (greedy, altruist, 2 adaptive) sans aucun appel au LLM
+    config = dict(GAME_CONFIG, verbose=False)
+    start = time.perf_counter()
+    frames = []
+    for _ in range(args.games):
+        players = [
+            SurrogateStrategy(policy, args.model, persona)
+            for persona in ["greedy", "altruist", "adaptive", "adaptive"]
+        ]
+        random.shuffle(players)
+        frames.append(pd.DataFrame(play_public_goods_game(players, config)))
+    elapsed = time.perf_counter() - start
+    print(f"\n🚀 {args.games} parties simulées en {elapsed:.1f}s")
+    print(pd.concat(frames).groupby("strategy")["contribution"].mean().round(2))
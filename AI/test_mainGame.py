@@ -0,0 +1,57 @@
+import pytest
+
+import mainGame
+from mainGame import LLMStrategy, play_public_goods_game
+
+
+class FixedLLM(LLMStrategy):
+    """LLMStrategy sans serveur : répond toujours "7" et garde les prompts envoyés."""
+
+    def __init__(self, **kwargs):
+        super().__init__(model_name="test", **kwargs)
+        self.prompts = []
+
+    def _chat(self, messages, endowment):
+        self.prompts.append(messages[-1]["content"])
+        return {"message": {"content": "7"}}
+
+
+def test_history_window_shorter_than_prompt(monkeypatch):
+    # Historique de 2 tours alors que le prompt en montre 3 (PROMPT_HISTORY_ROUNDS)
+    monkeypatch.setattr(mainGame, "OLLAMA_AVAILABLE", True)
+    players = [FixedLLM(persona=persona) for persona in ("greedy", "altruist", "adaptive")]
+    config = {"endowment": 20, "multiplier": 1.6, "n_rounds": 6, "history_window": 2, "verbose": False}
+
+    columns = play_public_goods_game(players, config)
+
+    # Aucune décision en repli : toutes les mises viennent du "LLM"
+    assert (columns["contribution"] == 7).all()
+    assert not columns["llm_fallback"].any()
+    for player in players:
+        assert player.last_decision_path == "regex"
+        assert player.prompts[-1].count("- Tour ") == 2
+
+
+class FailingLLM(LLMStrategy):
+    """LLMStrategy dont chaque appel lève l'erreur donnée."""
+
+    def __init__(self, error):
+        super().__init__(model_name="test")
+        self.error = error
+
+    def _chat(self, messages, endowment):
+        raise self.error
+
+
+def test_client_timeouts_are_recorded_as_timeout(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    monkeypatch.setattr(mainGame, "OLLAMA_AVAILABLE", True)
+    cases = [
+        (httpx.ReadTimeout("lecture trop longue"), "timeout"),
+        (TimeoutError("pas de réponse"), "timeout"),
+        (httpx.ConnectError("serveur absent"), "error"),
+    ]
+    for error, path in cases:
+        player = FailingLLM(error)
+        assert player.decide_contribution([], 0, 20) == 0
+        assert player.last_decision_path == path
@@ -0,0 +1,141 @@
+import numpy as np
+
+# --- MOTEUR VECTORISÉ (NumPy) ---
+# Même règles que play_public_goods_game (mainGame.py), mais on joue des milliers
+# de parties d'un coup : tout est stocké dans des tableaux (parties x tours x joueurs)
+# et le pot, la part reçue, le gardé et le score cumulé sont des opérations sur tableaux.
+
+
+class PerGameRandom:
+    """
+    Générateur "une graine par partie" pour le moteur vectorisé.
+    Chaque partie a son propre numpy Generator : ses tirages ne dépendent donc ni des
+    autres parties du batch, ni du découpage entre processus.
+    integers() renvoie un tableau (n_parties x ...) ; pour éviter une boucle Python par
+    tour, les tirages d'une partie sont faits en un seul bloc (tous les tours) puis
+    servis tour par tour, dans l'ordre des appels.
+    """
+
+    def __init__(self, rngs, n_rounds):
+        self.rngs = rngs
+        self.n_rounds = n_rounds
+        self._blocks = {}
+
+    def integers(self, low, high, size, dtype=np.int64):
+        key = (low, high, tuple(size[1:]), np.dtype(dtype))
+        if key not in self._blocks:
+            block = np.stack(
+                [
+                    rng.integers(low, high, size=(self.n_rounds,) + tuple(size[1:]), dtype=dtype)
+                    for rng in self.rngs
+                ],
+                axis=1,
+            )
+            self._blocks[key] = [block, 0]
+        entry = self._blocks[key]
+        block, cursor = entry
+        entry[1] += 1
+        return block[cursor]
+
+
+def _strategy_class(strategy):
+    """Accepte une classe de stratégie ou une instance."""
+    return strategy if isinstance(strategy, type) else type(strategy)
+
+
+def play_public_goods_batch(tables, config, rng=None):
+    """
+    Joue plusieurs parties en même temps (toutes avec le même nombre de joueurs).
+    :param tables: Liste de tables, chaque table = liste de stratégies (classes ou instances)
+    :param config: Dictionnaire de configuration ("multiplier" peut être une liste, un par partie)
+    :param rng: numpy.random.Generator commun au batch, ou liste de Generators (un par partie)
+                pour des tirages reproductibles partie par partie (pour RandomPlayer)
+    :return: Dictionnaire de colonnes NumPy (mêmes colonnes que play_public_goods_game,
+             + "game_index" = position de la partie dans `tables`)
+    """
+    n_games = len(tables)
+    n_players = len(tables[0])
+    n_rounds = config["n_rounds"]
+    endowment = config["endowment"]
+
+    if rng is None:
+        rng = np.random.default_rng()
+    elif isinstance(rng, (list, tuple)):
+        rng = PerGameRandom(rng, n_rounds)
+
+    if any(len(table) != n_players for table in tables):
+        raise ValueError("Toutes les tables d'un batch doivent avoir le même nombre de joueurs")
+
+    # 1. Encodage des tables : un code entier par stratégie (matrice parties x joueurs)
+    classes = []
+    codes = np.empty((n_games, n_players), dtype=np.int64)
+    for g, table in enumerate(tables):
+        for pid, strategy in enumerate(table):
+            cls = _strategy_class(strategy)
+            if cls not in classes:
+                if cls.decide_batch is None:
+                    raise ValueError(
+                        f"La stratégie {cls.__name__} n'a pas de version vectorisée (decide_batch)"
+                    )
+                classes.append(cls)
+            codes[g, pid] = classes.index(cls)
+
+    masks = [codes == code for code in range(len(classes))]
+    multipliers = np.broadcast_to(
+        np.asarray(config["multiplier"], dtype=np.float64), (n_games,)
+    )
+
+    # Avance rapide possible seulement si aucune stratégie n'a de hasard ni de mémoire longue
+    can_fast_forward = config.get("fast_forward", True) and all(
+        cls.deterministic for cls in classes
+    )
+
+    # 2. Phase de Décision, tour par tour (chaque tour dépend des précédents)
+    contributions = np.empty((n_games, n_rounds, n_players), dtype=np.int64)
+    last = None
+    for r in range(n_rounds):
+        decision = np.empty((n_games, n_players), dtype=np.int64)
+        for cls, mask in zip(classes, masks):
+            decision[mask] = cls.decide_batch(
+                last, (n_games, n_players), endowment, rng
+            )[mask]
+        # Sécurité : on borne la contribution entre 0 et endowment
+        np.clip(decision, 0, endowment, out=decision)
+        contributions[:, r, :] = decision
+
+        # Point fixe atteint par TOUTES les parties : les tours restants sont identiques
+        if can_fast_forward and last is not None and np.array_equal(decision, last):
+            contributions[:, r + 1 :, :] = decision[:, None, :]
+            break
+        last = decision
+
+    # 3. Calcul du Pot, des gains et des scores (mêmes opérations flottantes que la boucle Python)
+    total_pot = contributions.sum(axis=2)
+    share_per_player = total_pot * multipliers[:, None] / n_players
+    kept = endowment - contributions
+    round_gain = kept + share_per_player[:, :, None]
+    cumulative = np.cumsum(round_gain, axis=1)
+
+    # 4. Aplatissement (partie, tour, joueur) -> lignes, dans le même ordre que la boucle Python
+    shape = (n_games, n_rounds, n_players)
+    names = np.array([cls.__name__ for cls in classes], dtype=object)
+    return {
+        "game_index": np.broadcast_to(
+            np.arange(n_games)[:, None, None], shape
+        ).ravel(),
+        "round": np.broadcast_to(
+            np.arange(1, n_rounds + 1)[None, :, None], shape
+        ).ravel(),
+        "player_id": np.broadcast_to(np.arange(n_players)[None, None, :], shape).ravel(),
+        "strategy": np.broadcast_to(names[codes][:, None, :], shape).ravel(),
+        "endowment": np.full(contributions.size, endowment, dtype=np.int64),
+        "contribution": contributions.ravel(),
+        "kept_private": kept.ravel(),
+        "pot_share_received": (round_gain - kept).ravel(),
+        "round_gain_total": round_gain.ravel(),
+        "cumulative_score": cumulative.ravel(),
+        "group_total_pot": np.broadcast_to(total_pot[:, :, None], shape).ravel(),
+        "group_synergy_factor": np.broadcast_to(
+            multipliers[:, None, None], shape
+        ).ravel(),
+    }
@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+# Modules communs aux dossiers AI/ et Not_AI/ (dossier common/ à la racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+
+from benchTools import load_previous, report, save_results, timed
+import queries
+from mainGame import ConditionalCooperator, RandomPlayer, play_public_goods_game
+from batchGame import play_public_goods_batch
+from createData import (
+    _iter_chunks,
+    chunk_to_record_batch,
+    game_seeds,
+    save_to_parquet,
+)
+
+# --- BENCHMARKS (MOTEUR, ETL, REQUÊTES DU DASHBOARD) ---
+# Chaque exécution est sauvegardée en JSON dans bench_results/ ; elle est comparée
+# automatiquement à l'exécution précédente pour repérer les ralentissements (benchTools).
+
+SUITE = "Not_AI"
+DATA_DIR = "bench_data"
+
+
+def _quiet(func, *args, **kwargs):
+    """Appelle func en masquant ses print (le moteur affiche une ligne par partie)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+# --- 1. MOTEUR DE JEU ---
+
+
+def bench_engine(player_counts=(3, 6, 12), round_counts=(50, 200), n_games=20):
+    """Débit de play_public_goods_game (tours/s, lignes/s) et du moteur vectorisé."""
+    results = {}
+    for n_players in player_counts:
+        for n_rounds in round_counts:
+            config = {"endowment": 20, "multiplier": 1.6, "n_rounds": n_rounds}
+            # Un RandomPlayer empêche l'avance rapide : on mesure bien tous les tours
+            table = [RandomPlayer()] + [ConditionalCooperator() for _ in range(n_players - 1)]
+
+            best, median = timed(
+                lambda: [_quiet(play_public_goods_game, table, config) for _ in range(n_games)]
+            )
+            results[f"engine.python.p{n_players}.r{n_rounds}"] = {
+                "seconds": best,
+                "median_seconds": median,
+                "rounds_per_s": n_games * n_rounds / best,
+                "rows_per_s": n_games * n_rounds * n_players / best,
+            }
+
+            batch_games = 200 * n_games
+            tables = [[RandomPlayer] + [ConditionalCooperator] * (n_players - 1)] * batch_games
+            rng = np.random.default_rng(0)
+            best, median = timed(lambda: play_public_goods_batch(tables, config, rng))
+            results[f"engine.numpy.p{n_players}.r{n_rounds}"] = {
+                "seconds": best,
+                "median_seconds": median,
+                "rounds_per_s": batch_games * n_rounds / best,
+                "rows_per_s": batch_games * n_rounds * n_players / best,
+            }
+    return results
+
+
+# --- 2. ETL : run_simulation_batch découpé en étapes ---
+
+
+def bench_batch(n_games=20000, engine="numpy"):
+    """Temps de bout en bout de la génération, découpé en calcul / construction / écriture."""
+    seeds = game_seeds(0, n_games)
+    chunk_size = 5000
+    starts = range(0, n_games, chunk_size)
+    seed_chunks = [seeds[start : start + chunk_size] for start in starts]
+
+    start = time.perf_counter()
+    chunks = list(_iter_chunks(seed_chunks, starts, engine, n_workers=1))
+    compute = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batches = [
+        chunk_to_record_batch(columns, s, chunk_size, 0) for s, columns in zip(starts, chunks)
+    ]
+    df = pa.Table.from_batches(batches).to_pandas()
+    build = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        _quiet(save_to_parquet, batches, os.path.join(folder, "bench.parquet"))
+        write = time.perf_counter() - start
+
+    return {
+        f"batch.{engine}.g{n_games}.compute": {"seconds": compute},
+        f"batch.{engine}.g{n_games}.dataframe": {"seconds": build},
+        f"batch.{engine}.g{n_games}.parquet_write": {"seconds": write},
+        f"batch.{engine}.g{n_games}.total": {
+            "seconds": compute + build + write,
+            "rows": len(df),
+        },
+    }
+
+
+# --- 3. REQUÊTES DU DASHBOARD (DuckDB) ---
+
+
+def synthetic_dataset(n_rows, folder=DATA_DIR):
+    """
+    Fichier Parquet synthétique de n_rows lignes au schéma de simulation_results.parquet
+    (50 tours, 4 joueurs par partie). Généré une seule fois par DuckDB puis réutilisé.
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"synthetic_{n_rows}.parquet")
+    if os.path.exists(path):
+        return path
+
+    duckdb.sql(
+        f"""
+        COPY (
+            SELECT
+                (i // 4) % 50 + 1 AS round,
+                i % 4 AS player_id,
+                ['Altruist', 'FreeRider', 'RandomPlayer', 'ConditionalCooperator'][i % 4 + 1] AS strategy,
+                20 AS endowment,
+                hash(i) % 21 AS contribution,
+                20 - hash(i) % 21 AS kept_private,
+                (hash(i // 4) % 80) * 0.4 AS pot_share_received,
+                20 - hash(i) % 21 + (hash(i // 4) % 80) * 0.4 AS round_gain_total,
+                ((i // 4) % 50 + 1) * 25.0 AS cumulative_score,
+                hash(i // 4) % 81 AS group_total_pot,
+                1.2 + (hash(i // 200) % 130) / 100 AS group_synergy_factor,
+                'game_0_' || (i // 200 + 1) AS game_id,
+                4 AS n_players
+            FROM range({n_rows}) t(i)
+        ) TO '{path}' (FORMAT PARQUET)
+        """
+    )
+    return path
+
+
+def bench_queries(sizes=(100_000, 1_000_000, 10_000_000), repeat=3):
+    """Latence de chaque requête du dashboard sur des jeux synthétiques de tailles croissantes."""
+    results = {}
+    for n_rows in sizes:
+        path = synthetic_dataset(n_rows)
+        for name, build_sql in queries.DASHBOARD_QUERIES.items():
+            sql = build_sql(path)
+            best, median = timed(lambda: duckdb.sql(sql).df(), repeat)
+            results[f"query.{name}.n{n_rows}"] = {"seconds": best, "median_seconds": median}
+    return results
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks moteur / ETL / dashboard")
+    parser.add_argument(
+        "--only", choices=["engine", "batch", "queries"], action="append",
+        help="Ne lancer que certaines parties (répétable)",
+    )
+    parser.add_argument(
+        "--sizes", type=float, nargs="+", default=[1e5, 1e6, 1e7],
+        help="Tailles des jeux synthétiques pour les requêtes (ex : 1e5 1e6 1e7 1e8)",
+    )
+    parser.add_argument("--games", type=int, default=20000, help="Parties pour le benchmark ETL")
+    args = parser.parse_args()
+    parts = args.only or ["engine", "batch", "queries"]
+
+    results = {}
+    if "engine" in parts:
+        results.update(bench_engine())
+    if "batch" in parts:
+        results.update(bench_batch(args.games))
+    if "queries" in parts:
+        results.update(bench_queries([int(size) for size in args.sizes]))
+
+    path = save_results(results, SUITE)
+    report(results, load_previous(SUITE, exclude=path))
+    print(f"\n💾 Résultats : {path}")
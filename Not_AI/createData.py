@@ -1,84 +1,240 @@
 import os
-import pandas as pd
+import sys
+import numpy as np
 import random
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+import pyarrow.parquet as pq
 from mainGame import (
     play_public_goods_game,
     Altruist,
     FreeRider,
     RandomPlayer,
     ConditionalCooperator,
+    RECORD_COLUMNS,
 )
+from batchGame import play_public_goods_batch
 
-# ... (Assure-toi d'avoir les classes Strategy, Altruist, FreeRider, etc. définies au-dessus) ...
+# Modules communs aux dossiers AI/ et Not_AI/ (dossier common/ à la racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
 
+from parquetStream import ParquetStreamWriter
 
-def run_simulation_batch(n_games=50):
+# Définition de stratégies possibles pour composer les tables
+AVAILABLE_STRATEGIES = [Altruist, FreeRider, RandomPlayer, ConditionalCooperator]
+STRATEGY_NAMES = pa.array([cls.__name__ for cls in AVAILABLE_STRATEGIES])
+
+# Nombre de lignes par row group Parquet (= taille max du tampon d'écriture)
+DEFAULT_ROW_GROUP_SIZE = 256_000
+
+
+def draw_game_setup(rng):
     """
-    Lance une série de simulations avec des compositions aléatoires
-    et retourne un DataFrame global.
+    Tire la composition de la table et la configuration d'UNE partie
+    à partir du générateur propre à cette partie.
+    :return: (liste de classes de stratégies, config)
+    """
+    # 1. Composition aléatoire de la table (entre 3 et 6 joueurs)
+    n_players = int(rng.integers(3, 7))
+    strategies = [
+        AVAILABLE_STRATEGIES[k]
+        for k in rng.integers(len(AVAILABLE_STRATEGIES), size=n_players)
+    ]
+
+    # 2. Configuration (on peut faire varier le multiplicateur pour analyser son impact plus tard !)
+    # Par exemple : un multiplicateur aléatoire entre 1.2 et 2.5
+    config = {
+        "endowment": 20,
+        "multiplier": round(float(rng.uniform(1.2, 2.5)), 2),
+        "n_rounds": 50,
+    }
+    return strategies, config
+
+
+def game_seeds(master_seed, n_games):
+    """Une graine par partie, dérivée de la graine maître (la graine i ne dépend pas de n_games)."""
+    return np.random.SeedSequence(master_seed).generate_state(n_games, dtype=np.uint64)
+
+
+def simulate_chunk(seeds, first_game=0, engine="numpy"):
     """
-    all_records = []
+    Simule un paquet de parties consécutives (fonction exécutée par les workers).
+    Chaque partie utilise uniquement son propre générateur : le résultat d'une partie
+    ne dépend pas du paquet dans lequel elle tombe.
+    :param seeds: Graines des parties du paquet
+    :param first_game: Numéro (0-based) de la première partie du paquet
+    :return: Colonnes NumPy compactes ("strategy" = code dans AVAILABLE_STRATEGIES,
+             "game_index" = numéro global de la partie)
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    setups = [draw_game_setup(rng) for rng in rngs]
+
+    if engine == "numpy":
+        columns = _play_tables_vectorized(setups, rngs)
+    else:
+        columns = _play_tables_python(setups, rngs)
+
+    columns["game_index"] += first_game
+    return columns
+
+
+def _play_tables_python(setups, rngs):
+    """Moteur tour par tour (play_public_goods_game), parties mises bout à bout."""
+    chunks = []
+    for game_index, ((classes, config), rng) in enumerate(zip(setups, rngs)):
+        # RandomPlayer reçoit son propre random.Random, dérivé du générateur de la partie
+        player_rng = random.Random(int(rng.integers(2**63)))
+        strategies = [
+            cls(rng=player_rng) if cls is RandomPlayer else cls() for cls in classes
+        ]
+
+        # 3. Lancement du jeu
+        columns = play_public_goods_game(strategies, config)
 
-    # Définition de stratégies possibles pour composer les tables
-    available_strategies = [Altruist, FreeRider, RandomPlayer, ConditionalCooperator]
+        # 4. Enrichissement des données avec l'ID de la partie (colonnes constantes)
+        n_rows = len(columns["round"])
+        seat_codes = np.array([AVAILABLE_STRATEGIES.index(c) for c in classes], dtype=np.uint8)
+        columns["strategy"] = np.tile(seat_codes, config["n_rounds"])
+        columns["game_index"] = np.full(n_rows, game_index)
+        columns["n_players"] = np.full(n_rows, len(strategies))  # Utile pour l'analyse
+        chunks.append(columns)
 
-    print(f"🚀 Lancement de {n_games} parties simulées...")
+    return {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
 
-    for game_id in range(1, n_games + 1):
-        # 1. Composition aléatoire de la table (entre 3 et 6 joueurs)
-        n_players = random.randint(3, 6)
-        strategies = []
-        for _ in range(n_players):
-            # On instancie une stratégie au hasard
-            strat_class = random.choice(available_strategies)
-            strategies.append(strat_class())
 
-        # 2. Configuration (on peut faire varier le multiplicateur pour analyser son impact plus tard !)
-        # Par exemple : un multiplicateur aléatoire entre 1.2 et 2.5
+def _play_tables_vectorized(setups, rngs):
+    """
+    Joue toutes les tables avec le moteur NumPy : les parties sont regroupées
+    par nombre de joueurs (un batch par taille de table), puis remises dans l'ordre.
+    """
+    # Code de stratégie de chaque siège (parties x 6 sièges max)
+    max_players = max(len(classes) for classes, _ in setups)
+    seat_codes = np.zeros((len(setups), max_players), dtype=np.uint8)
+    for g, (classes, _) in enumerate(setups):
+        seat_codes[g, : len(classes)] = [AVAILABLE_STRATEGIES.index(c) for c in classes]
+
+    chunks = []
+    groups = {}
+    for i, (classes, config) in enumerate(setups):
+        key = (len(classes), config["endowment"], config["n_rounds"])
+        groups.setdefault(key, []).append(i)
+
+    for (n_players, endowment, n_rounds), idx in sorted(groups.items()):
         config = {
-            "endowment": 20,
-            "multiplier": round(random.uniform(1.2, 2.5), 2),
-            "n_rounds": 50,
+            "endowment": endowment,
+            "n_rounds": n_rounds,
+            "multiplier": [setups[i][1]["multiplier"] for i in idx],
         }
+        columns = play_public_goods_batch(
+            [setups[i][0] for i in idx], config, [rngs[i] for i in idx]
+        )
+        # game_index est local au batch : on le ramène au numéro de partie du paquet
+        columns["game_index"] = np.asarray(idx)[columns["game_index"]]
+        columns["strategy"] = seat_codes[columns["game_index"], columns["player_id"]]
+        columns["n_players"] = np.full(len(columns["round"]), n_players)
+        chunks.append(columns)
+
+    merged = {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+    # Tri stable : à l'intérieur d'une partie, l'ordre (tour, joueur) est conservé
+    order = np.argsort(merged["game_index"], kind="stable")
+    return {key: values[order] for key, values in merged.items()}
+
+
+def _iter_chunks(seed_chunks, starts, engine, n_workers):
+    """
+    Renvoie les paquets simulés dans l'ordre. En parallèle, on ne garde que
+    2 paquets par worker en vol pour que la mémoire ne dépende pas de n_games.
+    """
+    if n_workers <= 1:
+        for chunk, start in zip(seed_chunks, starts):
+            yield simulate_chunk(chunk, start, engine)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = deque()
+        for chunk, start in zip(seed_chunks, starts):
+            pending.append(executor.submit(simulate_chunk, chunk, start, engine))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_simulation_batches(
+    n_games=50, engine="numpy", seed=None, n_workers=1, chunk_size=None
+):
+    """
+    Lance une série de simulations avec des compositions aléatoires
+    et renvoie les données au fil de l'eau (un pyarrow.RecordBatch par paquet de parties).
+    :param engine: "numpy" (moteur vectorisé, batchGame.py) ou "python" (boucle tour par tour)
+    :param seed: Graine maître (même graine = mêmes données, quel que soit n_workers)
+    :param n_workers: Nombre de processus (1 = pas de parallélisme)
+    :param chunk_size: Nombre de parties par paquet envoyé à un worker
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    seeds = game_seeds(seed, n_games)
+    if chunk_size is None:
+        chunk_size = max(1, min(5000, -(-n_games // (4 * n_workers))))
+    starts = range(0, n_games, chunk_size)
+    seed_chunks = [seeds[start : start + chunk_size] for start in starts]
+    batch_time = int(time.time())
 
-        # 3. Lancement du jeu
-        # (On suppose que la fonction play_public_goods_game est définie comme avant)
-        game_data = play_public_goods_game(strategies, config)
+    print(f"🚀 Lancement de {n_games} parties simulées ({n_workers} processus)...")
+    print(f"🎲 Graine maître : {seed}")
+
+    for start, columns in zip(starts, _iter_chunks(seed_chunks, starts, engine, n_workers)):
+        yield chunk_to_record_batch(columns, start, chunk_size, batch_time)
 
-        # 4. Enrichissement des données avec l'ID de la partie
-        for row in game_data:
-            row["game_id"] = f"game_{int(time.time())}_{game_id}"  # ID unique
-            row["n_players"] = n_players  # Utile pour l'analyse
-            all_records.append(row)
 
-    # 5. Conversion en DataFrame Pandas
-    df = pd.DataFrame(all_records)
-    return df
+def chunk_to_record_batch(columns, start, chunk_size, batch_time):
+    """
+    5. Conversion d'un paquet simulé en RecordBatch Arrow (avec l'ID unique de la partie) :
+    les colonnes texte sont construites par take() sur les codes, sans boucle par ligne.
+    """
+    batch = {key: columns[key] for key in RECORD_COLUMNS}
+    batch["strategy"] = STRATEGY_NAMES.take(columns["strategy"])
+    game_ids = pa.array(
+        [f"game_{batch_time}_{i + 1}" for i in range(start, start + chunk_size)]
+    )
+    batch["game_id"] = game_ids.take(columns["game_index"] - start)
+    batch["n_players"] = columns["n_players"]
+    return pa.RecordBatch.from_pydict(batch)
 
 
-def save_to_parquet(df, filename="./simulation_results.parquet"):
+def run_simulation_batch(n_games=50, **kwargs):
     """
-    Sauvegarde le DataFrame en fichier Parquet.
+    Comme iter_simulation_batches, mais retourne un DataFrame global
+    (pratique pour les petites séries et l'analyse interactive).
     """
+    batches = list(iter_simulation_batches(n_games, **kwargs))
+    return pa.Table.from_batches(batches).to_pandas()
 
-    # Sauvegarde en Parquet (nécessite pyarrow ou fastparquet installé)
-    # index=False car l'index pandas n'est pas utile ici
-    df.to_parquet(filename, index=False)
+
+def save_to_parquet(
+    batches, filename="./simulation_results.parquet", row_group_size=DEFAULT_ROW_GROUP_SIZE
+):
+    """
+    Sauvegarde en Parquet au fil de l'eau (RecordBatch par RecordBatch).
+    La mémoire ne dépend pas du nombre de parties demandées.
+    """
+    with ParquetStreamWriter(filename, row_group_size) as writer:
+        for batch in batches:
+            writer.write(batch)
 
     print(f"✅ Données sauvegardées avec succès : {filename}")
-    print(f"📊 Dimensions : {df.shape[0]} lignes x {df.shape[1]} colonnes")
+    print(f"📊 Dimensions : {writer.n_rows} lignes x {writer.n_columns} colonnes")
 
 
 # --- EXÉCUTION ---
 
 if __name__ == "__main__":
-    # 1. Générer les données (Batch de 200 parties)
-    df_results = run_simulation_batch(n_games=200)
-
-    # 2. Sauvegarder
-    save_to_parquet(df_results)
+    # 1. Générer les données (Batch de 200 parties) et 2. Sauvegarder au fil de l'eau
+    save_to_parquet(iter_simulation_batches(n_games=200))
 
     # 3. Petit aperçu pour vérifier
     print("\n--- Aperçu des données ---")
-    print(df_results.head())
+    first_rows = next(pq.ParquetFile("./simulation_results.parquet").iter_batches(5))
+    print(first_rows.to_pandas())
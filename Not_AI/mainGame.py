@@ -1,6 +1,7 @@
 import random
 from abc import ABC, abstractmethod
-import pandas as pd  # Optionnel ici, mais utile pour visualiser à la fin
+import numpy as np
+import pandas as pd  # Utile pour visualiser à la fin
 
 # --- CONFIGURATION DU JEU ---
 
@@ -8,6 +9,7 @@ GAME_CONFIG = {
     "endowment": 20,  # Dotation initiale par tour
     "multiplier": 2,  # Facteur multiplicateur du pot commun (Synergie)
     "n_rounds": 200,  # Nombre de tours
+    # "history_window": 3,  # Optionnel : ne garder que les N derniers tours en mémoire
 }
 
 # Note sur le Multiplicateur :
@@ -15,6 +17,83 @@ GAME_CONFIG = {
 # Si Multiplicateur > N_joueurs : Tout le monde gagne à jouer (pas de dilemme).
 # Le dilemme existe si : 1 < Multiplicateur < N_joueurs.
 
+# --- HISTORIQUE DE JEU ---
+
+
+class GameHistory:
+    """
+    Historique compact de la partie, passé aux stratégies à la place d'une liste de dicts.
+    Mises stockées dans un tableau d'entiers préalloué (tour x joueur) + total du pot par tour.
+    Avec `window`, seuls les `window` derniers tours sont gardés (buffer circulaire) :
+    la mémoire ne dépend plus de n_rounds.
+
+    Les accès se font "en arrière" : back=1 = dernier tour joué, back=2 = l'avant-dernier...
+    """
+
+    def __init__(self, n_players, n_rounds, window=None):
+        self.n_players = n_players
+        self.capacity = max(1, n_rounds if window is None else min(window, n_rounds))
+        self.contributions = np.zeros((self.capacity, n_players), dtype=np.int64)
+        self.totals = np.zeros(self.capacity, dtype=np.int64)
+        self.n_recorded = 0  # Nombre de tours joués depuis le début
+
+    def record(self, contributions, total_pot):
+        """Enregistre un tour (contributions : séquence indexée par player_id)."""
+        slot = self.n_recorded % self.capacity
+        self.contributions[slot] = contributions
+        self.totals[slot] = total_pot
+        self.n_recorded += 1
+
+    def _slot(self, back):
+        if not 1 <= back <= min(self.n_recorded, self.capacity):
+            raise IndexError(f"Tour hors de l'historique disponible (back={back})")
+        return (self.n_recorded - back) % self.capacity
+
+    def __len__(self):
+        return self.n_recorded
+
+    def round_number(self, back=1):
+        self._slot(back)
+        return self.n_recorded - back + 1
+
+    def total(self, back=1):
+        """Pot total (avant multiplication) d'un tour passé, en O(1)."""
+        return int(self.totals[self._slot(back)])
+
+    def contribution(self, my_id, back=1):
+        return int(self.contributions[self._slot(back), my_id])
+
+    def mean_others(self, my_id, back=1):
+        """Mise moyenne des AUTRES joueurs sur un tour passé : (total - la mienne) / (n - 1)."""
+        if self.n_players < 2:
+            return 0
+        slot = self._slot(back)
+        mine = int(self.contributions[slot, my_id])
+        return (int(self.totals[slot]) - mine) / (self.n_players - 1)
+
+    def __getitem__(self, index):
+        """
+        Compatibilité avec l'ancien format (liste de dicts) :
+        history[-1] -> {"round": ..., "contributions": {pid: mise}, "total_pot": ...}
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        back = len(self) - index
+        slot = self._slot(back)
+        return {
+            "round": index + 1,
+            "contributions": dict(enumerate(self.contributions[slot].tolist())),
+            "total_pot": int(self.totals[slot]),
+        }
+
+    def __iter__(self):
+        start = max(0, len(self) - self.capacity)
+        for i in range(start, len(self)):
+            yield self[i]
+
+
 # --- DÉFINITION DES STRATÉGIES ---
 
 
@@ -22,14 +101,26 @@ class Strategy(ABC):
     @abstractmethod
     def decide_contribution(self, history_global, my_id, endowment):
         """
-        :param history_global: Liste de dicts contenant les tours précédents
-                               (ex: [{'contributions': {0: 10, 1: 0}, 'pot': 20}, ...])
+        :param history_global: GameHistory des tours précédents
+                               (ex: history_global.mean_others(my_id), history_global.total() ;
+                               history_global[-1] renvoie encore l'ancien dict
+                               {'round': 1, 'contributions': {0: 10, 1: 0}, 'total_pot': 10})
         :param my_id: Identifiant unique du joueur (int)
         :param endowment: La somme disponible ce tour-ci
         :return: int (montant de la contribution)
         """
         pass
 
+    # Version "tableau" de la décision, utilisée par le moteur vectorisé (batchGame.py).
+    # Une stratégie qui ne la fournit pas ne peut être jouée qu'avec play_public_goods_game.
+    decide_batch = None
+
+    # True si la décision est une fonction déterministe du DERNIER tour uniquement
+    # (pas de hasard, pas d'état interne). Si tous les joueurs le sont et que deux tours
+    # consécutifs sont identiques, la partie a atteint un point fixe : le moteur génère
+    # alors les tours restants d'un coup. À laisser à False dans le doute.
+    deterministic = False
+
     def get_name(self):
         return self.__class__.__name__
 
@@ -37,22 +128,42 @@ class Strategy(ABC):
 class Altruist(Strategy):
     """Met tout dans le pot commun."""
 
+    deterministic = True
+
     def decide_contribution(self, history_global, my_id, endowment):
         return endowment
 
+    @staticmethod
+    def decide_batch(last_contributions, shape, endowment, rng):
+        return np.full(shape, endowment, dtype=np.int64)
+
 
 class FreeRider(Strategy):
     """Le Passager Clandestin : garde tout, ne met rien."""
 
+    deterministic = True
+
     def decide_contribution(self, history_global, my_id, endowment):
         return 0
 
+    @staticmethod
+    def decide_batch(last_contributions, shape, endowment, rng):
+        return np.zeros(shape, dtype=np.int64)
+
 
 class RandomPlayer(Strategy):
     """Joue au hasard."""
 
+    def __init__(self, rng=None):
+        # rng : random.Random dédié (pour des parties reproductibles), sinon le module random
+        self.rng = rng if rng is not None else random
+
     def decide_contribution(self, history_global, my_id, endowment):
-        return random.randint(0, endowment)
+        return self.rng.randint(0, endowment)
+
+    @staticmethod
+    def decide_batch(last_contributions, shape, endowment, rng):
+        return rng.integers(0, endowment + 1, size=shape, dtype=np.int64)
 
 
 class ConditionalCooperator(Strategy):
@@ -61,39 +172,103 @@ class ConditionalCooperator(Strategy):
     Au premier tour, il est prudent (met 50%).
     """
 
+    deterministic = True
+
     def decide_contribution(self, history_global, my_id, endowment):
         if not history_global:
             return endowment // 2
 
-        # Récupérer les contributions du tour précédent
-        last_round = history_global[-1]["contributions"]
-
-        # Calculer la moyenne des mises (sauf la mienne, pour voir l'ambiance des autres)
-        others_contributions = [amt for pid, amt in last_round.items() if pid != my_id]
-
-        if not others_contributions:  # Cas s'il joue seul (peu probable)
+        if history_global.n_players < 2:  # Cas s'il joue seul (peu probable)
             return 0
 
-        avg_others = sum(others_contributions) / len(others_contributions)
+        # Moyenne des mises du tour précédent (sauf la mienne, pour voir l'ambiance des autres)
+        # en O(1) grâce au total du pot : (total - ma mise) / (n - 1)
+        avg_others = history_global.mean_others(my_id)
         return int(avg_others)
 
+    @staticmethod
+    def decide_batch(last_contributions, shape, endowment, rng):
+        """
+        :param last_contributions: Mises du tour précédent (n_parties x n_joueurs), None au 1er tour
+        """
+        if last_contributions is None:
+            return np.full(shape, endowment // 2, dtype=np.int64)
+
+        n_players = last_contributions.shape[1]
+        if n_players < 2:
+            return np.zeros(shape, dtype=np.int64)
+
+        # Moyenne des autres = (total - ma mise) / (n - 1), tronquée comme int()
+        totals = last_contributions.sum(axis=1, keepdims=True)
+        return (totals - last_contributions) // (n_players - 1)
+
 
 # --- MOTEUR DE SIMULATION (PIPELINE DATA) ---
 
+# Colonnes d'une ligne "Tidy" : chaque ligne représente l'action d'UN joueur à UN tour
+RECORD_COLUMNS = [
+    "round",
+    "player_id",
+    "strategy",
+    "endowment",
+    "contribution",
+    "kept_private",
+    "pot_share_received",
+    "round_gain_total",
+    "cumulative_score",
+    "group_total_pot",
+    "group_synergy_factor",
+]
+
+
+def allocate_columns(players_strategies, config):
+    """
+    Prépare les colonnes typées de la partie, de taille n_rounds x n_players (ordre : tour, joueur).
+    Les colonnes connues d'avance (tour, joueur, stratégie, config) sont remplies directement.
+    """
+    n_players = len(players_strategies)
+    n_rounds = config["n_rounds"]
+    n_rows = n_rounds * n_players
+    names = np.array([s.get_name() for s in players_strategies], dtype=object)
+    return {
+        "round": np.repeat(np.arange(1, n_rounds + 1), n_players),
+        "player_id": np.tile(np.arange(n_players), n_rounds),
+        "strategy": np.tile(names, n_rounds),
+        "endowment": np.full(n_rows, config["endowment"], dtype=np.int64),
+        "contribution": np.zeros(n_rows, dtype=np.int64),
+        "kept_private": np.zeros(n_rows, dtype=np.int64),
+        "pot_share_received": np.zeros(n_rows, dtype=np.float64),
+        "round_gain_total": np.zeros(n_rows, dtype=np.float64),
+        "cumulative_score": np.zeros(n_rows, dtype=np.float64),
+        "group_total_pot": np.zeros(n_rows, dtype=np.int64),
+        "group_synergy_factor": np.full(n_rows, config["multiplier"], dtype=np.float64),
+    }
+
 
 def play_public_goods_game(players_strategies, config):
     """
     Joue une partie complète à N joueurs.
     :param players_strategies: Liste d'instances de stratégies [s1, s2, s3...]
     :param config: Dictionnaire de configuration
-    :return: Liste de dictionnaires (Flat Data pour ETL)
+    :return: Dictionnaire de colonnes NumPy (Flat Data pour ETL, voir RECORD_COLUMNS) :
+             pd.DataFrame(...) ou pa.table(...) directement dessus
     """
-    history_global = []  # État du jeu tour par tour pour la prise de décision
-    dataset = []  # Données aplaties pour l'export
-
     n_players = len(players_strategies)
+    # État du jeu tour par tour pour la prise de décision
+    history_global = GameHistory(
+        n_players, config["n_rounds"], window=config.get("history_window")
+    )
+    # Données aplaties pour l'export, écrites tour par tour dans des buffers préalloués
+    columns = allocate_columns(players_strategies, config)
+
     # Initialisation des scores cumulés pour le suivi
-    cumulative_scores = {i: 0 for i in range(n_players)}
+    cumulative_scores = np.zeros(n_players, dtype=np.float64)
+
+    # Avance rapide possible seulement si aucun joueur n'a de hasard ni de mémoire longue
+    can_fast_forward = config.get("fast_forward", True) and all(
+        s.deterministic for s in players_strategies
+    )
+    previous_contributions = None
 
     print(
         f"--- DÉBUT DU JEU : {n_players} Joueurs, Multiplicateur x{config['multiplier']} ---"
@@ -101,7 +276,7 @@ def play_public_goods_game(players_strategies, config):
 
     for round_num in range(1, config["n_rounds"] + 1):
 
-        current_contributions = {}
+        current_contributions = [0] * n_players
 
         # 1. Phase de Décision (COLLECT)
         for pid, strategy in enumerate(players_strategies):
@@ -113,45 +288,64 @@ def play_public_goods_game(players_strategies, config):
             current_contributions[pid] = contribution
 
         # 2. Calcul du Pot et Redistribution (TRANSFORM)
-        total_pot = sum(current_contributions.values())
+        total_pot = sum(current_contributions)
         multiplied_pot = total_pot * config["multiplier"]
         share_per_player = multiplied_pot / n_players
 
         # Enregistrement pour l'historique de jeu (utile aux stratégies)
-        history_global.append(
-            {
-                "round": round_num,
-                "contributions": current_contributions,
-                "total_pot": total_pot,
-            }
-        )
+        history_global.record(current_contributions, total_pot)
+
+        # 3. Calcul des gains, écrits dans les lignes de ce tour (LOAD PREP)
+        rows = slice((round_num - 1) * n_players, round_num * n_players)
+        contributions = columns["contribution"][rows]
+        kept = columns["kept_private"][rows]
+        round_gain = columns["round_gain_total"][rows]
+
+        contributions[:] = current_contributions
+        # Formule : Ce que j'ai gardé + Ma part du pot commun
+        np.subtract(config["endowment"], contributions, out=kept)
+        np.add(kept, share_per_player, out=round_gain)
+        cumulative_scores += round_gain
+
+        columns["pot_share_received"][rows] = round_gain - kept  # La part reçue du pot
+        columns["cumulative_score"][rows] = cumulative_scores
+        columns["group_total_pot"][rows] = total_pot
+
+        # 4. Point fixe : même tour que le précédent => tous les tours suivants seront identiques
+        if can_fast_forward and current_contributions == previous_contributions:
+            fast_forward(columns, round_num, n_players)
+            break
+        previous_contributions = current_contributions
+
+    return columns
 
-        # 3. Calcul des gains et génération des données (LOAD PREP)
-        for pid, strategy in enumerate(players_strategies):
-            # Formule : Ce que j'ai gardé + Ma part du pot commun
-            kept = config["endowment"] - current_contributions[pid]
-            round_gain = kept + share_per_player
-
-            cumulative_scores[pid] += round_gain
-
-            # Création de la ligne de donnée "Tidy"
-            # Chaque ligne représente l'action d'UN joueur à UN tour
-            record = {
-                "round": round_num,
-                "player_id": pid,
-                "strategy": strategy.get_name(),
-                "endowment": config["endowment"],
-                "contribution": current_contributions[pid],
-                "kept_private": kept,
-                "pot_share_received": round_gain - kept,  # La part reçue du pot
-                "round_gain_total": round_gain,
-                "cumulative_score": cumulative_scores[pid],
-                "group_total_pot": total_pot,
-                "group_synergy_factor": config["multiplier"],
-            }
-            dataset.append(record)
-
-    return dataset
+
+def fast_forward(columns, last_round, n_players):
+    """
+    Remplit d'un coup les tours après `last_round` en répétant ce dernier tour :
+    mêmes mises, même pot, mêmes gains ; le score cumulé progresse de façon arithmétique.
+    (Le cumul est fait avec np.cumsum, donc avec exactement les mêmes additions flottantes
+    que la boucle tour par tour : le résultat est identique bit à bit.)
+    """
+    n_rounds = len(columns["round"]) // n_players
+    remaining = n_rounds - last_round
+    if remaining <= 0:
+        return
+
+    for key in [
+        "contribution",
+        "kept_private",
+        "pot_share_received",
+        "round_gain_total",
+        "group_total_pot",
+    ]:
+        by_round = columns[key].reshape(n_rounds, n_players)
+        by_round[last_round:] = by_round[last_round - 1]
+
+    gains = columns["round_gain_total"].reshape(n_rounds, n_players)[last_round:]
+    cumulative = columns["cumulative_score"].reshape(n_rounds, n_players)
+    steps = np.concatenate([cumulative[last_round - 1 : last_round], gains])
+    cumulative[last_round:] = np.cumsum(steps, axis=0)[1:]
 
 
 # --- EXEMPLE D'EXÉCUTION ---
@@ -167,25 +361,21 @@ if __name__ == "__main__":
 
     # Lancement de la simulation
     raw_data = play_public_goods_game(table_of_players, GAME_CONFIG)
+    df = pd.DataFrame(raw_data)
 
     # Aperçu des données (5 dernières lignes)
-    print(f"\nDonnées générées : {len(raw_data)} lignes.")
+    print(f"\nDonnées générées : {len(df)} lignes.")
     print("Exemple des dernières actions :")
-    for row in raw_data[-5:]:
+    for row in df.tail(5).itertuples():
         # Affichage simplifié
         print(
-            f"Tour {row['round']} | J{row['player_id']} ({row['strategy']}) : "
-            f"A mis {row['contribution']} | Gain {row['round_gain_total']:.2f}"
+            f"Tour {row.round} | J{row.player_id} ({row.strategy}) : "
+            f"A mis {row.contribution} | Gain {row.round_gain_total:.2f}"
         )
 
     # Pour voir qui a gagné :
-    # (Si tu as pandas installé, sinon tu peux ignorer)
-    try:
-        df = pd.DataFrame(raw_data)
-        final_scores = df[df["round"] == GAME_CONFIG["n_rounds"]].sort_values(
-            "cumulative_score", ascending=False
-        )
-        print("\n--- CLASSEMENT FINAL ---")
-        print(final_scores[["strategy", "cumulative_score"]])
-    except ImportError:
-        pass
+    final_scores = df[df["round"] == GAME_CONFIG["n_rounds"]].sort_values(
+        "cumulative_score", ascending=False
+    )
+    print("\n--- CLASSEMENT FINAL ---")
+    print(final_scores[["strategy", "cumulative_score"]])
@@ -0,0 +1,51 @@
+# --- REQUÊTES DUCKDB DU DASHBOARD ---
+# Centralisées ici pour être utilisées à la fois par streamlit.py et par benchmark.py
+# (les benchmarks mesurent exactement les requêtes du dashboard).
+
+DATA_FILE = "simulation_results.parquet"
+
+
+def summary_stats_sql(source=DATA_FILE):
+    return f"""
+    SELECT 
+        COUNT(DISTINCT game_id) as total_games,
+        AVG(group_synergy_factor) as avg_multiplier,
+        AVG(contribution) as avg_contribution,
+        AVG(round_gain_total) as avg_gain
+    FROM '{source}'
+    """
+
+
+def strategy_performance_sql(source=DATA_FILE):
+    return f"""
+    SELECT 
+        strategy, 
+        AVG(contribution) as mean_contribution,
+        AVG(cumulative_score) as mean_final_score,
+        COUNT(*) as count_decisions
+    FROM '{source}'
+    -- On prend le score cumulé seulement au dernier tour pour avoir le total
+    WHERE round = 50 
+    GROUP BY strategy
+    ORDER BY mean_final_score DESC
+    """
+
+
+def evolution_over_time_sql(source=DATA_FILE):
+    return f"""
+    SELECT 
+        round,
+        strategy,
+        AVG(contribution) as avg_contribution
+    FROM '{source}'
+    GROUP BY round, strategy
+    ORDER BY round
+    """
+
+
+# Nom -> requête, pour les benchmarks
+DASHBOARD_QUERIES = {
+    "summary_stats": summary_stats_sql,
+    "strategy_performance": strategy_performance_sql,
+    "evolution_over_time": evolution_over_time_sql,
+}
@@ -2,6 +2,7 @@ import streamlit as st
 import duckdb
 import pandas as pd
 import plotly.express as px
+import queries
 
 # Configuration de la page
 st.set_page_config(page_title="Public Goods Analysis", layout="wide")
@@ -15,46 +16,17 @@ st.markdown("Exploration des résultats de simulation via **DuckDB** et **Stream
 # On utilise une fonction avec @st.cache_data pour ne pas re-exécuter la requête à chaque clic
 @st.cache_data
 def load_summary_stats():
-    query = """
-    SELECT 
-        COUNT(DISTINCT game_id) as total_games,
-        AVG(group_synergy_factor) as avg_multiplier,
-        AVG(contribution) as avg_contribution,
-        AVG(round_gain_total) as avg_gain
-    FROM 'simulation_results.parquet'
-    """
-    return duckdb.sql(query).df()
+    return duckdb.sql(queries.summary_stats_sql()).df()
 
 
 @st.cache_data
 def load_strategy_performance():
-    query = """
-    SELECT 
-        strategy, 
-        AVG(contribution) as mean_contribution,
-        AVG(cumulative_score) as mean_final_score,
-        COUNT(*) as count_decisions
-    FROM 'simulation_results.parquet'
-    -- On prend le score cumulé seulement au dernier tour pour avoir le total
-    WHERE round = 50 
-    GROUP BY strategy
-    ORDER BY mean_final_score DESC
-    """
-    return duckdb.sql(query).df()
+    return duckdb.sql(queries.strategy_performance_sql()).df()
 
 
 @st.cache_data
 def load_evolution_over_time():
-    query = """
-    SELECT 
-        round,
-        strategy,
-        AVG(contribution) as avg_contribution
-    FROM 'simulation_results.parquet'
-    GROUP BY round, strategy
-    ORDER BY round
-    """
-    return duckdb.sql(query).df()
+    return duckdb.sql(queries.evolution_over_time_sql()).df()
 
 
 # --- INTERFACE UTILISATEUR ---
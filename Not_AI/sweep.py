@@ -0,0 +1,227 @@
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mainGame import (
+    Altruist,
+    FreeRider,
+    RandomPlayer,
+    ConditionalCooperator,
+    RECORD_COLUMNS,
+)
+from batchGame import play_public_goods_batch
+
+# --- BALAYAGE DE PARAMÈTRES (SWEEP) ---
+# Une "cellule" = une combinaison (multiplicateur, dotation, composition de table, graine...).
+# Chaque cellule est simulée avec le moteur vectorisé, puis mise en cache sur disque sous
+# l'empreinte (config, composition, graine, version du code) : un balayage qui recoupe
+# un balayage précédent ne recalcule que les cellules nouvelles.
+
+STRATEGIES = {
+    cls.__name__: cls for cls in [Altruist, FreeRider, RandomPlayer, ConditionalCooperator]
+}
+
+DEFAULT_CACHE_DIR = "sweep_cache"
+
+# Fichiers dont dépendent les résultats : si l'un change, le cache est invalidé
+ENGINE_FILES = ["mainGame.py", "batchGame.py", "sweep.py"]
+
+
+def code_version():
+    """Empreinte du code du moteur (contenu des fichiers ENGINE_FILES)."""
+    digest = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_FILES:
+        with open(os.path.join(folder, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def make_cell(
+    multiplier, endowment=20, composition=None, n_players=None, n_rounds=50, n_games=100, seed=0
+):
+    """
+    Décrit une cellule du balayage.
+    :param composition: Tuple de noms de stratégies (table fixe), ou None pour une
+                        composition tirée au hasard à chaque partie (avec n_players joueurs)
+    """
+    if composition is None and n_players is None:
+        raise ValueError("Il faut une composition ou un nombre de joueurs")
+    if composition is not None:
+        composition = tuple(composition)
+        unknown = [name for name in composition if name not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"Stratégies inconnues : {unknown}")
+        n_players = len(composition)
+    return {
+        "multiplier": float(multiplier),
+        "endowment": int(endowment),
+        "n_players": int(n_players),
+        "composition": composition,
+        "n_rounds": int(n_rounds),
+        "n_games": int(n_games),
+        "seed": int(seed),
+    }
+
+
+def grid_design(multiplier, endowment=(20,), composition=(None,), n_players=(None,), **fixed):
+    """
+    Plan complet : toutes les combinaisons des valeurs données.
+    Ex : grid_design(multiplier=[1.2, 1.6, 2.0], composition=[("Altruist", "FreeRider", "FreeRider")])
+    """
+    cells = []
+    for m, e, c, n in itertools.product(multiplier, endowment, composition, n_players):
+        if c is None and n is None:
+            continue
+        cells.append(make_cell(m, e, c, None if c is not None else n, **fixed))
+    if not cells:
+        raise ValueError("Plan vide : il faut au moins une composition ou un nombre de joueurs")
+    return cells
+
+
+def sampled_design(n_cells, multiplier=(1.2, 3.0), endowment=(10, 30), n_players=(3, 6), seed=0, **fixed):
+    """
+    Plan échantillonné : n_cells cellules tirées uniformément dans les bornes données
+    (multiplicateur arrondi à 0.01 pour que des balayages différents retombent sur les mêmes cellules).
+    Les compositions sont tirées au hasard à chaque partie.
+    """
+    rng = np.random.default_rng(seed)
+    cells = []
+    for _ in range(n_cells):
+        cells.append(
+            make_cell(
+                multiplier=round(float(rng.uniform(*multiplier)), 2),
+                endowment=int(rng.integers(endowment[0], endowment[1] + 1)),
+                n_players=int(rng.integers(n_players[0], n_players[1] + 1)),
+                **fixed,
+            )
+        )
+    return cells
+
+
+def cell_fingerprint(cell, version=None):
+    """Clé de cache : hash de (config, composition, graine, version du code)."""
+    payload = json.dumps(
+        {"cell": cell, "code_version": version or code_version()}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def simulate_cell(cell, cell_id):
+    """Simule toutes les parties d'une cellule et renvoie une pyarrow.Table."""
+    names = list(STRATEGIES)
+    rngs = [
+        np.random.default_rng(seed)
+        for seed in np.random.SeedSequence(cell["seed"]).generate_state(
+            cell["n_games"], dtype=np.uint64
+        )
+    ]
+    if cell["composition"] is not None:
+        tables = [[STRATEGIES[name] for name in cell["composition"]]] * cell["n_games"]
+    else:
+        tables = [
+            [STRATEGIES[names[k]] for k in rng.integers(len(names), size=cell["n_players"])]
+            for rng in rngs
+        ]
+
+    config = {
+        "endowment": cell["endowment"],
+        "multiplier": cell["multiplier"],
+        "n_rounds": cell["n_rounds"],
+    }
+    columns = play_public_goods_batch(tables, config, rngs)
+
+    arrays = {key: columns[key] for key in RECORD_COLUMNS}
+    game_ids = pa.array([f"{cell_id}_{g + 1}" for g in range(cell["n_games"])])
+    arrays["game_id"] = game_ids.take(columns["game_index"])
+    arrays["n_players"] = pa.repeat(cell["n_players"], len(columns["round"]))
+    arrays["cell_id"] = pa.repeat(cell_id, len(columns["round"]))
+    return pa.table(arrays)
+
+
+def _run_and_store(cell, cell_id, path):
+    """Worker : simule une cellule et l'écrit dans le cache (écriture atomique)."""
+    table = simulate_cell(cell, cell_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return cell_id
+
+
+def run_sweep(cells, n_workers=1, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Lance le balayage : les cellules déjà en cache sont relues, les autres
+    sont simulées en parallèle (un processus par cellule) puis ajoutées au cache.
+    :return: pyarrow.Table de toutes les cellules (colonne "cell_id" = empreinte de la cellule)
+    """
+    if not cells:
+        raise ValueError("Aucune cellule à simuler (plan vide)")
+    os.makedirs(cache_dir, exist_ok=True)
+    version = code_version()
+
+    paths = {}
+    for cell in cells:
+        cell_id = cell_fingerprint(cell, version)
+        paths[cell_id] = (cell, os.path.join(cache_dir, f"{cell_id}.parquet"))
+    missing = {cid: v for cid, v in paths.items() if not os.path.exists(v[1])}
+
+    print(
+        f"🧮 Balayage : {len(paths)} cellules, {len(paths) - len(missing)} en cache, "
+        f"{len(missing)} à calculer ({n_workers} processus)"
+    )
+
+    if n_workers > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_run_and_store, cell, cid, path)
+                for cid, (cell, path) in missing.items()
+            ]
+            for future in futures:
+                future.result()
+    else:
+        for cid, (cell, path) in missing.items():
+            _run_and_store(cell, cid, path)
+
+    return pa.concat_tables([pq.read_table(path) for _, path in paths.values()])
+
+
+def describe_cells(cells):
+    """Table (une ligne par cellule) pour relier cell_id aux paramètres du balayage."""
+    version = code_version()
+    rows = []
+    for cell in cells:
+        row = dict(cell, cell_id=cell_fingerprint(cell, version))
+        row["composition"] = "+".join(cell["composition"]) if cell["composition"] else "random"
+        rows.append(row)
+    return pa.Table.from_pylist(rows)
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    # Impact du multiplicateur sur quelques tables types (3 x 3 = 9 cellules)
+    cells = grid_design(
+        multiplier=[1.2, 1.6, 2.0],
+        composition=[
+            ("Altruist", "FreeRider", "ConditionalCooperator"),
+            ("ConditionalCooperator",) * 4,
+            ("RandomPlayer", "FreeRider", "ConditionalCooperator", "Altruist"),
+        ],
+        n_games=200,
+    )
+    results = run_sweep(cells, n_workers=os.cpu_count() or 1)
+
+    summary = (
+        results.to_pandas()
+        .merge(describe_cells(cells).to_pandas()[["cell_id", "composition"]], on="cell_id")
+        .query("round == 50")
+        .groupby(["composition", "group_synergy_factor", "strategy"])["cumulative_score"]
+        .mean()
+    )
+    print(summary)
@@ -0,0 +1,181 @@
+import itertools
+import random
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mainGame import Strategy, GAME_CONFIG, RandomPlayer, play_public_goods_game
+from batchGame import play_public_goods_batch
+
+# --- TOURNOI À LA AXELROD (ROUND-ROBIN) ---
+# Toutes les combinaisons de stratégies (avec répétition) à une taille de table donnée,
+# chacune rejouée n_repeats fois. Une combinaison sans hasard (toutes les stratégies
+# `deterministic`) donne toujours le même résultat : elle n'est simulée qu'une seule fois.
+
+
+def discover_strategies(base=Strategy):
+    """Toutes les sous-classes concrètes de Strategy (récursivement), dans l'ordre de définition."""
+    found = []
+    for cls in base.__subclasses__():
+        if not getattr(cls, "__abstractmethods__", None):
+            found.append(cls)
+        found.extend(discover_strategies(cls))
+    return found
+
+
+def _players(composition, rng):
+    """
+    Joueurs d'une partie du moteur tour par tour. RandomPlayer reçoit son propre
+    random.Random, dérivé du générateur de la partie (comme createData._play_tables_python).
+    """
+    player_rng = random.Random(int(rng.integers(2**63))) if rng is not None else None
+    return [cls(rng=player_rng) if cls is RandomPlayer else cls() for cls in composition]
+
+
+def _play_games(composition, config, rngs):
+    """
+    Joue len(rngs) parties de la même table (moteur vectorisé si possible).
+    :return: (mise moyenne, score final), deux tableaux (parties x joueurs)
+    """
+    n_players = len(composition)
+    n_rounds = config["n_rounds"]
+    shape = (len(rngs), n_rounds, n_players)
+
+    if all(cls.decide_batch is not None for cls in composition):
+        columns = play_public_goods_batch([list(composition)] * len(rngs), config, list(rngs))
+    else:
+        # Stratégie sans version vectorisée : moteur tour par tour, une partie à la fois
+        games = [play_public_goods_game(_players(composition, rng), config) for rng in rngs]
+        columns = {
+            key: np.concatenate([g[key] for g in games])
+            for key in ["contribution", "cumulative_score"]
+        }
+
+    mean_contributions = columns["contribution"].reshape(shape).mean(axis=1)
+    final_scores = columns["cumulative_score"].reshape(shape)[:, -1, :]
+    return mean_contributions, final_scores
+
+
+@lru_cache(maxsize=None)
+def play_deterministic_matchup(composition, endowment, multiplier, n_rounds):
+    """
+    Résultat d'une table sans hasard (mémoïsé : elle ne change jamais).
+    :return: (mise moyenne, score final) par siège, tableaux (1 x joueurs)
+    """
+    config = {"endowment": endowment, "multiplier": multiplier, "n_rounds": n_rounds}
+    # Pas de hasard : aucun générateur nécessaire
+    return _play_games(composition, config, [None])
+
+
+def run_tournament(
+    table_size=3,
+    n_repeats=10,
+    config=None,
+    strategies=None,
+    seed=0,
+    output="tournament_results.parquet",
+):
+    """
+    Lance le tournoi complet.
+    :param table_size: Nombre de joueurs par table
+    :param n_repeats: Nombre de parties par combinaison de stratégies
+    :param config: Configuration du jeu (par défaut GAME_CONFIG)
+    :param strategies: Classes en lice (par défaut toutes les sous-classes de Strategy)
+    :param seed: Graine maître (pour les combinaisons avec du hasard)
+    :param output: Fichier Parquet des résultats par siège (None pour ne rien écrire)
+    :return: (classement pd.DataFrame, résultats pyarrow.Table)
+    """
+    config = dict(config or GAME_CONFIG)
+    strategies = strategies or discover_strategies()
+    matchups = list(itertools.combinations_with_replacement(strategies, table_size))
+
+    print(
+        f"🏟️ Tournoi : {len(strategies)} stratégies, tables de {table_size}, "
+        f"{len(matchups)} combinaisons x {n_repeats} parties"
+    )
+
+    results = {
+        "matchup_id": [],
+        "repeat": [],
+        "player_id": [],
+        "strategy": [],
+        "mean_contribution": [],
+        "final_score": [],
+        "table_rank": [],
+        "cached": [],
+    }
+
+    for matchup_id, composition in enumerate(matchups):
+        deterministic = all(cls.deterministic for cls in composition)
+        if deterministic:
+            mean_contrib, final = play_deterministic_matchup(
+                composition, config["endowment"], config["multiplier"], config["n_rounds"]
+            )
+            mean_contrib = np.repeat(mean_contrib, n_repeats, axis=0)
+            final = np.repeat(final, n_repeats, axis=0)
+        else:
+            seeds = np.random.SeedSequence(seed, spawn_key=(matchup_id,)).generate_state(
+                n_repeats, dtype=np.uint64
+            )
+            mean_contrib, final = _play_games(
+                composition, config, [np.random.default_rng(s) for s in seeds]
+            )
+
+        # Rang dans la table (1 = meilleur score, ex-aequo au meilleur rang)
+        ranks = (final[:, None, :] > final[:, :, None]).sum(axis=2) + 1
+
+        n_rows = n_repeats * table_size
+        results["matchup_id"].append(np.full(n_rows, matchup_id))
+        results["repeat"].append(np.repeat(np.arange(n_repeats), table_size))
+        results["player_id"].append(np.tile(np.arange(table_size), n_repeats))
+        results["strategy"].append(
+            np.tile(np.array([cls.__name__ for cls in composition], dtype=object), n_repeats)
+        )
+        results["mean_contribution"].append(mean_contrib.ravel())
+        results["final_score"].append(final.ravel())
+        results["table_rank"].append(ranks.ravel())
+        results["cached"].append(np.full(n_rows, deterministic))
+
+    table = pa.table({key: np.concatenate(values) for key, values in results.items()})
+    table = table.append_column(
+        "matchup",
+        pa.array(["+".join(cls.__name__ for cls in m) for m in matchups]).take(
+            table["matchup_id"]
+        ),
+    )
+    if output:
+        pq.write_table(table, output)
+        print(f"✅ Résultats sauvegardés : {output}")
+
+    return compute_ranking(table.to_pandas()), table
+
+
+def compute_ranking(df):
+    """Classement des stratégies : score final moyen, victoires, mise moyenne."""
+    ranking = (
+        df.assign(win=df["table_rank"] == 1)
+        .groupby("strategy")
+        .agg(
+            mean_final_score=("final_score", "mean"),
+            mean_contribution=("mean_contribution", "mean"),
+            win_rate=("win", "mean"),
+            games_played=("final_score", "size"),
+        )
+        .sort_values("mean_final_score", ascending=False)
+    )
+    ranking.insert(0, "rank", np.arange(1, len(ranking) + 1))
+    return ranking
+
+
+# --- EXÉCUTION ---
+
+if __name__ == "__main__":
+    config = dict(GAME_CONFIG, n_rounds=50)
+    ranking, _ = run_tournament(table_size=4, n_repeats=20, config=config)
+
+    print("\n--- CLASSEMENT DU TOURNOI ---")
+    with pd.option_context("display.width", 120):
+        print(ranking)
@@ -0,0 +1,113 @@
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+# --- OUTILS COMMUNS DES BENCHMARKS (AI/benchmark.py et Not_AI/benchmark.py) ---
+# Chaque exécution est sauvegardée en JSON dans RESULTS_DIR (un fichier par exécution,
+# préfixé par le nom de la suite) ; elle est comparée à la précédente de la même suite
+# pour repérer les ralentissements.
+
+RESULTS_DIR = "bench_results"
+
+# Ralentissement au-delà duquel une mesure est signalée (+20 %)
+REGRESSION_THRESHOLD = 0.20
+
+
+def timed(func, repeat=3):
+    """Lance func() `repeat` fois ; renvoie (meilleur temps, temps médian) en secondes."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+# --- HISTORIQUE ET DÉTECTION DE RÉGRESSIONS ---
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results, suite, folder=RESULTS_DIR):
+    """Sauvegarde une exécution en JSON (un fichier par exécution) et renvoie son chemin."""
+    os.makedirs(folder, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(folder, f"{suite}_{stamp}.json")
+    payload = {
+        "suite": suite,
+        "timestamp": stamp,
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def load_previous(suite, folder=RESULTS_DIR, exclude=None):
+    """Dernière exécution sauvegardée de la suite (hors `exclude`), ou None."""
+    paths = sorted(glob.glob(os.path.join(folder, f"{suite}_*.json")))
+    paths = [p for p in paths if p != exclude]
+    if not paths:
+        return None
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def compare(results, previous, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare chaque mesure ("seconds") à l'exécution précédente.
+    :return: Liste de (mesure, ancien temps, nouveau temps, ratio) des ralentissements
+    """
+    regressions = []
+    for name, metrics in results.items():
+        old = previous["results"].get(name)
+        if not old or not old.get("seconds"):
+            continue
+        ratio = metrics["seconds"] / old["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append((name, old["seconds"], metrics["seconds"], ratio))
+    return regressions
+
+
+def report(results, previous):
+    print(f"\n{'Mesure':<48} {'Temps (s)':>12} {'Précédent':>12}")
+    for name, metrics in results.items():
+        old = (previous or {}).get("results", {}).get(name, {}).get("seconds")
+        old_text = f"{old:12.4f}" if old else f"{'-':>12}"
+        print(f"{name:<48} {metrics['seconds']:12.4f} {old_text}")
+
+    # Mesures de stockage (taille sur disque / en mémoire), s'il y en a
+    storage = {name: metrics for name, metrics in results.items() if "disk_bytes" in metrics}
+    if storage:
+        print(f"\n{'Stockage':<48} {'Disque (Mo)':>12} {'Arrow (Mo)':>12}")
+        for name, metrics in storage.items():
+            print(
+                f"{name:<48} {metrics['disk_bytes'] / 1e6:12.2f} "
+                f"{metrics['arrow_bytes'] / 1e6:12.2f}"
+            )
+
+    if previous is None:
+        print("\nℹ️ Pas d'exécution précédente : cette exécution sert de référence.")
+        return
+    regressions = compare(results, previous)
+    if regressions:
+        print(f"\n🐢 {len(regressions)} ralentissement(s) par rapport à {previous['timestamp']} :")
+        for name, old, new, ratio in regressions:
+            print(f"   - {name} : {old:.4f}s -> {new:.4f}s (x{ratio:.2f})")
+    else:
+        print(f"\n✅ Aucun ralentissement par rapport à {previous['timestamp']}.")
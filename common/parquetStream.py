@@ -0,0 +1,58 @@
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- ÉCRITURE PARQUET EN FLUX (Not_AI/createData.py et AI/dataset.py) ---
+
+
+class ParquetStreamWriter:
+    """
+    Écriture Parquet en flux : les RecordBatch arrivent au fil de l'eau et sont
+    écrits par row groups de `row_group_size` lignes. Seul le row group en cours
+    est gardé en mémoire ; le fichier est refermé proprement même en cas d'erreur.
+    Tant qu'il n'est pas refermé, le fichier s'appelle "<filename>.tmp" : un crash en cours
+    d'écriture ne laisse jamais de fichier sans pied de page sous le nom final (que les
+    lecteurs iraient ouvrir). À la fermeture, il remplace un éventuel fichier du même nom.
+    """
+
+    def __init__(self, filename, row_group_size):
+        self.filename = filename
+        self.row_group_size = row_group_size
+        self.n_rows = 0
+        self.n_columns = 0
+        self._writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def write(self, batch):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.filename + ".tmp", batch.schema)
+            self.n_columns = batch.num_columns
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Écrit sur disque les lignes en attente."""
+        if not self._pending:
+            return
+        table = pa.Table.from_batches(self._pending)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.n_rows += table.num_rows
+        self._pending = []
+        self._pending_rows = 0
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+            os.replace(self.filename + ".tmp", self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()